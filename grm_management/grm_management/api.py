@@ -3,7 +3,7 @@
 
 import frappe
 from frappe import _
-from frappe.utils import nowdate, now_datetime, getdate, parse_time
+from frappe.utils import add_days, nowdate, now_datetime, getdate, parse_time
 from datetime import datetime, time
 
 
@@ -206,11 +206,11 @@ def get_location_dashboard(location):
 			SELECT member, event_time, context_type, context_name
 			FROM `tabAccess Log`
 			WHERE location = %s
-			AND DATE(event_time) = %s
-			AND event_type = 'Check-In'
+			AND event_time >= %s AND event_time < %s
+			AND event_type IN ('Entry', 'Check-In')
 			ORDER BY event_time DESC
 			LIMIT 20
-		""", (location, nowdate()), as_dict=True)
+		""", (location, nowdate(), add_days(nowdate(), 1)), as_dict=True)
 
 		# Get active contracts for this location
 		active_contracts = frappe.db.sql("""
@@ -258,32 +258,36 @@ def get_available_spaces(location=None, date=None, start_time=None, end_time=Non
 			date = nowdate()
 
 		# Build filters for spaces
-		filters = {"status": "Available"}
+		conditions = ["s.status = 'Available'"]
+		values = {"date": date}
 
 		if location:
-			filters["location"] = location
+			conditions.append("s.location = %(location)s")
+			values["location"] = location
 
 		if space_type:
-			filters["space_type"] = space_type
-
-		# Get all potentially available spaces
-		spaces = frappe.get_all("Space", filters=filters, fields=[
-			"name", "space_name", "space_code", "location", "space_type",
-			"capacity", "hourly_rate", "daily_rate", "monthly_rate", "area_sqm"
-		])
+			conditions.append("s.space_type = %(space_type)s")
+			values["space_type"] = space_type
 
 		# If time range specified, filter out spaces with conflicting bookings
+		# in the same query instead of checking each space separately
 		if start_time and end_time:
-			available_spaces = []
-
-			for space in spaces:
-				result = check_space_availability(space.name, date, start_time, end_time)
-				if result.get("available"):
-					available_spaces.append(space)
-
-			return available_spaces
-		else:
-			return spaces
+			conditions.append("""NOT EXISTS (
+				SELECT 1 FROM `tabBooking` b
+				WHERE b.space = s.name
+					AND b.booking_date = %(date)s
+					AND b.status IN ('Confirmed', 'Checked-In')
+					AND (b.all_day = 1 OR (b.start_time < %(end_time)s AND b.end_time > %(start_time)s))
+			)""")
+			values["start_time"] = start_time
+			values["end_time"] = end_time
+
+		return frappe.db.sql(f"""
+			SELECT s.name, s.space_name, s.space_code, s.location, s.space_type,
+				s.capacity, s.hourly_rate, s.daily_rate, s.monthly_rate, s.area_sqm
+			FROM `tabSpace` s
+			WHERE {" AND ".join(conditions)}
+		""", values, as_dict=True)
 
 	except Exception as e:
 		frappe.log_error(f"Error getting available spaces: {str(e)}", "API Error")
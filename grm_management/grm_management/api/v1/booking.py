@@ -4,10 +4,17 @@
 import frappe
 from frappe import _
 from frappe.utils import (
-	nowdate, getdate, cint, flt, get_url, cstr, strip_html,
+	nowdate, getdate, add_days, cint, flt, get_url, cstr, strip_html,
 )
 from datetime import datetime
 
+from grm_management.grm_management.utils.availability import find_conflicts, get_day_slots
+from grm_management.grm_management.utils.enrichment import get_space_info_map
+from grm_management.grm_management.utils.image_variants import get_image_variants
+from grm_management.grm_management.utils import dashboard_cache
+
+# Booking statuses that occupy a space
+ACTIVE_BOOKING_STATUSES = ("Draft", "Confirmed", "Checked-in")
 
 # ---------------------------------------------------------------------------
 # Helpers (private — not exposed via API)
@@ -32,11 +39,7 @@ def get_full_image_url(image_path):
 
 def _get_tenant_for_current_user():
 	"""Get the GRM Tenant linked to the current logged-in user."""
-	user = frappe.session.user
-	if user in ("Administrator", "Guest"):
-		return None
-	user_email = frappe.db.get_value("User", user, "email") or user
-	return frappe.db.get_value("GRM Tenant", {"primary_email": user_email}, "name")
+	return dashboard_cache.get_tenant_for_user(frappe.session.user)
 
 
 def _sanitize_text(value, max_length=500):
@@ -119,6 +122,81 @@ def _get_space_location_name(location_id):
 	return frappe.db.get_value("GRM Location", location_id, "location_name") or location_id
 
 
+def _space_summary(space_id, space_info, with_image=True):
+	"""Build the nested space dict of a booking row from a get_space_info_map() entry."""
+	summary = {
+		"id": space_id,
+		"name": space_info.space_name if space_info else space_id,
+		"name_ar": space_info.space_name_ar if space_info else "",
+		"location": (space_info.location_name or space_info.location or "") if space_info else "",
+	}
+	if with_image:
+		summary["image"] = get_full_image_url(space_info.space_image) if space_info else None
+		summary["image_variants"] = get_image_variants(space_info.space_image) if space_info else None
+	return summary
+
+
+# Booking statuses counted as spent / billable on the dashboard
+BILLABLE_BOOKING_STATUSES = ("Confirmed", "Checked-in", "Checked-out")
+
+
+def _get_booking_stats(tenant, today):
+	"""Compute the dashboard booking_stats of a tenant from one grouped query.
+
+	Bookings are grouped by (status, payment_status); each group carries its
+	count, how many are on/after today and its total amount, and every stat is
+	folded from those groups.
+	"""
+	groups = frappe.db.sql("""
+		SELECT status, payment_status,
+			COUNT(*) AS booking_count,
+			SUM(CASE WHEN booking_date >= %(today)s THEN 1 ELSE 0 END) AS from_today,
+			SUM(IFNULL(total_amount, 0)) AS amount
+		FROM `tabGRM Booking`
+		WHERE tenant = %(tenant)s
+		GROUP BY status, payment_status
+	""", {"tenant": tenant, "today": today}, as_dict=True)
+
+	stats = {
+		"total_bookings": 0,
+		"active_bookings": 0,
+		"upcoming_bookings": 0,
+		"completed_bookings": 0,
+		"cancelled_bookings": 0,
+		"total_spent": 0.0,
+		"outstanding_amount": 0.0,
+	}
+	for g in groups:
+		count = cint(g.booking_count)
+		stats["total_bookings"] += count
+		if g.status in ("Confirmed", "Checked-in"):
+			stats["active_bookings"] += count
+		if g.status in ("Draft", "Confirmed"):
+			stats["upcoming_bookings"] += cint(g.from_today)
+		if g.status == "Checked-out":
+			stats["completed_bookings"] += count
+		elif g.status == "Cancelled":
+			stats["cancelled_bookings"] += count
+		if g.status in BILLABLE_BOOKING_STATUSES:
+			stats["total_spent"] += flt(g.amount)
+			if g.payment_status == "Unpaid":
+				stats["outstanding_amount"] += flt(g.amount)
+
+	return stats
+
+
+def _get_invoice_totals(customer):
+	"""Return (total invoiced, total outstanding) of a customer's submitted Sales Invoices in one query."""
+	totals = frappe.db.sql("""
+		SELECT
+			SUM(grand_total) AS total_invoiced,
+			SUM(CASE WHEN outstanding_amount > 0 THEN outstanding_amount ELSE 0 END) AS total_outstanding
+		FROM `tabSales Invoice`
+		WHERE customer = %(customer)s AND docstatus = 1
+	""", {"customer": customer}, as_dict=True)[0]
+	return flt(totals.total_invoiced), flt(totals.total_outstanding)
+
+
 # ---------------------------------------------------------------------------
 # Public endpoints
 # ---------------------------------------------------------------------------
@@ -145,7 +223,11 @@ def check_availability(space=None, booking_date=None, start_time=None, end_time=
 				"message": _msg("space, booking_date, start_time, and end_time are required", "المساحة وتاريخ الحجز ووقت البداية ووقت النهاية مطلوبون"),
 			}
 
-		if not frappe.db.exists("GRM Space", space):
+		try:
+			# Cached doc: cleared by Frappe whenever the space is saved
+			space_doc = frappe.get_cached_doc("GRM Space", space)
+		except frappe.DoesNotExistError:
+			frappe.clear_last_message()
 			frappe.response["http_status_code"] = 404
 			return {
 				"success": False,
@@ -153,8 +235,6 @@ def check_availability(space=None, booking_date=None, start_time=None, end_time=
 				"message": _msg("Space not found", "المساحة غير موجودة"),
 			}
 
-		space_doc = frappe.get_doc("GRM Space", space)
-
 		if not space_doc.allow_booking:
 			frappe.response["http_status_code"] = 409
 			return {
@@ -193,32 +273,19 @@ def check_availability(space=None, booking_date=None, start_time=None, end_time=
 				"message": _msg("Cannot book for past dates", "لا يمكن الحجز لتواريخ سابقة"),
 			}
 
-		# Check for conflicting bookings using ORM
-		conflicting_bookings = frappe.get_all(
-			"GRM Booking",
-			filters={
-				"space": space,
-				"booking_date": booking_date,
-				"status": ["in", ["Draft", "Confirmed", "Checked-in"]],
-			},
-			fields=["name", "start_time", "end_time", "status"],
-		)
-
-		# Filter overlaps in Python (safer than raw SQL)
-		start_t = _parse_time_string(start_time)
-		end_t = _parse_time_string(end_time)
-		conflicts = []
-		for b in conflicting_bookings:
-			b_start = _parse_time_string(b.start_time)
-			b_end = _parse_time_string(b.end_time)
-			# Overlap: NOT (end <= b_start OR start >= b_end)
-			if not (end_t <= b_start or start_t >= b_end):
-				conflicts.append({
-					"booking_id": b.name,
-					"start_time": str(b.start_time),
-					"end_time": str(b.end_time),
-					"status": b.status,
-				})
+		# Check for conflicting bookings against the shared availability index
+		conflicts = [
+			{
+				"booking_id": b["name"],
+				"start_time": b["start_time"],
+				"end_time": b["end_time"],
+				"status": b["status"],
+			}
+			for b in find_conflicts(
+				"GRM Booking", space, booking_dt, start_time, end_time,
+				statuses=ACTIVE_BOOKING_STATUSES,
+			)
+		]
 
 		if conflicts:
 			frappe.response["http_status_code"] = 409
@@ -726,30 +793,15 @@ def get_my_bookings(status=None, from_date=None, to_date=None, limit=50):
 			limit_page_length=safe_limit,
 		)
 
+		space_map = get_space_info_map(b.space for b in bookings)
+
 		result = []
 		for booking in bookings:
-			space_info = frappe.db.get_value(
-				"GRM Space",
-				booking.space,
-				["space_name", "space_name_ar", "location", "space_image"],
-				as_dict=True,
-			)
-
-			location_name = ""
-			if space_info and space_info.location:
-				location_name = _get_space_location_name(space_info.location)
-
 			result.append({
 				"id": booking.name,
 				"status": booking.status,
 				"booking_type": booking.booking_type,
-				"space": {
-					"id": booking.space,
-					"name": space_info.space_name if space_info else booking.space,
-					"name_ar": space_info.space_name_ar if space_info else "",
-					"location": location_name,
-					"image": get_full_image_url(space_info.space_image) if space_info else None,
-				},
+				"space": _space_summary(booking.space, space_map.get(booking.space)),
 				"booking_date": str(booking.booking_date),
 				"start_time": str(booking.start_time),
 				"end_time": str(booking.end_time),
@@ -853,6 +905,7 @@ def get_booking_details(booking_id=None):
 					"location": location_name,
 					"capacity": space_doc.capacity,
 					"image": get_full_image_url(space_doc.space_image),
+					"image_variants": get_image_variants(space_doc.space_image),
 				},
 				"booking_date": str(booking.booking_date),
 				"start_time": str(booking.start_time),
@@ -913,7 +966,10 @@ def get_available_slots(space=None, date=None, slot_duration_minutes=60):
 				"message": _msg("space and date are required", "المساحة والتاريخ مطلوبان"),
 			}
 
-		if not frappe.db.exists("GRM Space", space):
+		try:
+			space_doc = frappe.get_cached_doc("GRM Space", space)
+		except frappe.DoesNotExistError:
+			frappe.clear_last_message()
 			frappe.response["http_status_code"] = 404
 			return {
 				"success": False,
@@ -921,8 +977,6 @@ def get_available_slots(space=None, date=None, slot_duration_minutes=60):
 				"message": _msg("Space not found", "المساحة غير موجودة"),
 			}
 
-		space_doc = frappe.get_doc("GRM Space", space)
-
 		if not space_doc.allow_booking:
 			frappe.response["http_status_code"] = 409
 			return {
@@ -941,52 +995,15 @@ def get_available_slots(space=None, date=None, slot_duration_minutes=60):
 				"data": {"slots": []},
 			}
 
-		working_start = 8
-		working_end = 22
 		# Cap slot duration to prevent abuse
 		slot_duration = min(max(cint(slot_duration_minutes) or 60, 15), 480)
 
-		# Use ORM instead of raw SQL
-		existing_bookings = frappe.get_all(
-			"GRM Booking",
-			filters={
-				"space": space,
-				"booking_date": date,
-				"status": ["in", ["Draft", "Confirmed", "Checked-in"]],
-			},
-			fields=["start_time", "end_time"],
-		)
-
-		booked_ranges = []
-		for b in existing_bookings:
-			b_start = _parse_time_string(b.start_time)
-			b_end = _parse_time_string(b.end_time)
-			booked_ranges.append((b_start.hour + b_start.minute / 60, b_end.hour + b_end.minute / 60))
-
-		slots = []
-		current_time = working_start
-		while current_time + (slot_duration / 60) <= working_end:
-			slot_end = current_time + (slot_duration / 60)
-
-			is_available = True
-			for booked_start, booked_end in booked_ranges:
-				if not (slot_end <= booked_start or current_time >= booked_end):
-					is_available = False
-					break
-
-			start_hour = int(current_time)
-			start_minute = int((current_time - start_hour) * 60)
-			end_hour = int(slot_end)
-			end_minute = int((slot_end - end_hour) * 60)
-
-			slots.append({
-				"start_time": f"{start_hour:02d}:{start_minute:02d}",
-				"end_time": f"{end_hour:02d}:{end_minute:02d}",
-				"available": is_available,
-				"duration_minutes": slot_duration,
-			})
-
-			current_time = slot_end
+		booking_dt = getdate(date)
+		day = get_day_slots(
+			space, space_doc.location, [booking_dt], slot_duration,
+			statuses=ACTIVE_BOOKING_STATUSES,
+		)[booking_dt]
+		slots = day["slots"]
 
 		frappe.response["http_status_code"] = 200
 		return {
@@ -996,6 +1013,7 @@ def get_available_slots(space=None, date=None, slot_duration_minutes=60):
 			"data": {
 				"space": {"id": space_doc.name, "name": space_doc.space_name},
 				"date": date,
+				"closed": day["closed"],
 				"slots": slots,
 				"available_count": len([s for s in slots if s["available"]]),
 				"total_slots": len(slots),
@@ -1019,6 +1037,105 @@ def get_available_slots(space=None, date=None, slot_duration_minutes=60):
 		}
 
 
+# Longest range get_available_slots_range returns in one call
+MAX_SLOT_RANGE_DAYS = 31
+
+
+@frappe.whitelist(allow_guest=True)
+def get_available_slots_range(space=None, from_date=None, days=7, slot_duration_minutes=60):
+	"""Get available time slots for a space over several consecutive days.
+
+	Bookings for the whole range are read with a single query, so a week view
+	needs one call instead of one per day.
+
+	Returns:
+		200: {"days": [{"date", "closed", "slots", "available_count", "total_slots"}]}
+		400: Validation error
+		404: Space not found
+		409: Space not bookable/available
+		500: Server error
+	"""
+	try:
+		space = _validate_docname(space)
+		if not space or not from_date:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg("space and from_date are required", "المساحة وتاريخ البداية مطلوبان"),
+			}
+
+		try:
+			space_doc = frappe.get_cached_doc("GRM Space", space)
+		except frappe.DoesNotExistError:
+			frappe.clear_last_message()
+			frappe.response["http_status_code"] = 404
+			return {
+				"success": False,
+				"http_status_code": 404,
+				"message": _msg("Space not found", "المساحة غير موجودة"),
+			}
+
+		if not space_doc.allow_booking or space_doc.status != "Available":
+			frappe.response["http_status_code"] = 409
+			return {
+				"success": False,
+				"http_status_code": 409,
+				"message": _msg("Space is currently not available for booking", "المساحة غير متاحة للحجز حالياً"),
+				"data": {"days": []},
+			}
+
+		slot_duration = min(max(cint(slot_duration_minutes) or 60, 15), 480)
+		day_count = min(max(cint(days) or 7, 1), MAX_SLOT_RANGE_DAYS)
+
+		start = getdate(from_date)
+		dates = [add_days(start, i) for i in range(day_count)]
+		by_date = get_day_slots(
+			space, space_doc.location, dates, slot_duration,
+			statuses=ACTIVE_BOOKING_STATUSES,
+		)
+
+		result = []
+		for d in dates:
+			day = by_date[d]
+			result.append({
+				"date": str(d),
+				"closed": day["closed"],
+				"slots": day["slots"],
+				"available_count": len([sl for sl in day["slots"] if sl["available"]]),
+				"total_slots": len(day["slots"]),
+			})
+
+		frappe.response["http_status_code"] = 200
+		return {
+			"success": True,
+			"http_status_code": 200,
+			"message": _msg("Time slots retrieved successfully", "تم استرجاع الفترات الزمنية بنجاح"),
+			"data": {
+				"space": {"id": space_doc.name, "name": space_doc.space_name},
+				"from_date": str(dates[0]),
+				"to_date": str(dates[-1]),
+				"days": result,
+			},
+		}
+
+	except frappe.ValidationError:
+		frappe.response["http_status_code"] = 400
+		return {
+			"success": False,
+			"http_status_code": 400,
+			"message": _msg("Invalid input provided", "البيانات المدخلة غير صالحة"),
+		}
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Booking API Error")
+		frappe.response["http_status_code"] = 500
+		return {
+			"success": False,
+			"http_status_code": 500,
+			"message": _msg("An unexpected error occurred", "حدث خطأ غير متوقع"),
+		}
+
+
 @frappe.whitelist()
 def get_dashboard():
 	"""Get dashboard summary data for the current logged-in user.
@@ -1061,6 +1178,17 @@ def get_dashboard():
 				"data": empty_data,
 			}
 
+		# Served from the tenant's snapshot until one of its documents changes
+		snapshot = dashboard_cache.get_snapshot(tenant)
+		if snapshot is not None:
+			frappe.response["http_status_code"] = 200
+			return {
+				"success": True,
+				"http_status_code": 200,
+				"message": _msg("Dashboard data retrieved successfully", "تم استرجاع بيانات لوحة التحكم بنجاح"),
+				"data": snapshot,
+			}
+
 		today = nowdate()
 
 		# 1) Tenant info
@@ -1087,13 +1215,7 @@ def get_dashboard():
 		if tenant_doc.customer and frappe.db.exists("Customer", tenant_doc.customer):
 			invoice_filters = {"customer": tenant_doc.customer, "docstatus": 1}
 
-			total_invoiced = flt(frappe.db.get_value(
-				"Sales Invoice", invoice_filters, "sum(grand_total)"
-			))
-			total_outstanding_inv = flt(frappe.db.get_value(
-				"Sales Invoice", {**invoice_filters, "outstanding_amount": [">", 0]},
-				"sum(outstanding_amount)",
-			))
+			total_invoiced, total_outstanding_inv = _get_invoice_totals(tenant_doc.customer)
 			total_paid = total_invoiced - total_outstanding_inv
 
 			recent_invoices = frappe.get_all(
@@ -1155,36 +1277,8 @@ def get_dashboard():
 				"next_renewal_date": str(sub.next_renewal_date) if sub.next_renewal_date else None,
 			})
 
-		# 4) Booking stats (ORM)
-		total_bookings = frappe.db.count("GRM Booking", {"tenant": tenant})
-		active_bookings = frappe.db.count("GRM Booking", {
-			"tenant": tenant, "status": ["in", ["Confirmed", "Checked-in"]],
-		})
-		upcoming_count = frappe.db.count("GRM Booking", {
-			"tenant": tenant, "status": ["in", ["Draft", "Confirmed"]],
-			"booking_date": [">=", today],
-		})
-		completed_bookings = frappe.db.count("GRM Booking", {
-			"tenant": tenant, "status": "Checked-out",
-		})
-		cancelled_bookings = frappe.db.count("GRM Booking", {
-			"tenant": tenant, "status": "Cancelled",
-		})
-
-		total_spent = flt(frappe.db.get_value(
-			"GRM Booking",
-			{"tenant": tenant, "status": ["in", ["Confirmed", "Checked-in", "Checked-out"]]},
-			"sum(total_amount)",
-		))
-		outstanding_amount = flt(frappe.db.get_value(
-			"GRM Booking",
-			{
-				"tenant": tenant,
-				"payment_status": "Unpaid",
-				"status": ["in", ["Confirmed", "Checked-in", "Checked-out"]],
-			},
-			"sum(total_amount)",
-		))
+		# 4) Booking stats (one grouped aggregate)
+		booking_stats = _get_booking_stats(tenant, today)
 
 		# 5) Upcoming bookings (next 5)
 		upcoming_bookings = frappe.get_all(
@@ -1199,15 +1293,20 @@ def get_dashboard():
 			limit_page_length=5,
 		)
 
+		# 6) Recent bookings (last 5)
+		recent_bookings = frappe.get_all(
+			"GRM Booking",
+			filters={"tenant": tenant, "status": ["in", ["Checked-out", "Cancelled"]]},
+			fields=["name", "space", "status", "booking_date", "start_time", "end_time", "total_amount", "payment_status"],
+			order_by="booking_date desc, start_time desc",
+			limit_page_length=5,
+		)
+
+		# Space and location details for both lists in one query
+		space_map = get_space_info_map(b.space for b in upcoming_bookings + recent_bookings)
+
 		upcoming_list = []
 		for b in upcoming_bookings:
-			space_info = frappe.db.get_value(
-				"GRM Space", b.space,
-				["space_name", "space_name_ar", "location", "space_image"],
-				as_dict=True,
-			)
-			location_name = _get_space_location_name(space_info.location) if space_info and space_info.location else ""
-
 			upcoming_list.append({
 				"id": b.name,
 				"status": b.status,
@@ -1216,33 +1315,11 @@ def get_dashboard():
 				"end_time": str(b.end_time),
 				"total_amount": b.total_amount,
 				"payment_status": b.payment_status,
-				"space": {
-					"id": b.space,
-					"name": space_info.space_name if space_info else b.space,
-					"name_ar": space_info.space_name_ar if space_info else "",
-					"location": location_name,
-					"image": get_full_image_url(space_info.space_image) if space_info else None,
-				},
+				"space": _space_summary(b.space, space_map.get(b.space)),
 			})
 
-		# 6) Recent bookings (last 5)
-		recent_bookings = frappe.get_all(
-			"GRM Booking",
-			filters={"tenant": tenant, "status": ["in", ["Checked-out", "Cancelled"]]},
-			fields=["name", "space", "status", "booking_date", "start_time", "end_time", "total_amount", "payment_status"],
-			order_by="booking_date desc, start_time desc",
-			limit_page_length=5,
-		)
-
 		recent_list = []
 		for b in recent_bookings:
-			space_info = frappe.db.get_value(
-				"GRM Space", b.space,
-				["space_name", "space_name_ar", "location"],
-				as_dict=True,
-			)
-			location_name = _get_space_location_name(space_info.location) if space_info and space_info.location else ""
-
 			recent_list.append({
 				"id": b.name,
 				"status": b.status,
@@ -1251,35 +1328,25 @@ def get_dashboard():
 				"end_time": str(b.end_time),
 				"total_amount": b.total_amount,
 				"payment_status": b.payment_status,
-				"space": {
-					"id": b.space,
-					"name": space_info.space_name if space_info else b.space,
-					"name_ar": space_info.space_name_ar if space_info else "",
-					"location": location_name,
-				},
+				"space": _space_summary(b.space, space_map.get(b.space), with_image=False),
 			})
 
+		data = {
+			"tenant": tenant_data,
+			"customer": customer_data,
+			"subscriptions": subscriptions_list,
+			"booking_stats": booking_stats,
+			"upcoming": upcoming_list,
+			"recent": recent_list,
+		}
+		dashboard_cache.set_snapshot(tenant, data)
+
 		frappe.response["http_status_code"] = 200
 		return {
 			"success": True,
 			"http_status_code": 200,
 			"message": _msg("Dashboard data retrieved successfully", "تم استرجاع بيانات لوحة التحكم بنجاح"),
-			"data": {
-				"tenant": tenant_data,
-				"customer": customer_data,
-				"subscriptions": subscriptions_list,
-				"booking_stats": {
-					"total_bookings": total_bookings,
-					"active_bookings": active_bookings,
-					"upcoming_bookings": upcoming_count,
-					"completed_bookings": completed_bookings,
-					"cancelled_bookings": cancelled_bookings,
-					"total_spent": total_spent,
-					"outstanding_amount": outstanding_amount,
-				},
-				"upcoming": upcoming_list,
-				"recent": recent_list,
-			},
+			"data": data,
 		}
 
 	except Exception:
@@ -1290,3 +1357,28 @@ def get_dashboard():
 			"http_status_code": 500,
 			"message": _msg("An unexpected error occurred while loading dashboard", "حدث خطأ غير متوقع أثناء تحميل لوحة التحكم"),
 		}
+
+
+@frappe.whitelist()
+def get_dashboard_cache_stats(reset=0):
+	"""Get hit/miss counters of the tenant dashboard snapshot cache (System Manager only).
+
+	Args:
+		reset: Reset the counters after reading them (optional)
+
+	Returns:
+		200: {"hits", "misses", "hit_ratio"}
+	"""
+	frappe.only_for("System Manager")
+
+	stats = dashboard_cache.get_stats()
+	if cint(reset):
+		dashboard_cache.reset_stats()
+
+	frappe.response["http_status_code"] = 200
+	return {
+		"success": True,
+		"http_status_code": 200,
+		"message": _msg("Cache statistics retrieved successfully", "تم جلب إحصائيات التخزين المؤقت بنجاح"),
+		"data": stats,
+	}
@@ -3,6 +3,9 @@
 
 import frappe
 
+from grm_management.grm_management.utils.cms_cache import cached_response
+from grm_management.grm_management.utils.image_variants import get_image_variants_map
+
 
 def _msg(en, ar):
 	"""Return bilingual message dict."""
@@ -11,6 +14,11 @@ def _msg(en, ar):
 
 @frappe.whitelist(allow_guest=True)
 def get_our_customers():
+	"""Clients of the GRM Clients Page, cached with ETag / If-None-Match support."""
+	return cached_response("customers", _our_customers_payload)
+
+
+def _our_customers_payload():
 	"""Get clients from the GRM Clients Page, ordered by table row index.
 
 	Returns:
@@ -19,10 +27,12 @@ def get_our_customers():
 	"""
 	try:
 		doc = frappe.get_single("GRM Clients Page")
+		variants = get_image_variants_map()
 
 		result = [
 			{
 				"img": c.client_img,
+				"img_variants": variants(c.client_img),
 				"title": c.client_title,
 				"url": c.client_url,
 			}
@@ -4,6 +4,8 @@
 import frappe
 from frappe.utils import cstr, strip_html
 
+from grm_management.grm_management.utils.cms_cache import cached_response
+
 
 def _msg(en, ar):
     """Return bilingual message dict."""
@@ -79,6 +81,16 @@ DEFAULT_SEO = {
 }
 
 
+def _has_seo_meta():
+    """Whether the optional GRM SEO Meta doctype is installed (cached for an hour)."""
+    cache = frappe.cache()
+    exists = cache.get_value("grm_seo_meta_exists")
+    if exists is None:
+        exists = bool(frappe.db.exists("DocType", "GRM SEO Meta"))
+        cache.set_value("grm_seo_meta_exists", exists, expires_in_sec=60 * 60)
+    return exists
+
+
 @frappe.whitelist(allow_guest=True)
 def get_seo(page=None):
     """Get SEO metadata for a specific page.
@@ -104,7 +116,7 @@ def get_seo(page=None):
 
         # Check if a GRM SEO Meta doctype exists (admin-configurable override)
         seo_data = None
-        if frappe.db.exists("DocType", "GRM SEO Meta"):
+        if _has_seo_meta():
             seo_data = frappe.db.get_value(
                 "GRM SEO Meta",
                 {"page_slug": page},
@@ -159,6 +171,11 @@ def get_seo(page=None):
 
 @frappe.whitelist(allow_guest=True)
 def get_all_seo():
+    """SEO metadata of all pages, cached with ETag / If-None-Match support."""
+    return cached_response("seo", _all_seo_payload)
+
+
+def _all_seo_payload():
     """Get SEO metadata for all pages at once.
 
     Useful for SSR / preloading all meta in one call.
@@ -170,7 +187,7 @@ def get_all_seo():
         result = {}
 
         # Load from doctype if exists
-        if frappe.db.exists("DocType", "GRM SEO Meta"):
+        if _has_seo_meta():
             records = frappe.get_all(
                 "GRM SEO Meta",
                 fields=["page_slug", "title", "title_ar", "description", "description_ar", "keywords", "keywords_ar"],
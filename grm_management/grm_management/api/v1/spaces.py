@@ -2,7 +2,35 @@
 # For license information, please see license.txt
 
 import frappe
-from frappe.utils import get_url, cstr, strip_html
+from frappe.utils import get_url, cstr, strip_html, cint, flt, getdate, nowdate, add_days, date_diff
+
+from grm_management.grm_management.utils.availability import to_minutes, format_minutes
+from grm_management.grm_management.utils.image_variants import get_image_variants, get_image_variants_map
+from grm_management.grm_management.utils.space_catalog import (
+	AMENITY_FIELDS,
+	PRICE_FIELDS,
+	amenities_to_mask,
+	get_catalog as get_space_catalog,
+	mask_to_amenities,
+)
+
+# Booking statuses that occupy a space
+ACTIVE_BOOKING_STATUSES = ("Draft", "Confirmed", "Checked-in")
+
+# Display labels of the GRM Space amenity fields
+AMENITY_LABELS = {
+	"wifi": "WiFi",
+	"air_conditioning": "Air Conditioning",
+	"projector": "Projector",
+	"whiteboard": "Whiteboard",
+	"coffee_tea": "Coffee/Tea",
+	"parking": "Parking",
+	"printer_access": "Printer Access",
+	"phone_line": "Phone Line",
+}
+
+# Longest date range a single availability search may cover
+MAX_SEARCH_DAYS = 31
 
 
 def _msg(en, ar):
@@ -83,6 +111,10 @@ def get_spaces_by_type(location=None, status=None):
 							"daily_rate": 500,
 							"monthly_rate": 5000,
 							"space_image": "/files/office-a.jpg",
+							"space_image_variants": {
+								"width": 2400, "height": 1600,
+								"webp": "https://example.com/files/variants/3f2a9c1d0b7e4a65-160.webp 160w, ..."
+							},
 							"amenities": ["WiFi", "Air Conditioning", "Projector"]
 						}
 					],
@@ -113,96 +145,34 @@ def get_spaces_by_type(location=None, status=None):
 				),
 			}
 
-		# Build filters for spaces
-		filters = {}
+		catalog = get_space_catalog()
 
-		if location:
-			# Get location by name if passed
-			location_exists = frappe.db.exists("GRM Location", {"name": location})
-			if not location_exists:
-				# Try to find by location name
-				location_doc = frappe.db.get_value("GRM Location", {"location_name": location}, "name")
-				if location_doc:
-					filters["location"] = location_doc
-				else:
-					frappe.response["http_status_code"] = 404
-					return {
-						"success": False,
-						"http_status_code": 404,
-						"message": _msg("Location not found", "الموقع غير موجود"),
-					}
-			else:
-				filters["location"] = location
+		if location and location not in catalog.locations:
+			# Try to find by location name
+			location = next(
+				(l.name for l in catalog.locations.values() if l.location_name == location), None
+			)
+			if not location:
+				frappe.response["http_status_code"] = 404
+				return {
+					"success": False,
+					"http_status_code": 404,
+					"message": _msg("Location not found", "الموقع غير موجود"),
+				}
 
-		if status:
-			filters["status"] = status
+		spaces, _facets = catalog.search(location=location, status=status)
 
-		# Get all spaces with required fields
-		spaces = frappe.get_all(
-			"GRM Space",
-			filters=filters,
-			fields=[
-				"name",
-				"space_name",
-				"space_name_ar",
-				"space_code",
-				"location",
-				"property",
-				"space_type",
-				"status",
-				"is_featured",
-				"allow_booking",
-				"floor_number",
-				"room_number",
-				"area_sqm",
-				"capacity",
-				"min_booking_hours",
-				"hourly_rate",
-				"daily_rate",
-				"monthly_rate",
-				"annual_rate",
-				"minimum_charge",
-				"wifi",
-				"air_conditioning",
-				"projector",
-				"whiteboard",
-				"coffee_tea",
-				"parking",
-				"printer_access",
-				"phone_line",
-				"custom_amenities",
-				"description",
-				"space_image"
-			],
-			order_by="space_name asc"
-		)
+		# Active space types
+		type_map = {name: st for name, st in catalog.space_types.items() if st.is_active}
 
-		# Get all active space types
-		space_types = frappe.get_all(
-			"GRM Space Type",
-			filters={"is_active": 1},
-			fields=[
-				"name",
-				"space_type_name",
-				"space_type_name_ar",
-				"category",
-				"icon",
-				"color_code",
-				"default_capacity",
-				"typical_area_sqm",
-				"description",
-				"default_amenities",
-				"typical_usage"
-			],
-			order_by="space_type_name asc"
-		)
-
-		# Create a mapping for space types
-		type_map = {st.name: st for st in space_types}
+		# Location and property names come from the catalog as well
+		location_map = catalog.locations
+		property_map = catalog.properties
 
 		# Group spaces by type
 		grouped_data = {}
 
+		image_variants = get_image_variants_map()
 		for space in spaces:
 			space_type_id = space.get("space_type")
 
@@ -223,40 +193,21 @@ def get_spaces_by_type(location=None, status=None):
 				}
 
 			# Build amenities list
-			amenities = []
-			if space.get("wifi"):
-				amenities.append("WiFi")
-			if space.get("air_conditioning"):
-				amenities.append("Air Conditioning")
-			if space.get("projector"):
-				amenities.append("Projector")
-			if space.get("whiteboard"):
-				amenities.append("Whiteboard")
-			if space.get("coffee_tea"):
-				amenities.append("Coffee/Tea")
-			if space.get("parking"):
-				amenities.append("Parking")
-			if space.get("printer_access"):
-				amenities.append("Printer Access")
-			if space.get("phone_line"):
-				amenities.append("Phone Line")
+			amenities = [AMENITY_LABELS[field] for field in mask_to_amenities(space.amenity_mask)]
 
 			# Get location name (EN + AR)
 			location_name = ""
 			location_name_ar = ""
-			if space.get("location"):
-				loc_info = frappe.db.get_value(
-					"GRM Location", space.get("location"),
-					["location_name", "location_name_ar"], as_dict=True
-				)
-				if loc_info:
-					location_name = loc_info.location_name or space.get("location")
-					location_name_ar = loc_info.location_name_ar or ""
+			loc_info = location_map.get(space.get("location"))
+			if loc_info:
+				location_name = loc_info.location_name or space.get("location")
+				location_name_ar = loc_info.location_name_ar or ""
 
 			# Get property name
 			property_name = ""
 			if space.get("property"):
-				property_name = frappe.db.get_value("GRM Property", space.get("property"), "property_name") or space.get("property")
+				prop_info = property_map.get(space.get("property"))
+				property_name = (prop_info and prop_info.property_name) or space.get("property")
 
 			# Build full image URL
 			image_url = get_full_image_url(space.get("space_image"))
@@ -286,7 +237,8 @@ def get_spaces_by_type(location=None, status=None):
 				"amenities": amenities,
 				"custom_amenities": space.get("custom_amenities"),
 				"description": space.get("description"),
-				"space_image": image_url
+				"space_image": image_url,
+				"space_image_variants": image_variants(space.get("space_image"))
 			}
 
 			grouped_data[space_type_id]["spaces"].append(space_data)
@@ -317,6 +269,384 @@ def get_spaces_by_type(location=None, status=None):
 			"message": _msg("An unexpected error occurred", "حدث خطأ غير متوقع"),
 		}
 
+
+def _parse_list(value):
+	"""Accept a list, a JSON list or a comma separated string."""
+	if not value:
+		return []
+	if isinstance(value, str):
+		value = value.strip()
+		if value.startswith("["):
+			value = frappe.parse_json(value)
+		else:
+			value = value.split(",")
+	return [cstr(v).strip() for v in value if cstr(v).strip()]
+
+
+@frappe.whitelist(allow_guest=True)
+def search_spaces(location=None, space_type=None, min_capacity=None, max_capacity=None,
+		min_price=None, max_price=None, price_type="hourly", amenities=None,
+		status="Available", page=1, page_size=20):
+	"""Search the public space catalog with facet counts
+
+	This endpoint is publicly accessible (no authentication required).
+	Answered from the in-memory space catalog, without per-request queries.
+
+	Args:
+		location: Location ID(s), comma separated or JSON list (optional)
+		space_type: GRM Space Type ID(s), comma separated or JSON list (optional)
+		min_capacity / max_capacity: Capacity range (optional)
+		min_price / max_price: Price range for ``price_type`` (optional)
+		price_type: hourly, daily, monthly or annual (default hourly)
+		amenities: Amenity fields the space must all have, e.g. "wifi,parking" (optional)
+		status: Space status (default Available)
+		page: 1-based page number
+		page_size: Results per page (max 100)
+
+	Returns:
+		200: Paginated spaces plus facet counts for location, space_type, status and amenity
+		400: Validation error
+		500: Server error
+	"""
+	try:
+		price_field = f"{cstr(price_type).strip().lower()}_rate"
+		if price_field not in PRICE_FIELDS:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg(
+					"Invalid price type. Must be one of: hourly, daily, monthly, annual",
+					"نوع السعر غير صالح. يجب أن يكون واحدًا من: hourly, daily, monthly, annual"
+				),
+			}
+
+		amenities = _parse_list(amenities)
+		invalid = [a for a in amenities if a not in AMENITY_FIELDS]
+		if invalid:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg(
+					f"Invalid amenities: {', '.join(invalid)}. Must be among: {', '.join(AMENITY_FIELDS)}",
+					f"مرافق غير صالحة: {', '.join(invalid)}. يجب أن تكون من: {', '.join(AMENITY_FIELDS)}"
+				),
+			}
+
+		def number(value):
+			return flt(value) if value not in (None, "") else None
+
+		page = max(cint(page), 1)
+		page_size = min(max(cint(page_size), 1), 100)
+
+		catalog = get_space_catalog()
+		spaces, facets = catalog.search(
+			location=[_sanitize_text(l, 140) for l in _parse_list(location)],
+			space_type=[_sanitize_text(t, 140) for t in _parse_list(space_type)],
+			status=_sanitize_text(status, 30),
+			min_capacity=number(min_capacity),
+			max_capacity=number(max_capacity),
+			min_price=number(min_price),
+			max_price=number(max_price),
+			price_field=price_field,
+			amenities=amenities,
+		)
+
+		# Featured first, then by name (the catalog is already sorted by name)
+		spaces = sorted(spaces, key=lambda sp: not sp.is_featured)
+		offset = (page - 1) * page_size
+
+		image_variants = get_image_variants_map()
+		data = []
+		for space in spaces[offset:offset + page_size]:
+			loc = catalog.locations.get(space.location) or {}
+			st = catalog.space_types.get(space.space_type) or {}
+			data.append({
+				"id": space.name,
+				"space_name": space.space_name,
+				"space_name_ar": space.space_name_ar,
+				"space_code": space.space_code,
+				"space_type": space.space_type,
+				"space_type_name": st.get("space_type_name", space.space_type),
+				"space_type_name_ar": st.get("space_type_name_ar", ""),
+				"location": loc.get("location_name") or space.location,
+				"location_ar": loc.get("location_name_ar") or "",
+				"status": space.status,
+				"capacity": space.capacity,
+				"area_sqm": space.area_sqm,
+				"is_featured": space.is_featured,
+				"hourly_rate": space.hourly_rate,
+				"daily_rate": space.daily_rate,
+				"monthly_rate": space.monthly_rate,
+				"annual_rate": space.annual_rate,
+				"amenities": mask_to_amenities(space.amenity_mask),
+				"space_image": get_full_image_url(space.space_image),
+				"space_image_variants": image_variants(space.space_image),
+			})
+
+		frappe.response["http_status_code"] = 200
+		return {
+			"success": True,
+			"http_status_code": 200,
+			"message": _msg("Spaces retrieved successfully", "تم جلب المساحات بنجاح"),
+			"data": data,
+			"facets": facets,
+			"page": page,
+			"page_size": page_size,
+			"total": len(spaces),
+		}
+
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Spaces API Error")
+		frappe.response["http_status_code"] = 500
+		return {
+			"success": False,
+			"http_status_code": 500,
+			"message": _msg("An unexpected error occurred", "حدث خطأ غير متوقع"),
+		}
+
+
+def _parse_date_range(date_range):
+	"""Parse ``date_range`` into a list of dates.
+
+	Accepts a single date ("2026-03-01"), a "from,to" pair, or a JSON list /
+	{"from": ..., "to": ...} object. Raises frappe.ValidationError on bad input.
+	"""
+	if not date_range:
+		return [getdate(nowdate())]
+
+	if isinstance(date_range, str) and date_range.strip()[:1] in ("[", "{"):
+		date_range = frappe.parse_json(date_range)
+
+	if isinstance(date_range, dict):
+		bounds = [date_range.get("from"), date_range.get("to") or date_range.get("from")]
+	elif isinstance(date_range, (list, tuple)):
+		bounds = list(date_range)
+	else:
+		bounds = [b.strip() for b in cstr(date_range).split(",")]
+
+	if not bounds or len(bounds) > 2 or not bounds[0]:
+		frappe.throw("Invalid date_range", frappe.ValidationError)
+
+	from_date = getdate(bounds[0])
+	to_date = getdate(bounds[-1] or bounds[0])
+
+	if to_date < from_date:
+		frappe.throw("date_range end is before its start", frappe.ValidationError)
+	if date_diff(to_date, from_date) >= MAX_SEARCH_DAYS:
+		frappe.throw(f"date_range cannot exceed {MAX_SEARCH_DAYS} days", frappe.ValidationError)
+
+	return [add_days(from_date, i) for i in range(date_diff(to_date, from_date) + 1)]
+
+
+@frappe.whitelist(allow_guest=True)
+def search_availability(location=None, space_type=None, date_range=None, start_time=None,
+		end_time=None, capacity=None, require_all_days=0, page=1, page_size=20, amenities=None):
+	"""Find bookable GRM Spaces that are free in a time window over one or more days
+
+	This endpoint is publicly accessible (no authentication required).
+	All spaces and days are resolved with one query: every candidate space is
+	paired with every requested day and pairs that have an overlapping active
+	GRM Booking are dropped.
+
+	Args:
+		location: Location ID or location name (optional)
+		space_type: GRM Space Type ID (optional)
+		date_range: "YYYY-MM-DD", "YYYY-MM-DD,YYYY-MM-DD" or JSON list / {"from", "to"}
+			(optional, defaults to today; at most 31 days)
+		start_time: Window start HH:MM (optional, defaults to the whole day)
+		end_time: Window end HH:MM (optional, defaults to the whole day)
+		capacity: Minimum space capacity (optional)
+		require_all_days: Only return spaces free on every requested day (optional)
+		page: 1-based page number
+		page_size: Results per page (max 100)
+		amenities: Amenity fields the space must all have, e.g. "wifi,parking" (optional)
+
+	Returns:
+		200: Paginated spaces, each with the days it is free
+		400: Validation error
+		404: Location not found
+		500: Server error
+	"""
+	try:
+		location = _sanitize_text(location, 140)
+		space_type = _sanitize_text(space_type, 140)
+
+		try:
+			dates = _parse_date_range(date_range)
+			start = to_minutes(start_time) if start_time else 0
+			end = to_minutes(end_time) if end_time else 24 * 60
+		except Exception:
+			frappe.clear_last_message()
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg(
+					f"Invalid date_range or time. Use YYYY-MM-DD dates (max {MAX_SEARCH_DAYS} days) and HH:MM times",
+					f"نطاق التاريخ أو الوقت غير صالح. استخدم تواريخ YYYY-MM-DD (بحد أقصى {MAX_SEARCH_DAYS} يومًا) وأوقات HH:MM",
+				),
+			}
+
+		if end <= start:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg("end_time must be after start_time", "يجب أن يكون وقت النهاية بعد وقت البداية"),
+			}
+
+		dates = [d for d in dates if d >= getdate(nowdate())]
+		if not dates:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg("Cannot search past dates", "لا يمكن البحث في تواريخ سابقة"),
+			}
+
+		if location and not frappe.db.exists("GRM Location", location):
+			location = frappe.db.get_value("GRM Location", {"location_name": location}, "name")
+			if not location:
+				frappe.response["http_status_code"] = 404
+				return {
+					"success": False,
+					"http_status_code": 404,
+					"message": _msg("Location not found", "الموقع غير موجود"),
+				}
+
+		amenities = _parse_list(amenities)
+		invalid = [a for a in amenities if a not in AMENITY_FIELDS]
+		if invalid:
+			frappe.response["http_status_code"] = 400
+			return {
+				"success": False,
+				"http_status_code": 400,
+				"message": _msg(
+					f"Invalid amenities: {', '.join(invalid)}. Must be among: {', '.join(AMENITY_FIELDS)}",
+					f"مرافق غير صالحة: {', '.join(invalid)}. يجب أن تكون من: {', '.join(AMENITY_FIELDS)}"
+				),
+			}
+
+		page = max(cint(page), 1)
+		page_size = min(max(cint(page_size), 1), 100)
+
+		conditions = ["s.allow_booking = 1", "s.status = 'Available'"]
+		values = {
+			"statuses": ACTIVE_BOOKING_STATUSES,
+			"start_time": f"{format_minutes(start)}:00",
+			"end_time": f"{format_minutes(end)}:00" if end < 24 * 60 else "24:00:00",
+			"limit": page_size,
+			"offset": (page - 1) * page_size,
+		}
+		if location:
+			conditions.append("s.location = %(location)s")
+			values["location"] = location
+		if space_type:
+			conditions.append("s.space_type = %(space_type)s")
+			values["space_type"] = space_type
+		if amenities:
+			# Has every requested amenity: one bitwise test on the packed column
+			conditions.append("(s.amenity_mask & %(amenity_mask)s) = %(amenity_mask)s")
+			values["amenity_mask"] = amenities_to_mask(amenities)
+		if cint(capacity):
+			conditions.append("s.capacity >= %(capacity)s")
+			values["capacity"] = cint(capacity)
+
+		# Requested days as a derived table: (SELECT %(d0)s AS day UNION ALL ...)
+		day_selects = []
+		for i, d in enumerate(dates):
+			values[f"d{i}"] = str(d)
+			day_selects.append(f"SELECT %(d{i})s AS day")
+
+		having = ""
+		if cint(require_all_days):
+			having = "HAVING COUNT(*) = %(day_count)s"
+			values["day_count"] = len(dates)
+
+		rows = frappe.db.sql(f"""
+			SELECT
+				s.name, s.space_name, s.space_name_ar, s.space_code, s.space_type,
+				s.location, l.location_name, l.location_name_ar,
+				s.capacity, s.area_sqm, s.min_booking_hours, s.is_featured,
+				s.hourly_rate, s.daily_rate, s.space_image, s.amenity_mask,
+				free.free_dates, free.free_days,
+				COUNT(*) OVER () AS total_count
+			FROM (
+				SELECT s.name AS space,
+					GROUP_CONCAT(d.day ORDER BY d.day SEPARATOR ',') AS free_dates,
+					COUNT(*) AS free_days
+				FROM `tabGRM Space` s
+				CROSS JOIN ({" UNION ALL ".join(day_selects)}) d
+				WHERE {" AND ".join(conditions)}
+					AND NOT EXISTS (
+						SELECT 1 FROM `tabGRM Booking` b
+						WHERE b.space = s.name
+							AND b.booking_date = d.day
+							AND b.status IN %(statuses)s
+							AND b.start_time < %(end_time)s
+							AND b.end_time > %(start_time)s
+					)
+				GROUP BY s.name
+				{having}
+			) free
+			INNER JOIN `tabGRM Space` s ON s.name = free.space
+			LEFT JOIN `tabGRM Location` l ON l.name = s.location
+			ORDER BY s.is_featured DESC, s.space_name ASC
+			LIMIT %(limit)s OFFSET %(offset)s
+		""", values, as_dict=True)
+
+		total = rows[0].total_count if rows else 0
+
+		image_variants = get_image_variants_map()
+		data = []
+		for row in rows:
+			data.append({
+				"id": row.name,
+				"space_name": row.space_name,
+				"space_name_ar": row.space_name_ar,
+				"space_code": row.space_code,
+				"space_type": row.space_type,
+				"location": row.location_name or row.location,
+				"location_ar": row.location_name_ar or "",
+				"capacity": row.capacity,
+				"area_sqm": row.area_sqm,
+				"min_booking_hours": row.min_booking_hours,
+				"is_featured": row.is_featured,
+				"hourly_rate": row.hourly_rate,
+				"daily_rate": row.daily_rate,
+				"space_image": get_full_image_url(row.space_image),
+				"space_image_variants": image_variants(row.space_image),
+				"amenities": mask_to_amenities(row.amenity_mask),
+				"free_dates": row.free_dates.split(",") if row.free_dates else [],
+				"free_on_all_days": cint(row.free_days) == len(dates),
+			})
+
+		frappe.response["http_status_code"] = 200
+		return {
+			"success": True,
+			"http_status_code": 200,
+			"message": _msg("Available spaces retrieved successfully", "تم جلب المساحات المتاحة بنجاح"),
+			"data": data,
+			"dates": [str(d) for d in dates],
+			"start_time": format_minutes(start),
+			"end_time": format_minutes(end) if end < 24 * 60 else "24:00",
+			"page": page,
+			"page_size": page_size,
+			"total": total,
+		}
+
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Spaces API Error")
+		frappe.response["http_status_code"] = 500
+		return {
+			"success": False,
+			"http_status_code": 500,
+			"message": _msg("An unexpected error occurred", "حدث خطأ غير متوقع"),
+		}
+
+
 @frappe.whitelist(allow_guest=True)
 def get_space_by_id(id=None):
 	"""Get single GRM Space by ID (DocName), e.g. SPACE-2026-0004"""
@@ -469,6 +799,7 @@ def get_space_by_id(id=None):
 			"custom_amenities": space.get("custom_amenities"),
 			"description": space.get("description"),
 			"space_image": image_url,
+			"space_image_variants": get_image_variants(space.get("space_image")),
 			"space_type": {
 				"id": space.get("space_type"),
 				"name": type_info.get("space_type_name", space.get("space_type") or ""),
@@ -3,6 +3,12 @@
 
 import frappe
 
+from grm_management.grm_management.utils.cms_bundle import bundle_response
+from grm_management.grm_management.utils.cms_cache import cached_response, get_payload
+from grm_management.grm_management.utils.image_variants import get_image_variants_map
+from grm_management.grm_management.utils.space_catalog import AMENITY_BITS
+from grm_management.grm_management.utils.space_catalog import get_catalog as get_space_catalog
+
 
 def _msg(en, ar):
     """Return bilingual message dict."""
@@ -19,8 +25,7 @@ def _split_lines(text):
 # ---------------------------------------------------------------------------
 # Home Page
 # ---------------------------------------------------------------------------
-@frappe.whitelist(allow_guest=True)
-def get_home_page():
+def _home_page_payload():
     """Get all Home Page content for the website.
 
     Returns:
@@ -29,6 +34,7 @@ def get_home_page():
     """
     try:
         doc = frappe.get_single("GRM Home Page")
+        variants = get_image_variants_map()
 
         data = {
             "hero": {
@@ -38,12 +44,14 @@ def get_home_page():
                 "heading_3": doc.heading_3,
                 "paragraph": doc.paragraph,
                 "hero_img": doc.hero_img,
+                "hero_img_variants": variants(doc.hero_img),
             },
             "about": {
                 "experience": doc.experience,
                 "title": doc.about_title,
                 "description": doc.about_description,
                 "about_img": doc.about_img,
+                "about_img_variants": variants(doc.about_img),
             },
             "features": [
                 {"feature_icon": f.feature_icon, "title": f.title}
@@ -53,6 +61,7 @@ def get_home_page():
                 "title": doc.workflow_title,
                 "description": doc.workflow_description,
                 "workflow_img": doc.workflow_img,
+                "workflow_img_variants": variants(doc.workflow_img),
                 "items": [
                     {
                         "title": w.title,
@@ -76,10 +85,12 @@ def get_home_page():
             "testimonials": {
                 "title": doc.testimonials_title,
                 "img": doc.testimonials_img,
+                "img_variants": variants(doc.testimonials_img),
                 "items": [
                     {
                         "name": t.test_name,
                         "img": t.test_img,
+                        "img_variants": variants(t.test_img),
                         "rate": t.test_rate,
                         "description": t.test_description,
                     }
@@ -113,11 +124,16 @@ def get_home_page():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+def get_home_page():
+    """Home Page content, cached per language with ETag / If-None-Match support."""
+    return cached_response("home", _home_page_payload)
+
+
 # ---------------------------------------------------------------------------
 # About Page
 # ---------------------------------------------------------------------------
-@frappe.whitelist(allow_guest=True)
-def get_about_page():
+def _about_page_payload():
     """Get all About Page content for the website.
 
     Returns:
@@ -126,6 +142,7 @@ def get_about_page():
     """
     try:
         doc = frappe.get_single("GRM About Page")
+        variants = get_image_variants_map()
 
         data = {
             "about": {
@@ -137,11 +154,13 @@ def get_about_page():
                 "title": doc.services_title,
                 "description": doc.services_description,
                 "img": doc.service_img,
+                "img_variants": variants(doc.service_img),
                 "items": [
                     {
                         "title": s.title,
                         "description": s.description,
                         "img": s.img,
+                        "img_variants": variants(s.img),
                     }
                     for s in (doc.services or [])
                 ],
@@ -169,11 +188,16 @@ def get_about_page():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+def get_about_page():
+    """About Page content, cached per language with ETag / If-None-Match support."""
+    return cached_response("about", _about_page_payload)
+
+
 # ---------------------------------------------------------------------------
 # Clients Page
 # ---------------------------------------------------------------------------
-@frappe.whitelist(allow_guest=True)
-def get_clients_page():
+def _clients_page_payload():
     """Get all Clients Page content for the website.
 
     Returns:
@@ -182,11 +206,13 @@ def get_clients_page():
     """
     try:
         doc = frappe.get_single("GRM Clients Page")
+        variants = get_image_variants_map()
 
         data = {
             "clients": [
                 {
                     "img": c.client_img,
+                    "img_variants": variants(c.client_img),
                     "title": c.client_title,
                     "url": c.client_url,
                 }
@@ -215,11 +241,16 @@ def get_clients_page():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+def get_clients_page():
+    """Clients Page content, cached per language with ETag / If-None-Match support."""
+    return cached_response("clients", _clients_page_payload)
+
+
 # ---------------------------------------------------------------------------
 # Why GRM Page
 # ---------------------------------------------------------------------------
-@frappe.whitelist(allow_guest=True)
-def get_why_page():
+def _why_page_payload():
     """Get all Why GRM Page content for the website.
 
     Returns:
@@ -228,12 +259,14 @@ def get_why_page():
     """
     try:
         doc = frappe.get_single("GRM Why Page")
+        variants = get_image_variants_map()
 
         data = {
             "why": {
                 "title": doc.title,
                 "description": doc.description,
                 "img": doc.img,
+                "img_variants": variants(doc.img),
                 "img_badge": doc.img_badge,
                 "img_description": doc.img_description,
             },
@@ -269,11 +302,16 @@ def get_why_page():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+def get_why_page():
+    """Why GRM Page content, cached per language with ETag / If-None-Match support."""
+    return cached_response("why_grm", _why_page_payload)
+
+
 # ---------------------------------------------------------------------------
 # Contact Page
 # ---------------------------------------------------------------------------
-@frappe.whitelist(allow_guest=True)
-def get_contact_page():
+def _contact_page_payload():
     """Get all Contact Page content for the website.
 
     Returns:
@@ -326,6 +364,12 @@ def get_contact_page():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+def get_contact_page():
+    """Contact Page content, cached per language with ETag / If-None-Match support."""
+    return cached_response("contact", _contact_page_payload)
+
+
 # ---------------------------------------------------------------------------
 # Spaces (with all pricing)
 # ---------------------------------------------------------------------------
@@ -345,59 +389,15 @@ def get_spaces():
         space_type = frappe.form_dict.get("space_type")
         location = frappe.form_dict.get("location")
 
-        filters = {"status": "Available"}
-        if space_type:
-            filters["space_type"] = space_type
-        if location:
-            filters["location"] = location
-
-        spaces = frappe.get_all(
-            "GRM Space",
-            filters=filters,
-            fields=[
-                "name", "space_name", "space_name_ar", "space_code",
-                "space_type", "location", "property", "status",
-                "area_sqm", "capacity", "min_booking_hours",
-                "floor_number", "room_number",
-                "is_featured", "allow_booking",
-                "hourly_rate", "daily_rate", "monthly_rate", "annual_rate",
-                "minimum_charge",
-                "wifi", "air_conditioning", "projector", "whiteboard",
-                "coffee_tea", "parking", "printer_access", "phone_line",
-                "custom_amenities",
-                "description", "space_image",
-            ],
-            order_by="is_featured desc, space_name asc",
-        )
-
-        # Get space type info for grouping
-        space_types = {}
-        if spaces:
-            type_names = list({s.space_type for s in spaces if s.space_type})
-            if type_names:
-                types = frappe.get_all(
-                    "GRM Space Type",
-                    filters={"name": ["in", type_names]},
-                    fields=[
-                        "name", "space_type_name", "space_type_name_ar",
-                        "category", "icon", "color_code",
-                        "description", "typical_usage",
-                        "hourly_rate", "daily_rate", "monthly_rate", "annual_rate",
-                    ],
-                )
-                space_types = {t.name: t for t in types}
-
-        # Get location Arabic names
-        location_names = {}
-        if spaces:
-            loc_ids = list({s.location for s in spaces if s.location})
-            if loc_ids:
-                locs = frappe.get_all(
-                    "GRM Location",
-                    filters={"name": ["in", loc_ids]},
-                    fields=["name", "location_name_ar"],
-                )
-                location_names = {l.name: l.location_name_ar for l in locs}
+        catalog = get_space_catalog()
+        spaces, _facets = catalog.search(status="Available", space_type=space_type, location=location)
+
+        # Featured first, then by name (the catalog is already sorted by name)
+        spaces = sorted(spaces, key=lambda s: not s.is_featured)
+
+        # Space type info for grouping and location Arabic names, from the catalog
+        space_types = catalog.space_types
+        location_names = {name: l.location_name_ar for name, l in catalog.locations.items()}
 
         # Build amenities list from boolean fields
         amenity_fields = [
@@ -412,9 +412,10 @@ def get_spaces():
         ]
 
         # Group by space type
+        image_variants = get_image_variants_map()
         grouped = {}
         for s in spaces:
-            amenities = [label for field, label in amenity_fields if s.get(field)]
+            amenities = [label for field, label in amenity_fields if (s.amenity_mask or 0) & AMENITY_BITS[field]]
 
             st = space_types.get(s.space_type, {})
 
@@ -445,6 +446,7 @@ def get_spaces():
                 "custom_amenities": s.custom_amenities,
                 "description": s.description,
                 "space_image": s.space_image,
+                "space_image_variants": image_variants(s.space_image),
             }
 
             type_key = s.space_type or "Other"
@@ -512,11 +514,11 @@ def get_all_pages():
 
         # Collect each page, catching individual failures gracefully
         page_getters = {
-            "home": get_home_page,
-            "about": get_about_page,
-            "clients": get_clients_page,
-            "why_grm": get_why_page,
-            "contact": get_contact_page,
+            "home": lambda: get_payload("home", _home_page_payload),
+            "about": lambda: get_payload("about", _about_page_payload),
+            "clients": lambda: get_payload("clients", _clients_page_payload),
+            "why_grm": lambda: get_payload("why_grm", _why_page_payload),
+            "contact": lambda: get_payload("contact", _contact_page_payload),
             "spaces": get_spaces,
         }
 
@@ -549,3 +551,20 @@ def get_all_pages():
             "http_status_code": 500,
             "message": _msg("An unexpected error occurred", "حدث خطأ غير متوقع"),
         }
+
+
+# ---------------------------------------------------------------------------
+# Prebuilt bundle (all CMS pages + SEO)
+# ---------------------------------------------------------------------------
+@frappe.whitelist(allow_guest=True)
+def get_pages_bundle():
+    """Get all CMS pages and SEO metadata as one prebuilt, precompressed JSON bundle.
+
+    Meant for SSR cold renders. The bundle is rebuilt in the background when
+    CMS content changes; it does not include spaces (see get_spaces).
+
+    Returns:
+        200: {"pages": {...}, "seo": {...}, "generated_at": ...}, gzip/brotli encoded when accepted
+        304: Not modified (If-None-Match)
+    """
+    return bundle_response()
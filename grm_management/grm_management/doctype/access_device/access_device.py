@@ -4,7 +4,18 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import get_datetime
+import math
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from grm_management.grm_management.doctype.access_log.access_log import (
+	bulk_insert_access_logs,
+	get_existing_log_keys,
+	get_members_by_zk_user_id,
+)
+from grm_management.grm_management.utils import zk_pool
 
 
 class AccessDevice(Document):
@@ -40,35 +51,31 @@ class AccessDevice(Document):
 			if self.port < 1 or self.port > 65535:
 				frappe.throw(_("Port number must be between 1 and 65535"))
 
+	def set_status(self, status, error=None):
+		"""Persist status (and the connection error) only when they change"""
+		values = {}
+		if self.status != status:
+			values["status"] = status
+		if error and self.last_error != error:
+			values["last_error"] = error
+
+		self.status = status
+		if error:
+			self.last_error = error
+		if values:
+			self.db_set(values, update_modified=False)
+
 	def get_connection(self):
-		"""Get ZK device connection
+		"""Get a new, unpooled ZK device connection; the caller must disconnect it
+
+		Prefer ``zk_pool.connection(device)``, which reuses live connections.
 
 		Returns:
 			ZK object or None if connection failed
 		"""
 		try:
-			# Import pyzk library
-			from zk import ZK
-
-			# Create ZK connection
-			zk = ZK(
-				self.ip_address,
-				port=self.port,
-				timeout=5,
-				password=self.communication_key or 0,
-				force_udp=True if self.connectiontype == 'UDP' else False,
-				ommit_ping=False
-			)
-
-			# Connect to device
-			conn = zk.connect()
-
-			# Update status
-			self.status = 'Online'
-			self.last_sync_status = 'Success'
-			self.last_error = None
-			self.db_set('status', 'Online', update_modified=False)
-
+			conn = zk_pool.open_connection(self.get_zk_config())
+			self.set_status('Online')
 			return conn
 
 		except ImportError:
@@ -79,30 +86,21 @@ class AccessDevice(Document):
 		except Exception as e:
 			error_msg = str(e)
 			frappe.log_error(f"Error connecting to device {self.device_name}: {error_msg}", "ZK Connection Error")
-
-			# Update status
-			self.status = 'Offline'
-			self.last_sync_status = 'Failed'
-			self.last_error = error_msg
-			self.db_set('status', 'Offline', update_modified=False)
-			self.db_set('last_error', error_msg, update_modified=False)
-
+			self.set_status('Offline', error=error_msg)
 			return None
 
 	@frappe.whitelist()
 	def test_connection(self):
 		"""Test connection to ZK device"""
 		try:
-			conn = self.get_connection()
+			with zk_pool.connection(self) as conn:
+				if conn:
+					# Get device info
+					firmware = conn.get_firmware_version()
+					users_count = len(conn.get_users())
+					records_count = len(conn.get_attendance())
 
 			if conn:
-				# Get device info
-				firmware = conn.get_firmware_version()
-				users_count = len(conn.get_users())
-				records_count = len(conn.get_attendance())
-
-				conn.disconnect()
-
 				self.status = 'Online'
 				self.last_sync_time = frappe.utils.now()
 				self.last_sync_status = 'Success'
@@ -141,59 +139,67 @@ class AccessDevice(Document):
 		else:
 			return self._sync_attendance_direct_zk()
 
+	def get_zk_config(self):
+		"""Plain connection settings of this device, safe to hand to a worker thread"""
+		return {
+			"name": self.name,
+			"device_name": self.device_name,
+			"ip_address": self.ip_address,
+			"port": self.port,
+			"password": self.get_password("communication_key", raise_exception=False) or 0,
+			"force_udp": self.connectiontype == 'UDP',
+		}
+
 	def _sync_attendance_direct_zk(self):
 		"""Sync attendance logs from ZK device and create Access Log records"""
-		try:
-			conn = self.get_connection()
+		result = fetch_device_attendance(self.get_zk_config())
 
-			if not conn:
-				frappe.throw(_("Failed to connect to device"))
+		if result["error"]:
+			error_msg = result["error"]
+			frappe.log_error(f"Error syncing attendance from device {self.device_name}: {error_msg}", "ZK Sync Error")
+			set_device_sync_status(self.name, error=error_msg)
+			frappe.throw(_("Sync failed: {0}").format(error_msg))
 
-			# Get all attendance records
-			attendance = conn.get_attendance()
+		if not result["records"]:
+			frappe.msgprint(_("No attendance records found"), indicator="orange", alert=True)
+			return
 
-			if not attendance:
-				frappe.msgprint(_("No attendance records found"), indicator="orange", alert=True)
-				conn.disconnect()
-				return
-
-			# Track statistics
-			new_logs = 0
-			duplicate_logs = 0
-
-			for record in attendance:
-				# Check if log already exists
-				existing = frappe.db.exists("Access Log", {
-					"device": self.name,
-					"zk_user_id": str(record.user_id),
-					"event_time": record.timestamp
-				})
-
-				if existing:
-					duplicate_logs += 1
-					continue
+		try:
+			new_logs, duplicate_logs = ingest_device_attendance(self, result["records"])
+		except Exception as e:
+			error_msg = str(e)
+			frappe.log_error(f"Error syncing attendance from device {self.device_name}: {error_msg}", "ZK Sync Error")
+			set_device_sync_status(self.name, error=error_msg)
+			frappe.throw(_("Sync failed: {0}").format(error_msg))
 
-				# Find member by ZK User ID
-				member = frappe.db.get_value("Member", {"zk_user_id": str(record.user_id)}, "name")
+		set_device_sync_status(self.name)
 
-				# Create Access Log
-				log = frappe.new_doc("Access Log")
-				log.device = self.name
-				log.zk_user_id = str(record.user_id)
-				log.event_time = record.timestamp
-				log.event_type = "Check-In" if record.punch == 0 else "Check-Out"
+		frappe.msgprint(
+			_("Sync completed. New logs: {0}, Duplicates: {1}").format(new_logs, duplicate_logs),
+			indicator="green",
+			alert=True
+		)
 
-				if member:
-					log.member = member
+		return {
+			"success": True,
+			"new_logs": new_logs,
+			"duplicate_logs": duplicate_logs
+		}
 
-				# Set location from device
-				if self.location:
-					log.location = self.location
+	def _sync_attendance_biotime(self):
+		"""Sync attendance via BioTime API for this specific device"""
+		try:
+			# Get BioTime settings
+			biotime_settings = frappe.get_doc("BioTime Settings", "BioTime Settings")
 
-				log.insert(ignore_permissions=True)
-				new_logs += 1
+			if not biotime_settings.enabled:
+				frappe.throw(_("BioTime integration is not enabled. Please configure BioTime Settings."))
 
-			conn.disconnect()
+			# Fetch attendance for this device only, from its own high-water mark
+			result = biotime_settings.fetch_and_ingest(terminal_sn=self.serial_number)
+			total_fetched = result["total_fetched"]
+			new_logs = result["new_logs"]
+			duplicate_logs = result["duplicate_logs"]
 
 			# Update sync status
 			self.last_sync_time = frappe.utils.now()
@@ -202,119 +208,299 @@ class AccessDevice(Document):
 			self.save()
 
 			frappe.msgprint(
-				_("Sync completed. New logs: {0}, Duplicates: {1}").format(new_logs, duplicate_logs),
+				_("BioTime sync completed. Total: {0}, New: {1}, Duplicates: {2}").format(
+					total_fetched, new_logs, duplicate_logs
+				),
 				indicator="green",
 				alert=True
 			)
 
 			return {
 				"success": True,
+				"total_fetched": total_fetched,
 				"new_logs": new_logs,
 				"duplicate_logs": duplicate_logs
 			}
 
 		except Exception as e:
 			error_msg = str(e)
-			frappe.log_error(f"Error syncing attendance from device {self.device_name}: {error_msg}", "ZK Sync Error")
+			frappe.log_error(f"Error syncing attendance via BioTime: {error_msg}", "BioTime Device Sync Error")
 
 			self.last_sync_status = 'Failed'
 			self.last_error = error_msg
 			self.save()
 
-			frappe.throw(_("Sync failed: {0}").format(error_msg))
+			frappe.throw(_("BioTime sync failed: {0}").format(error_msg))
 
-	def _sync_attendance_biotime(self):
-		"""Sync attendance via BioTime API for this specific device"""
-		try:
-			# Get BioTime settings
-			biotime_settings = frappe.get_doc("BioTime Settings", "BioTime Settings")
 
-			if not biotime_settings.enabled:
-				frappe.throw(_("BioTime integration is not enabled. Please configure BioTime Settings."))
+# Parallel Direct ZK attendance sync
 
-			biotime_settings.ensure_token_valid()
+# Devices pulled at the same time by sync_direct_devices
+ZK_SYNC_WORKERS = 8
 
-			# Fetch attendance for this device only
-			url = f"{biotime_settings.get_base_url()}/iclock/api/transactions/"
+# pyzk socket timeout per device, in seconds
+ZK_FETCH_TIMEOUT = 5
 
-			# Use last sync time or default to 7 days ago
-			from_date = self.last_sync_time.date() if self.last_sync_time else frappe.utils.add_days(frappe.utils.nowdate(), -7)
-			to_date = frappe.utils.nowdate()
+# Fetched records deduped and inserted per round trip
+ZK_INGEST_CHUNK = 5000
 
-			params = {
-				"start_date": from_date,
-				"end_date": to_date,
-				"terminal_sn": self.serial_number,  # Filter by this device's serial number
-				"page_size": 100,
-				"page": 1
-			}
+# Wall-clock budget of one device's fetch (connect + download), in seconds
+DEVICE_SYNC_BUDGET = 60
 
-			new_logs = 0
-			duplicate_logs = 0
-			total_fetched = 0
 
-			while True:
-				response = frappe.requests.get(url, headers=biotime_settings.get_headers(), params=params, timeout=30)
+def fetch_device_attendance(config, timeout=ZK_FETCH_TIMEOUT):
+	"""Download a device's attendance records over pyzk
 
-				if response.status_code != 200:
-					error_msg = f"Failed to fetch attendance: {response.status_code}"
-					frappe.log_error(error_msg, "BioTime Device Sync Error")
-					break
+	Runs in worker threads, so it must not touch frappe (no db, no cache,
+	no local). Errors are returned rather than raised.
 
-				data = response.json()
-				results = data.get("data", [])
+	Args:
+		config: Dict from AccessDevice.get_zk_config()
+		timeout: pyzk socket timeout in seconds
 
-				if not results:
-					break
+	Returns:
+		dict: device, records [(zk_user_id, timestamp, punch)], error, duration
+	"""
+	started = time.monotonic()
+	records = []
+	error = None
+	conn = None
 
-				total_fetched += len(results)
+	try:
+		conn = zk_pool.open_connection(config, timeout=timeout)
+		records = [(str(r.user_id), r.timestamp, r.punch) for r in conn.get_attendance() or []]
 
-				# Process each attendance record
-				for record in results:
-					created = biotime_settings._create_access_log_from_biotime(record)
-					if created:
-						new_logs += 1
-					else:
-						duplicate_logs += 1
+	except ImportError:
+		error = "pyzk library not installed. Run: pip install pyzk"
+	except Exception as e:
+		error = str(e) or e.__class__.__name__
+	finally:
+		if conn:
+			try:
+				conn.disconnect()
+			except Exception:
+				pass
 
-				frappe.db.commit()
+	return {
+		"device": config["name"],
+		"records": records,
+		"error": error,
+		"duration": round(time.monotonic() - started, 3),
+	}
 
-				# Check if there are more pages
-				if not data.get("next"):
-					break
 
-				params["page"] += 1
+def get_device_watermark(device_name):
+	"""Return the latest event_time already logged for a device, or None"""
+	return frappe.db.sql(
+		"SELECT MAX(`event_time`) FROM `tabAccess Log` WHERE `device` = %s", device_name
+	)[0][0]
 
-			# Update sync status
-			self.last_sync_time = frappe.utils.now()
-			self.last_sync_status = 'Success'
-			self.last_error = None
-			self.save()
 
-			frappe.msgprint(
-				_("BioTime sync completed. Total: {0}, New: {1}, Duplicates: {2}").format(
-					total_fetched, new_logs, duplicate_logs
-				),
-				indicator="green",
-				alert=True
-			)
+def ingest_device_attendance(device, records):
+	"""Create Access Logs for records fetched from ``device``
 
-			return {
-				"success": True,
-				"total_fetched": total_fetched,
-				"new_logs": new_logs,
-				"duplicate_logs": duplicate_logs
-			}
+	Records older than the device's newest logged punch are dropped in
+	memory; the rest are deduped and resolved to members with one query per
+	chunk, and written with bulk inserts.
 
+	Args:
+		device: Access Device document
+		records: List of (zk_user_id, timestamp, punch) tuples
+
+	Returns:
+		tuple: (new_logs, duplicate_logs)
+	"""
+	watermark = get_device_watermark(device.name)
+	punches = []
+	for zk_user_id, timestamp, punch in records:
+		if not zk_user_id or not timestamp:
+			continue
+		timestamp = get_datetime(timestamp)
+		# Equal timestamps are kept: another user may have punched in the same second
+		if watermark and timestamp < watermark:
+			continue
+		punches.append((zk_user_id, timestamp, punch))
+
+	duplicate_logs = len(records) - len(punches)
+	new_logs = 0
+	punches.sort(key=lambda p: p[1])
+
+	for i in range(0, len(punches), ZK_INGEST_CHUNK):
+		chunk = punches[i:i + ZK_INGEST_CHUNK]
+
+		existing = get_existing_log_keys(
+			(p[0] for p in chunk), (p[1] for p in chunk), device=device.name
+		)
+		members = get_members_by_zk_user_id(p[0] for p in chunk)
+
+		logs = []
+		for zk_user_id, timestamp, punch in chunk:
+			key = (zk_user_id, timestamp)
+			if key in existing:
+				duplicate_logs += 1
+				continue
+			existing.add(key)
+
+			member = members.get(zk_user_id)
+			logs.append({
+				# Deterministic, so a re-fetched punch maps to the same unique log_id
+				"log_id": f"{device.name}-{zk_user_id}-{timestamp:%Y%m%d%H%M%S}",
+				"device": device.name,
+				"location": device.location,
+				"zk_user_id": zk_user_id,
+				"event_time": timestamp,
+				"event_type": "Entry" if punch == 0 else "Exit",
+				"member": member.name if member else None,
+				"member_name": member.member_name if member else None,
+			})
+
+		new_logs += bulk_insert_access_logs(logs)
+
+	return new_logs, duplicate_logs
+
+
+def set_device_sync_status(device_name, error=None):
+	"""Record the outcome of a sync on the device with a single UPDATE"""
+	if error:
+		values = {
+			"status": "Offline",
+			"last_sync_status": "Failed",
+			"last_error": error,
+		}
+	else:
+		values = {
+			"status": "Online",
+			"last_sync_time": frappe.utils.now(),
+			"last_sync_status": "Success",
+			"last_error": None,
+		}
+	frappe.db.set_value("Access Device", device_name, values, update_modified=False)
+
+
+def _next_wait(pending, started, budget, start_deadline):
+	"""Seconds until the earliest running device budget or the start deadline runs out"""
+	now = time.monotonic()
+	deadlines = [started[name] + budget for name in pending.values() if name in started]
+	if len(deadlines) < len(pending):
+		deadlines.append(start_deadline)
+	return max(min(deadlines) - now, 0)
+
+
+def sync_direct_devices(device_names, max_workers=ZK_SYNC_WORKERS, budget=DEVICE_SYNC_BUDGET):
+	"""Pull attendance from many Direct ZK devices concurrently
+
+	Device I/O runs on a thread pool; every fetched batch is written from the
+	calling thread (the only one with a database connection), committing per
+	device. Each device's budget starts when its fetch starts, and any
+	fetch that completes is ingested. A device still running past its
+	budget, or still queued once every device could have had its turn, is
+	reported as timed out and its thread is abandoned.
+
+	Returns:
+		list: One summary dict per device (device, device_name, status,
+			fetched, new_logs, duplicate_logs, fetch_seconds, write_seconds, error)
+	"""
+	devices = {name: frappe.get_doc("Access Device", name) for name in device_names}
+	if not devices:
+		return []
+
+	summary = {
+		name: {
+			"device": name,
+			"device_name": doc.device_name,
+			"status": "Timed Out",
+			"fetched": 0,
+			"new_logs": 0,
+			"duplicate_logs": 0,
+			"fetch_seconds": None,
+			"write_seconds": 0,
+			"error": None,
+		}
+		for name, doc in devices.items()
+	}
+
+	workers = max(1, min(max_workers, len(devices)))
+	timeout = min(ZK_FETCH_TIMEOUT, budget)
+
+	# Set by each worker thread when its fetch starts; the budget counts from there
+	started = {}
+
+	def timed_fetch(config):
+		started[config["name"]] = time.monotonic()
+		return fetch_device_attendance(config, timeout)
+
+	def handle(result):
+		row = summary[result["device"]]
+		row["fetch_seconds"] = result["duration"]
+		row["fetched"] = len(result["records"])
+
+		if result["error"]:
+			row["status"] = "Failed"
+			row["error"] = result["error"]
+			set_device_sync_status(result["device"], error=result["error"])
+			frappe.db.commit()
+			return
+
+		write_started = time.monotonic()
+		try:
+			row["new_logs"], row["duplicate_logs"] = ingest_device_attendance(
+				devices[result["device"]], result["records"]
+			)
+			set_device_sync_status(result["device"])
+			frappe.db.commit()
+			row["status"] = "Success"
 		except Exception as e:
-			error_msg = str(e)
-			frappe.log_error(f"Error syncing attendance via BioTime: {error_msg}", "BioTime Device Sync Error")
+			frappe.db.rollback()
+			row["status"] = "Failed"
+			row["error"] = str(e)
+			set_device_sync_status(result["device"], error=str(e))
+			frappe.db.commit()
+		row["write_seconds"] = round(time.monotonic() - write_started, 3)
+
+	executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zk-sync")
+	pending = {
+		executor.submit(timed_fetch, doc.get_zk_config()): name
+		for name, doc in devices.items()
+	}
+	# Devices queue behind each other once all workers are busy; give up on ones that never start
+	start_deadline = time.monotonic() + budget * math.ceil(len(devices) / workers)
 
-			self.last_sync_status = 'Failed'
-			self.last_error = error_msg
-			self.save()
+	try:
+		while pending:
+			done, _not_done = wait(pending, timeout=_next_wait(pending, started, budget, start_deadline),
+				return_when=FIRST_COMPLETED)
+
+			# Whatever completed is ingested, however long it took
+			for future in done:
+				pending.pop(future)
+				handle(future.result())
+
+			# Abandon devices past their own budget, or never started in time
+			now = time.monotonic()
+			for future, name in list(pending.items()):
+				if future.done():
+					continue
+				began = started.get(name)
+				if (began is not None and now - began > budget) or (began is None and now > start_deadline):
+					pending.pop(future)
+
+	finally:
+		executor.shutdown(wait=False, cancel_futures=True)
+
+	for row in summary.values():
+		if row["status"] == "Timed Out":
+			row["error"] = _("No response within {0}s").format(budget)
+			set_device_sync_status(row["device"], error=row["error"])
+	frappe.db.commit()
+
+	for row in summary.values():
+		if row["error"]:
+			frappe.log_error(
+				f"Error syncing Direct ZK device {row['device_name']}: {row['error']}",
+				"Scheduled Device Sync Error"
+			)
 
-			frappe.throw(_("BioTime sync failed: {0}").format(error_msg))
+	return list(summary.values())
 
 
 # Utility functions for ZK device operations
@@ -335,23 +521,21 @@ def add_user_to_device(device_name, zk_user_id, name, card_number=None, privileg
 	"""
 	try:
 		device = frappe.get_doc("Access Device", device_name)
-		conn = device.get_connection()
-
-		if not conn:
-			return False
-
-		# Add user
-		conn.set_user(
-			uid=int(zk_user_id),
-			name=name[:24],
-			privilege=int(privilege),
-			password='',
-			group_id='',
-			user_id=str(zk_user_id),
-			card=card_number or ''
-		)
 
-		conn.disconnect()
+		with zk_pool.connection(device) as conn:
+			if not conn:
+				return False
+
+			# Add user
+			conn.set_user(
+				uid=int(zk_user_id),
+				name=name[:24],
+				privilege=int(privilege),
+				password='',
+				group_id='',
+				user_id=str(zk_user_id),
+				card=card_number or ''
+			)
 
 		return True
 
@@ -373,15 +557,13 @@ def remove_user_from_device(device_name, zk_user_id):
 	"""
 	try:
 		device = frappe.get_doc("Access Device", device_name)
-		conn = device.get_connection()
-
-		if not conn:
-			return False
 
-		# Delete user
-		conn.delete_user(uid=int(zk_user_id))
+		with zk_pool.connection(device) as conn:
+			if not conn:
+				return False
 
-		conn.disconnect()
+			# Delete user
+			conn.delete_user(uid=int(zk_user_id))
 
 		return True
 
@@ -402,15 +584,13 @@ def clear_device_attendance(device_name):
 	"""
 	try:
 		device = frappe.get_doc("Access Device", device_name)
-		conn = device.get_connection()
-
-		if not conn:
-			return False
 
-		# Clear attendance data
-		conn.clear_attendance()
+		with zk_pool.connection(device) as conn:
+			if not conn:
+				return False
 
-		conn.disconnect()
+			# Clear attendance data
+			conn.clear_attendance()
 
 		frappe.msgprint(_("Attendance data cleared from device"), indicator="green", alert=True)
 
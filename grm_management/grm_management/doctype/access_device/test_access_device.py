@@ -1,9 +1,38 @@
 # Copyright (c) 2026, Wael ELsafty and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from grm_management.grm_management.doctype.access_device.access_device import ingest_device_attendance
+
 
 class TestAccessDevice(FrappeTestCase):
-	pass
+	def setUp(self):
+		# Bulk inserts skip link validation, so a plain dict stands in for the device
+		self.device = frappe._dict(name="TEST-ZK-INGEST", location=None)
+		frappe.db.delete("Access Log", {"device": self.device.name})
+
+	def test_direct_zk_punches_are_stored(self):
+		records = [
+			("1001", "2026-10-17 08:00:00", 0),
+			("1002", "2026-10-17 08:00:00", 0),
+			("1001", "2026-10-17 17:30:00", 1),
+			("1001", "2026-10-17 17:30:00", 1),  # same punch read twice
+		]
+
+		self.assertEqual(ingest_device_attendance(self.device, records), (3, 1))
+
+		logs = frappe.get_all(
+			"Access Log", filters={"device": self.device.name},
+			fields=["log_id", "zk_user_id", "event_type"], order_by="event_time, zk_user_id",
+		)
+		self.assertEqual([l.log_id for l in logs], [
+			"TEST-ZK-INGEST-1001-20261017080000",
+			"TEST-ZK-INGEST-1002-20261017080000",
+			"TEST-ZK-INGEST-1001-20261017173000",
+		])
+		self.assertEqual([l.event_type for l in logs], ["Entry", "Entry", "Exit"])
+
+		# Fetching the same punches again stores nothing new
+		self.assertEqual(ingest_device_attendance(self.device, records[-1:]), (0, 1))
@@ -1,9 +1,150 @@
 # Copyright (c) 2026, Wael ELsafty and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import get_datetime, now_datetime
 
 
 class AccessLog(Document):
 	pass
+
+
+# Columns written by bulk_insert_access_logs (besides the standard ones)
+BULK_LOG_FIELDS = (
+	"log_id", "device", "location", "event_time", "event_type",
+	"verification_type", "zk_user_id", "member", "member_name",
+)
+
+
+def get_existing_log_keys(zk_user_ids, event_times, device=None):
+	"""Return the (zk_user_id, event_time) pairs that already have an Access Log
+
+	One query for a whole batch: candidates are narrowed by user id and the
+	batch's time range, then matched exactly in Python.
+	"""
+	zk_user_ids = list({str(u) for u in zk_user_ids if u})
+	event_times = [get_datetime(t) for t in event_times if t]
+	if not zk_user_ids or not event_times:
+		return set()
+
+	filters = {
+		"zk_user_id": ["in", zk_user_ids],
+		"event_time": ["between", [min(event_times), max(event_times)]],
+	}
+	if device:
+		filters["device"] = device
+
+	rows = frappe.get_all(
+		"Access Log",
+		filters=filters,
+		fields=["zk_user_id", "event_time"],
+		limit_page_length=0,
+	)
+	return {(r.zk_user_id, get_datetime(r.event_time)) for r in rows}
+
+
+def make_access_log_names(count):
+	"""Reserve ``count`` consecutive names of the LOG-.YYYY.-.##### series with one update"""
+	prefix = f"LOG-{now_datetime().year}-"
+
+	current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", prefix)
+	if current:
+		start = current[0][0] or 0
+		frappe.db.sql("UPDATE `tabSeries` SET `current` = %s WHERE `name` = %s", (start + count, prefix))
+	else:
+		start = 0
+		frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count))
+
+	return [f"{prefix}{i:05d}" for i in range(start + 1, start + count + 1)]
+
+
+def bulk_insert_access_logs(logs):
+	"""Insert Access Logs with multi-row INSERTs instead of one document insert each
+
+	The bulk insert bypasses document validation, so rows missing a mandatory
+	field (e.g. the device of a punch from an unregistered terminal) are
+	skipped and reported in one Error Log instead of being stored.
+
+	Args:
+		logs: List of dicts keyed by BULK_LOG_FIELDS (missing keys are stored as NULL)
+
+	Returns:
+		int: Number of rows inserted
+	"""
+	if not logs:
+		return 0
+
+	mandatory = [
+		df.fieldname for df in frappe.get_meta("Access Log").fields
+		if df.reqd and df.fieldname in BULK_LOG_FIELDS
+	]
+	valid = []
+	missing = {}
+	for log in logs:
+		absent = [f for f in mandatory if log.get(f) in (None, "")]
+		if absent:
+			for f in absent:
+				missing[f] = missing.get(f, 0) + 1
+		else:
+			valid.append(log)
+
+	if missing:
+		frappe.log_error(
+			f"Skipped {len(logs) - len(valid)} access logs missing mandatory fields: "
+			+ ", ".join(f"{f} ({count})" for f, count in missing.items()),
+			"Access Log Bulk Insert Skipped",
+		)
+
+	if not valid:
+		return 0
+
+	names = make_access_log_names(len(valid))
+	now = now_datetime()
+	user = frappe.session.user
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus", *BULK_LOG_FIELDS]
+	values = [
+		(name, now, now, user, user, 0, *(log.get(f) for f in BULK_LOG_FIELDS))
+		for name, log in zip(names, valid, strict=True)
+	]
+
+	frappe.db.bulk_insert("Access Log", fields, values)
+	return len(values)
+
+
+def get_members_by_zk_user_id(zk_user_ids):
+	"""Return {zk_user_id: {"name", "member_name"}} for Members with the given ZK user ids, in one query"""
+	zk_user_ids = list({str(u) for u in zk_user_ids if u})
+	if not zk_user_ids:
+		return {}
+
+	rows = frappe.get_all(
+		"Member",
+		filters={"zk_user_id": ["in", zk_user_ids]},
+		fields=["name", "member_name", "zk_user_id"],
+		limit_page_length=0,
+	)
+	return {r.zk_user_id: r for r in rows}
+
+
+def get_member_locations(members):
+	"""Return {member: location} from the first space of each member's active GRM Contract, in one query"""
+	members = list({m for m in members if m})
+	if not members:
+		return {}
+
+	rows = frappe.db.sql("""
+		SELECT c.member, s.location
+		FROM `tabGRM Contract` c
+		INNER JOIN `tabContract Space` cs
+			ON cs.parent = c.name AND cs.parenttype = 'GRM Contract'
+		INNER JOIN `tabSpace` s ON s.name = cs.space
+		WHERE c.status = 'Active' AND c.member IN %(members)s
+		ORDER BY c.member, c.creation, cs.idx
+	""", {"members": members}, as_dict=True)
+
+	locations = {}
+	for r in rows:
+		locations.setdefault(r.member, r.location)
+	return locations
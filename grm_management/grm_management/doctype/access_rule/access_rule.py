@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 
+from grm_management.grm_management.utils import access_policy, device_provisioning
+
 
 class AccessRule(Document):
 	def validate(self):
@@ -13,6 +15,14 @@ class AccessRule(Document):
 		self._validate_dates()
 		self._set_rule_name()
 
+	def on_update(self):
+		"""Drop compiled access policies"""
+		access_policy.invalidate()
+
+	def on_trash(self):
+		"""Drop compiled access policies"""
+		access_policy.invalidate()
+
 	def after_insert(self):
 		"""Sync to devices after creating access rule"""
 		self.sync_to_devices()
@@ -44,7 +54,7 @@ class AccessRule(Document):
 
 	@frappe.whitelist()
 	def sync_to_devices(self):
-		"""Sync user access to all devices in the rule"""
+		"""Queue adding the member to all devices in the rule"""
 		if not self.member:
 			frappe.throw(_("Member is required for syncing to devices"))
 
@@ -53,113 +63,44 @@ class AccessRule(Document):
 			return
 
 		# Get member's ZK User ID
-		member = frappe.get_doc("Member", self.member)
+		member = frappe.db.get_value(
+			"Member", self.member, ["member_name", "zk_user_id", "access_card_number"], as_dict=True
+		)
 		if not member.zk_user_id:
 			frappe.throw(_("Member {0} has no ZK User ID assigned").format(member.member_name))
 
-		synced_count = 0
-		errors = []
+		queued = self._queue_device_operation("add", member)
 
-		# Sync to each device
-		for device_row in self.devices or []:
-			try:
-				device = frappe.get_doc("Access Device", device_row.access_device)
-
-				# Get device connection
-				zk = device.get_connection()
-				if not zk:
-					errors.append(f"{device.device_name}: Connection failed")
-					continue
-
-				# Add user to device
-				success = self._add_user_to_device(zk, member, device)
-
-				if success:
-					synced_count += 1
-					device_row.sync_status = "Synced"
-					device_row.last_sync = frappe.utils.now()
-				else:
-					device_row.sync_status = "Failed"
-					errors.append(f"{device.device_name}: Failed to add user")
-
-			except Exception as e:
-				device_row.sync_status = "Failed"
-				errors.append(f"{device_row.access_device}: {str(e)}")
-				frappe.log_error(f"Error syncing to device {device_row.access_device}: {str(e)}", "Access Rule Sync Error")
-
-		self.save()
-
-		if synced_count > 0:
-			frappe.msgprint(_("Synced to {0} device(s)").format(synced_count), indicator="green", alert=True)
-		if errors:
-			frappe.msgprint(_("Errors: {0}").format(", ".join(errors)), indicator="red", alert=True)
-
-	def _add_user_to_device(self, zk, member, device):
-		"""Add user to ZK device with time restrictions"""
-		try:
-			# User details
-			user_id = int(member.zk_user_id)
-			name = member.member_name[:24]  # ZK has name length limit
-			card_no = member.access_card_number or ""
-
-			# Add user to device
-			# Note: Actual ZK library methods depend on pyzk implementation
-			# This is a simplified version
-			zk.set_user(
-				uid=user_id,
-				name=name,
-				privilege=0,  # 0 = User, 14 = Admin
-				password='',  # Optional PIN
-				group_id='',
-				user_id=str(user_id),
-				card=card_no
-			)
-
-			# Set time group/schedule if not 24/7
-			if not self.is_24_7 and self.access_start_time and self.access_end_time:
-				# Time zone setup would be device-specific
-				# This is placeholder - actual implementation depends on ZK device model
-				pass
-
-			return True
-
-		except Exception as e:
-			frappe.log_error(f"Error adding user to device: {str(e)}", "ZK User Add Error")
-			return False
+		if queued:
+			frappe.msgprint(_("Queued sync to {0} device(s)").format(queued), indicator="blue", alert=True)
 
 	@frappe.whitelist()
 	def remove_from_devices(self):
-		"""Remove user from all devices in this rule"""
+		"""Queue removing the member from all devices in this rule"""
 		if not self.member:
 			return
 
-		member = frappe.get_doc("Member", self.member)
+		member = frappe.db.get_value(
+			"Member", self.member, ["member_name", "zk_user_id", "access_card_number"], as_dict=True
+		)
 		if not member.zk_user_id:
 			return
 
-		removed_count = 0
-
-		for device_row in self.devices or []:
-			try:
-				device = frappe.get_doc("Access Device", device_row.access_device)
-				zk = device.get_connection()
-				if not zk:
-					continue
-
-				# Remove user from device
-				zk.delete_user(uid=int(member.zk_user_id))
-				removed_count += 1
-
-				device_row.sync_status = "Removed"
-				device_row.last_sync = frappe.utils.now()
+		queued = self._queue_device_operation("remove", member)
 
-			except Exception as e:
-				frappe.log_error(f"Error removing user from device {device_row.access_device}: {str(e)}", "Access Rule Remove Error")
+		if queued:
+			frappe.msgprint(_("Queued removal from {0} device(s)").format(queued), indicator="blue", alert=True)
 
-		self.save()
-
-		if removed_count > 0:
-			frappe.msgprint(_("Removed from {0} device(s)").format(removed_count), indicator="green", alert=True)
+	def _queue_device_operation(self, op, member):
+		"""Queue ``op`` for each device row; the device jobs record the outcome on the rows"""
+		queued = 0
+		for device_row in self.devices or []:
+			if not device_row.access_device:
+				continue
+			device_provisioning.queue_user_operation(device_row.access_device, op, member, rule=self.name)
+			device_row.db_set("sync_status", "Pending", update_modified=False)
+			queued += 1
+		return queued
 
 	@frappe.whitelist()
 	def deactivate(self):
@@ -183,51 +124,27 @@ class AccessRule(Document):
 		Returns:
 			dict: {"allowed": bool, "reason": str}
 		"""
-		if not current_time:
-			current_time = frappe.utils.now_datetime()
-
 		# Check if rule is active
 		if self.status != "Active":
 			return {"allowed": False, "reason": "Access rule is not active"}
 
-		# Check date range
-		current_date = frappe.utils.getdate(current_time)
-		if current_date < frappe.utils.getdate(self.valid_from):
-			return {"allowed": False, "reason": "Access not yet valid"}
-		if current_date > frappe.utils.getdate(self.valid_until):
-			return {"allowed": False, "reason": "Access has expired"}
-
-		# Check time of day (if not 24/7)
-		if not self.is_24_7:
-			current_time_only = current_time.time()
-			start_time = frappe.utils.parse_time(self.access_start_time)
-			end_time = frappe.utils.parse_time(self.access_end_time)
-
-			if current_time_only < start_time or current_time_only > end_time:
-				return {"allowed": False, "reason": f"Access only allowed between {self.access_start_time} and {self.access_end_time}"}
-
-		# Check day of week
-		if self.allowed_days:
-			day_name = current_time.strftime("%A")
-			if day_name not in self.allowed_days:
-				return {"allowed": False, "reason": f"Access not allowed on {day_name}"}
-
-		# Check entry limits
-		if self.limit_type and self.limit_type != "None":
-			if (self.entries_remaining or 0) <= 0:
-				return {"allowed": False, "reason": "Entry limit reached"}
-
-		# Check device is in rule
-		device_exists = False
-		for device_row in self.devices or []:
-			if device_row.access_device == device:
-				device_exists = True
-				break
+		decision = access_policy.check_access(self.member, device, current_time, rule=self.name)
+		return {"allowed": decision["allowed"], "reason": decision["reason"]}
 
-		if not device_exists:
-			return {"allowed": False, "reason": "Device not authorized for this rule"}
 
-		return {"allowed": True, "reason": "Access granted"}
+@frappe.whitelist()
+def check_access_many(events):
+	"""Decide a batch of punches against the compiled access policies
+
+	Args:
+		events: List (or JSON) of {"member", "device", "event_time"} dicts or
+			[member, device, event_time] lists
+
+	Returns:
+		list: One {"allowed", "reason", "rule"} dict per event, in order
+	"""
+	frappe.has_permission("Access Rule", "read", throw=True)
+	return access_policy.check_access_many(frappe.parse_json(events) or [])
 
 
 @frappe.whitelist()
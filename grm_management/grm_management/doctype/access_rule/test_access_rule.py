@@ -1,9 +1,147 @@
 # Copyright (c) 2026, Wael ELsafty and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_datetime
+
+from grm_management.grm_management.doctype.access_rule.access_rule import check_access_many
+from grm_management.grm_management.utils import access_policy
+from grm_management.grm_management.utils.access_policy import compile_rule, evaluate
+
+# Monday
+MONDAY = "2026-10-19"
+
+MEMBER = "TEST-POLICY-MEMBER"
+
+
+def rule(**kwargs):
+	return frappe._dict({
+		"name": "AR-TEST",
+		"valid_from": "2026-10-01",
+		"valid_until": "2026-10-31",
+		"access_start_time": "08:00:00",
+		"access_end_time": "18:00:00",
+		"allowed_days": "Monday, Wednesday",
+		"limit_type": "None",
+		**kwargs,
+	})
 
 
 class TestAccessRule(FrappeTestCase):
-	pass
+	def check(self, compiled, at, device="DEV-1"):
+		return evaluate(compiled, device, get_datetime(at))
+
+	def test_compiled_rule_grants_within_its_windows(self):
+		compiled = compile_rule(rule(), ["DEV-1", None])
+
+		self.assertEqual(self.check(compiled, f"{MONDAY} 08:00:00"), (True, "Access granted"))
+		self.assertEqual(self.check(compiled, f"{MONDAY} 18:00:00"), (True, "Access granted"))
+
+	def test_compiled_rule_denials(self):
+		compiled = compile_rule(rule(), ["DEV-1"])
+
+		self.assertEqual(self.check(compiled, "2026-09-28 10:00:00"), (False, "Access not yet valid"))
+		self.assertEqual(self.check(compiled, "2026-11-02 10:00:00"), (False, "Access has expired"))
+		self.assertEqual(
+			self.check(compiled, f"{MONDAY} 18:00:01"),
+			(False, "Access only allowed between 08:00:00 and 18:00:00"),
+		)
+		self.assertEqual(self.check(compiled, "2026-10-20 10:00:00"), (False, "Access not allowed on Tuesday"))
+		self.assertEqual(
+			self.check(compiled, f"{MONDAY} 10:00:00", device="DEV-2"),
+			(False, "Device not authorized for this rule"),
+		)
+
+	def test_unbounded_rule(self):
+		compiled = compile_rule(
+			rule(valid_from=None, valid_until=None, is_24_7=1, allowed_days=None), ["DEV-1"]
+		)
+
+		self.assertEqual(self.check(compiled, "2030-01-05 03:00:00"), (True, "Access granted"))
+
+	def test_entry_limit(self):
+		exhausted = compile_rule(rule(limit_type="Total Entries", entries_remaining=0), ["DEV-1"])
+		remaining = compile_rule(rule(limit_type="Total Entries", entries_remaining=2), ["DEV-1"])
+
+		self.assertEqual(self.check(exhausted, f"{MONDAY} 10:00:00"), (False, "Entry limit reached"))
+		self.assertEqual(self.check(remaining, f"{MONDAY} 10:00:00"), (True, "Access granted"))
+
+
+# Re-read the version stamp on every decision
+@patch.object(access_policy, "VERSION_CHECK_INTERVAL", -1)
+class TestAccessPolicyCache(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete("Access Rule", {"member": MEMBER})
+		access_policy.invalidate()
+		# Inserted Inactive: an Active rule would be synced to the (non-existent) member's devices
+		self.rule = frappe.get_doc({
+			"doctype": "Access Rule",
+			"rule_name": "Test Policy Rule",
+			"rule_type": "Custom",
+			"status": "Inactive",
+			"reference_type": "Member",
+			"reference_name": MEMBER,
+			"valid_from": "2026-10-01",
+			"valid_until": "2026-10-31",
+			"access_start_time": "08:00:00",
+			"access_end_time": "18:00:00",
+			"allowed_days": "Monday",
+			"devices": [{"access_device": "DEV-1"}],
+		}).insert(ignore_permissions=True, ignore_links=True)
+		frappe.db.set_value("Access Rule", self.rule.name, "status", "Active")
+
+	def decide(self, at=f"{MONDAY} 10:00:00", device="DEV-1"):
+		return access_policy.check_access(MEMBER, device, at)
+
+	def test_compiled_rules_are_reused(self):
+		self.assertEqual(self.decide(), {"allowed": True, "reason": "Access granted", "rule": self.rule.name})
+
+		with patch.object(frappe, "get_all", wraps=frappe.get_all) as get_all:
+			self.assertTrue(self.decide()["allowed"])
+			self.assertFalse(self.decide(at=f"{MONDAY} 20:00:00")["allowed"])
+		get_all.assert_not_called()
+
+	def test_direct_writes_and_saves_invalidate(self):
+		self.assertTrue(self.decide()["allowed"])
+
+		frappe.db.set_value("Access Rule", self.rule.name, "valid_until", "2026-10-18")
+		self.assertEqual(self.decide()["reason"], "Access has expired")
+
+		rule = frappe.get_doc("Access Rule", self.rule.name)
+		rule.valid_until = "2026-10-31"
+		rule.flags.ignore_links = True
+		rule.save(ignore_permissions=True)
+		self.assertTrue(self.decide()["allowed"])
+
+		frappe.db.set_value("Access Rule", self.rule.name, "status", "Expired")
+		self.assertEqual(self.decide()["reason"], "No active access rule")
+
+	def test_document_check_uses_the_policy_cache(self):
+		rule = frappe.get_doc("Access Rule", self.rule.name)
+
+		self.assertEqual(
+			rule.check_access("DEV-1", f"{MONDAY} 10:00:00"), {"allowed": True, "reason": "Access granted"}
+		)
+		self.assertEqual(
+			rule.check_access("DEV-2", f"{MONDAY} 10:00:00"),
+			{"allowed": False, "reason": "Device not authorized for this rule"},
+		)
+
+	def test_check_access_many(self):
+		decisions = check_access_many(frappe.as_json([
+			{"member": MEMBER, "device": "DEV-1", "event_time": f"{MONDAY} 10:00:00"},
+			[MEMBER, "DEV-1", "2026-10-20 10:00:00"],
+			[MEMBER, "DEV-2", f"{MONDAY} 10:00:00"],
+			["TEST-POLICY-NOBODY", "DEV-1", f"{MONDAY} 10:00:00"],
+		]))
+
+		self.assertEqual([d["allowed"] for d in decisions], [True, False, False, False])
+		self.assertEqual([d["reason"] for d in decisions[1:]], [
+			"Access not allowed on Tuesday",
+			"Device not authorized for this rule",
+			"No active access rule",
+		])
+		self.assertEqual(decisions[0]["rule"], self.rule.name)
@@ -4,9 +4,105 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import cint, cstr, getdate
 import requests
 import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+
+from grm_management.grm_management.doctype.access_log.access_log import (
+	bulk_insert_access_logs,
+	get_existing_log_keys,
+	get_member_locations,
+	get_members_by_zk_user_id,
+)
+
+
+# Pages fetched ahead on worker threads while the current page is written
+PREFETCH_PAGES = 3
+
+# Attempts per request on 429 / 5xx / connection errors, and the backoff cap in seconds
+MAX_ATTEMPTS = 5
+MAX_BACKOFF = 30
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+
+
+def get_session():
+	"""Return the process-wide keep-alive session for BioTime requests"""
+	global _session
+	if _session is None:
+		session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=2, pool_maxsize=PREFETCH_PAGES + 2)
+		session.mount("http://", adapter)
+		session.mount("https://", adapter)
+		_session = session
+	return _session
+
+
+def request_with_backoff(method, url, **kwargs):
+	"""Send a request, retrying 429 / 5xx responses and connection errors with exponential backoff
+
+	Honours a Retry-After header when the server sends one. Safe to call from
+	worker threads (does not touch frappe.local).
+	"""
+	session = get_session()
+	for attempt in range(MAX_ATTEMPTS):
+		last_attempt = attempt == MAX_ATTEMPTS - 1
+		try:
+			response = session.request(method, url, **kwargs)
+		except (requests.ConnectionError, requests.Timeout):
+			if last_attempt:
+				raise
+			response = None
+
+		if response is not None and (response.status_code not in RETRY_STATUS_CODES or last_attempt):
+			return response
+
+		delay = min(MAX_BACKOFF, 0.5 * 2 ** attempt) + random.uniform(0, 0.5)
+		if response is not None and response.headers.get("Retry-After", "").isdigit():
+			delay = min(MAX_BACKOFF, int(response.headers["Retry-After"]))
+		time.sleep(delay)
+
+
+def _mark_key(mark):
+	return (mark["punch_time"], cint(mark["id"]))
+
+
+def filter_new_transactions(records, mark_keys):
+	"""Split a page of transactions against per-terminal high-water marks
+
+	Args:
+		records: BioTime transaction data
+		mark_keys: {terminal_sn: (punch_time, id)} of the newest ingested rows
+
+	Returns:
+		tuple: (records newer than their terminal's mark, {terminal_sn: newest (punch_time, id) kept})
+	"""
+	fresh = []
+	newest = {}
+	for record in records:
+		punch_time = record.get("punch_time") or record.get("time")
+		if not punch_time:
+			continue
+		terminal = record.get("terminal_sn") or record.get("device_sn")
+		row_key = (str(frappe.utils.get_datetime(punch_time)), cint(record.get("id")))
+
+		mark_key = mark_keys.get(terminal) if terminal else None
+		if mark_key and row_key <= mark_key:
+			continue
+
+		fresh.append(record)
+		if terminal and (terminal not in newest or row_key > newest[terminal]):
+			newest[terminal] = row_key
+
+	return fresh, newest
 
 
 class BioTimeSettings(Document):
@@ -39,7 +135,7 @@ class BioTimeSettings(Document):
 				"password": self.get_password("password")
 			}
 
-			response = requests.post(url, json=payload, timeout=10)
+			response = request_with_backoff("POST", url, json=payload, timeout=10)
 
 			if response.status_code == 200:
 				data = response.json()
@@ -97,7 +193,7 @@ class BioTimeSettings(Document):
 			# Then test by fetching some data
 			url = f"{self.get_base_url()}/iclock/api/terminals/"
 
-			response = requests.get(url, headers=self.get_headers(), timeout=10)
+			response = request_with_backoff("GET", url, headers=self.get_headers(), timeout=10)
 
 			if response.status_code == 200:
 				data = response.json()
@@ -130,63 +226,10 @@ class BioTimeSettings(Document):
 		try:
 			self.ensure_token_valid()
 
-			# Determine date range
-			if self.sync_from_date:
-				from_date = self.sync_from_date
-			else:
-				# Default to last sync time or 7 days ago
-				from_date = self.last_sync_time.date() if self.last_sync_time else frappe.utils.add_days(frappe.utils.nowdate(), -7)
-
-			if self.sync_to_date:
-				to_date = self.sync_to_date
-			else:
-				to_date = frappe.utils.nowdate()
-
-			# Fetch attendance transactions
-			url = f"{self.get_base_url()}/iclock/api/transactions/"
-
-			params = {
-				"start_date": from_date,
-				"end_date": to_date,
-				"page_size": self.batch_size or 100,
-				"page": 1
-			}
-
-			new_logs = 0
-			duplicate_logs = 0
-			total_fetched = 0
-
-			while True:
-				response = requests.get(url, headers=self.get_headers(), params=params, timeout=30)
-
-				if response.status_code != 200:
-					error_msg = f"Failed to fetch attendance: {response.status_code}"
-					frappe.log_error(error_msg, "BioTime Sync Error")
-					break
-
-				data = response.json()
-				results = data.get("data", [])
-
-				if not results:
-					break
-
-				total_fetched += len(results)
-
-				# Process each attendance record
-				for record in results:
-					created = self._create_access_log_from_biotime(record)
-					if created:
-						new_logs += 1
-					else:
-						duplicate_logs += 1
-
-				frappe.db.commit()
-
-				# Check if there are more pages
-				if not data.get("next"):
-					break
-
-				params["page"] += 1
+			result = self.fetch_and_ingest(from_date=self.sync_from_date, to_date=self.sync_to_date)
+			total_fetched = result["total_fetched"]
+			new_logs = result["new_logs"]
+			duplicate_logs = result["duplicate_logs"]
 
 			# Update sync status
 			self.last_sync_time = frappe.utils.now_datetime()
@@ -217,75 +260,265 @@ class BioTimeSettings(Document):
 
 			frappe.throw(_("Sync failed: {0}").format(error_msg))
 
-	def _create_access_log_from_biotime(self, record):
-		"""Create Access Log from BioTime transaction record
+	def get_sync_cursor(self):
+		"""Get the per-terminal high-water marks: {terminal_sn: {"punch_time", "id"}}"""
+		return frappe.parse_json(self.sync_cursor) if self.sync_cursor else {}
+
+	def _checkpoint(self, marks):
+		"""Merge per-terminal high-water marks into the stored cursor
+
+		The stored value is re-read under a row lock and each terminal's mark
+		only moves forward, so a device-level and a settings-level sync running
+		at the same time keep each other's marks.
+
+		Args:
+			marks: {terminal_sn: {"punch_time", "id"}}
+		"""
+		stored = frappe.db.sql(
+			"""SELECT `value` FROM `tabSingles`
+			WHERE `doctype` = 'BioTime Settings' AND `field` = 'sync_cursor'
+			FOR UPDATE""",
+		)
+		cursor = frappe.parse_json(stored[0][0]) if stored and stored[0][0] else {}
+
+		changed = False
+		for terminal, mark in marks.items():
+			current = cursor.get(terminal)
+			if current and _mark_key(current) >= _mark_key(mark):
+				continue
+			cursor[terminal] = mark
+			changed = True
+
+		self.sync_cursor = json.dumps(cursor, sort_keys=True)
+		if changed:
+			frappe.db.set_single_value("BioTime Settings", "sync_cursor", self.sync_cursor, update_modified=False)
+
+	def fetch_and_ingest(self, terminal_sn=None, from_date=None, to_date=None):
+		"""Fetch transactions newer than the stored high-water marks and ingest them page by page
+
+		Every terminal keeps its own mark: the (punch_time, id) of its newest
+		ingested transaction. A row is dropped only when its own terminal's
+		mark covers it, so punches a terminal uploads late (with an older
+		punch_time than other terminals have reached) are still ingested. A
+		sync across all terminals starts at the oldest mark; rows without a
+		terminal serial are never dropped and rely on duplicate detection.
+
+		Marks are merged and committed after every page, so an interrupted
+		sync resumes where it stopped. A mark only ever moves forward, so an
+		explicit ``from_date`` re-reads an older range without losing it
+		(already stored rows are skipped as duplicates).
 
 		Args:
-			record: BioTime transaction data
+			terminal_sn: Only sync this terminal (default: all terminals)
+			from_date: Re-read from this date instead of the marks
+			to_date: Stop at the end of this date (default: no upper bound)
 
 		Returns:
-			bool: True if new log created, False if duplicate
+			dict: total_fetched, new_logs, duplicate_logs
 		"""
-		try:
-			# Extract data from BioTime record
-			# Field names may vary depending on BioTime version
-			emp_code = record.get("emp_code") or record.get("employee_code")
-			punch_time = record.get("punch_time") or record.get("time")
-			punch_state = record.get("punch_state", 0)  # 0=Check-In, 1=Check-Out
-			terminal_sn = record.get("terminal_sn") or record.get("device_sn")
+		self.ensure_token_valid()
 
-			if not emp_code or not punch_time:
-				return False
+		marks = {} if from_date else {
+			terminal: mark for terminal, mark in self.get_sync_cursor().items()
+			if not terminal_sn or terminal == terminal_sn
+		}
+		# Marks written before they were kept per terminal cannot say which terminal they cover
+		marks.pop("*", None)
+
+		if from_date:
+			start_time = f"{getdate(from_date)} 00:00:00"
+		elif marks:
+			start_time = min(mark["punch_time"] for mark in marks.values())
+		else:
+			# First run: last sync time or 7 days ago
+			start_date = self.last_sync_time.date() if self.last_sync_time else frappe.utils.add_days(frappe.utils.nowdate(), -7)
+			start_time = f"{start_date} 00:00:00"
+
+		url = f"{self.get_base_url()}/iclock/api/transactions/"
+		params = {
+			"start_time": start_time,
+			"ordering": "punch_time,id",
+			"page_size": self.batch_size or 100,
+			"page": 1
+		}
+		if to_date:
+			params["end_time"] = f"{getdate(to_date)} 23:59:59"
+		if terminal_sn:
+			params["terminal_sn"] = terminal_sn
 
-			# Parse timestamp
-			timestamp = frappe.utils.get_datetime(punch_time)
+		stats = {"total_fetched": 0, "new_logs": 0, "duplicate_logs": 0}
+		mark_keys = {terminal: _mark_key(mark) for terminal, mark in marks.items()}
 
-			# Check for duplicate
-			existing = frappe.db.exists("Access Log", {
-				"zk_user_id": str(emp_code),
-				"event_time": timestamp
-			})
+		for data in self._iter_transaction_pages(url, params):
+			results = data.get("data", [])
+
+			if not results:
+				break
+
+			stats["total_fetched"] += len(results)
+
+			fresh, newest = filter_new_transactions(results, mark_keys)
+
+			created, skipped = self._ingest_transactions(fresh) if fresh else (0, 0)
+			stats["new_logs"] += created
+			stats["duplicate_logs"] += skipped + len(results) - len(fresh)
+
+			if newest:
+				self._checkpoint({
+					terminal: {"punch_time": row_key[0], "id": row_key[1]}
+					for terminal, row_key in newest.items()
+				})
+			frappe.db.commit()
+
+		return stats
+
+	def _iter_transaction_pages(self, url, params):
+		"""Yield transaction pages in order, fetching up to PREFETCH_PAGES ahead on worker threads
+
+		Page 1 is fetched first to learn the total count; the following pages
+		are requested concurrently over the pooled session while the caller
+		writes the current one. Stops at the last page or the first failed one.
+		"""
+		page_size = cint(params.get("page_size")) or 100
+
+		def fetch(page):
+			# Headers are built on the calling thread: refreshing the token writes to the database
+			return request_with_backoff(
+				"GET", url, headers=self.get_headers(), params=dict(params, page=page), timeout=30
+			)
+
+		def last_page(data):
+			count = cint(data.get("count"))
+			return math.ceil(count / page_size) if count else None
+
+		executor = ThreadPoolExecutor(max_workers=PREFETCH_PAGES)
+		pending = {}
+		try:
+			page = cint(params.get("page")) or 1
+			response = fetch(page)
+
+			while True:
+				if response.status_code != 200:
+					error_msg = f"Failed to fetch attendance: {response.status_code}"
+					frappe.log_error(error_msg, "BioTime Sync Error")
+					break
+
+				data = response.json()
+				final_page = last_page(data)
+				has_next = bool(data.get("next"))
+
+				# Keep the next pages in flight while the caller processes this one
+				if has_next and final_page:
+					headers = self.get_headers()
+					for ahead in range(page + 1, min(page + PREFETCH_PAGES, final_page) + 1):
+						if ahead not in pending:
+							pending[ahead] = executor.submit(
+								request_with_backoff, "GET", url,
+								headers=headers, params=dict(params, page=ahead), timeout=30
+							)
+
+				yield data
+
+				if not has_next:
+					break
 
-			if existing:
-				return False
+				page += 1
+				future = pending.pop(page, None)
+				response = future.result() if future else fetch(page)
+		finally:
+			# Also runs when the caller stops early: drop pages nobody will read
+			for future in pending.values():
+				future.cancel()
+			executor.shutdown(wait=False)
 
-			# Find member by employee code (mapped to ZK User ID)
-			member = frappe.db.get_value("Member", {"zk_user_id": str(emp_code)}, "name")
+	def _ingest_transactions(self, records):
+		"""Create Access Logs for a page of BioTime transaction records
 
-			# Find device by serial number
-			device = None
-			if terminal_sn:
-				device = frappe.db.get_value("Access Device", {"serial_number": terminal_sn}, "name")
+		Members, devices and member locations are resolved with one query
+		each, duplicates are found with one query, and new logs are written
+		with a bulk insert.
 
-			# Create Access Log
-			log = frappe.new_doc("Access Log")
-			log.zk_user_id = str(emp_code)
-			log.event_time = timestamp
-			log.event_type = "Check-In" if punch_state == 0 else "Check-Out"
+		Args:
+			records: BioTime transaction data
 
-			if member:
-				log.member = member
-				# Get member's location
-				member_doc = frappe.get_doc("Member", member)
-				# Try to get location from active contract or membership
-				contract = frappe.db.get_value("GRM Contract", {"member": member, "status": "Active"}, "name")
-				if contract:
-					contract_doc = frappe.get_doc("GRM Contract", contract)
-					if contract_doc.spaces:
-						space = frappe.get_doc("Space", contract_doc.spaces[0].space)
-						log.location = space.location
+		Returns:
+			tuple: (new logs created, records skipped as duplicate or invalid)
+		"""
+		# Extract data from BioTime records
+		# Field names may vary depending on BioTime version
+		punches = []
+		for record in records:
+			emp_code = record.get("emp_code") or record.get("employee_code")
+			punch_time = record.get("punch_time") or record.get("time")
+			if not emp_code or not punch_time:
+				continue
 
-			if device:
-				log.device = device
+			try:
+				timestamp = frappe.utils.get_datetime(punch_time)
+			except Exception:
+				continue
 
-			log.context_type = "BioTime"
-			log.insert(ignore_permissions=True)
+			punches.append({
+				"log_id": cstr(record.get("id") or "") or None,
+				"zk_user_id": str(emp_code),
+				"event_time": timestamp,
+				"punch_state": cint(record.get("punch_state", 0)),  # 0=Check-In, 1=Check-Out
+				"terminal_sn": record.get("terminal_sn") or record.get("device_sn"),
+			})
 
-			return True
+		if not punches:
+			return 0, len(records)
+
+		existing = get_existing_log_keys(
+			(p["zk_user_id"] for p in punches),
+			(p["event_time"] for p in punches),
+		)
+		members = get_members_by_zk_user_id(p["zk_user_id"] for p in punches)
+		member_locations = get_member_locations(m.name for m in members.values())
+
+		serials = list({p["terminal_sn"] for p in punches if p["terminal_sn"]})
+		devices = {}
+		if serials:
+			for d in frappe.get_all(
+				"Access Device",
+				filters={"serial_number": ["in", serials]},
+				fields=["name", "serial_number", "location"],
+			):
+				devices[d.serial_number] = d
+
+		logs = []
+		for punch in punches:
+			key = (punch["zk_user_id"], punch["event_time"])
+			if key in existing:
+				continue
+			# The same punch can appear twice in one page
+			existing.add(key)
+
+			member = members.get(punch["zk_user_id"])
+			device = devices.get(punch["terminal_sn"])
+
+			location = member_locations.get(member.name) if member else None
+			if not location and device:
+				location = device.location
+
+			logs.append({
+				"log_id": punch["log_id"],
+				"zk_user_id": punch["zk_user_id"],
+				"event_time": punch["event_time"],
+				"event_type": "Entry" if punch["punch_state"] == 0 else "Exit",
+				"member": member.name if member else None,
+				"member_name": member.member_name if member else None,
+				"device": device.name if device else None,
+				"location": location,
+			})
 
+		try:
+			created = bulk_insert_access_logs(logs)
 		except Exception as e:
-			frappe.log_error(f"Error creating access log from BioTime record: {str(e)}", "BioTime Log Creation Error")
-			return False
+			frappe.log_error(f"Error creating access logs from BioTime records: {str(e)}", "BioTime Log Creation Error")
+			raise
+
+		return created, len(records) - created
 
 	@frappe.whitelist()
 	def sync_devices(self):
@@ -295,7 +528,7 @@ class BioTimeSettings(Document):
 
 			url = f"{self.get_base_url()}/iclock/api/terminals/"
 
-			response = requests.get(url, headers=self.get_headers(), timeout=30)
+			response = request_with_backoff("GET", url, headers=self.get_headers(), timeout=30)
 
 			if response.status_code != 200:
 				frappe.throw(_("Failed to fetch devices: {0}").format(response.status_code))
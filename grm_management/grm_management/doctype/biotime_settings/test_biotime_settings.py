@@ -0,0 +1,58 @@
+# Copyright (c) 2026, Wael ELsafty and Contributors
+# See license.txt
+
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from grm_management.grm_management.doctype.biotime_settings.biotime_settings import filter_new_transactions
+
+
+def punch(id, terminal_sn, punch_time):
+	return {"id": id, "emp_code": "1001", "terminal_sn": terminal_sn, "punch_time": punch_time}
+
+
+class TestBioTimeSettings(FrappeTestCase):
+	def test_late_upload_from_offline_terminal_is_kept(self):
+		mark_keys = {
+			"T1": ("2026-10-10 12:00:00", 500),
+			"T2": ("2026-10-08 09:00:00", 300),
+		}
+		records = [
+			punch(450, "T1", "2026-10-10 11:00:00"),  # covered by T1's mark
+			punch(610, "T2", "2026-10-09 08:00:00"),  # uploaded late, older than T1's mark
+			punch(620, "T1", "2026-10-10 13:00:00"),
+			punch(630, "T3", "2026-10-01 10:00:00"),  # terminal without a mark yet
+		]
+
+		fresh, newest = filter_new_transactions(records, mark_keys)
+
+		self.assertEqual([r["id"] for r in fresh], [610, 620, 630])
+		self.assertEqual(newest["T1"], ("2026-10-10 13:00:00", 620))
+		self.assertEqual(newest["T2"], ("2026-10-09 08:00:00", 610))
+		self.assertEqual(newest["T3"], ("2026-10-01 10:00:00", 630))
+
+	def test_rows_without_terminal_are_not_dropped(self):
+		fresh, newest = filter_new_transactions(
+			[punch(1, None, "2020-01-01 00:00:00")], {"T1": ("2026-10-10 12:00:00", 500)}
+		)
+		self.assertEqual(len(fresh), 1)
+		self.assertEqual(newest, {})
+
+	def test_checkpoint_merges_concurrent_marks(self):
+		settings = frappe.get_single("BioTime Settings")
+		frappe.db.set_single_value("BioTime Settings", "sync_cursor", json.dumps({
+			"T1": {"punch_time": "2026-10-10 12:00:00", "id": 500},
+		}))
+		# Stale in-memory copy: another sync stored T1's mark after this document was loaded
+		settings.sync_cursor = json.dumps({})
+
+		settings._checkpoint({
+			"T1": {"punch_time": "2026-10-10 11:00:00", "id": 450},
+			"T2": {"punch_time": "2026-10-09 08:00:00", "id": 610},
+		})
+
+		stored = frappe.parse_json(frappe.db.get_single_value("BioTime Settings", "sync_cursor"))
+		self.assertEqual(stored["T1"]["id"], 500)
+		self.assertEqual(stored["T2"]["id"], 610)
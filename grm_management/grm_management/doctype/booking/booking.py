@@ -3,6 +3,8 @@ from frappe.model.document import Document
 from frappe import _
 from datetime import datetime, timedelta
 
+from grm_management.grm_management.utils.availability import find_conflicts, update_index_for_doc
+
 CONFLICT_STATUSES = ['Confirmed', 'Checked-In']
 
 class Booking(Document):
@@ -24,6 +26,10 @@ class Booking(Document):
             self._on_check_in()
         if self.status == 'Completed':
             self._on_completed()
+        update_index_for_doc(self)
+
+    def on_trash(self):
+        update_index_for_doc(self)
 
     def _validate_times(self):
         if not self.all_day:
@@ -63,19 +69,12 @@ class Booking(Document):
         # For same space and booking_date ensure no overlapping Confirmed/Checked-In bookings
         if not self.space or not self.booking_date:
             return
-        start = self.start_time
-        end = self.end_time
-        bookings = frappe.db.sql("""
-            SELECT name FROM `tabBooking`
-            WHERE space=%s AND booking_date=%s AND status IN (%s,%s) AND name!=%s
-        """, (self.space, self.booking_date, CONFLICT_STATUSES[0], CONFLICT_STATUSES[1], self.name or ''), as_dict=True)
-        for b in bookings:
-            row = frappe.get_doc('Booking', b.name)
-            # if any overlap
-            if self.all_day or row.all_day:
-                frappe.throw(_("Conflicting booking exists: {0}").format(b.name))
-            if row.start_time < self.end_time and row.end_time > self.start_time:
-                frappe.throw(_("Conflicting booking exists: {0}").format(b.name))
+        conflicts = find_conflicts(
+            'Booking', self.space, self.booking_date, self.start_time, self.end_time,
+            statuses=CONFLICT_STATUSES, exclude=self.name, all_day=self.all_day, for_update=True,
+        )
+        if conflicts:
+            frappe.throw(_("Conflicting booking exists: {0}").format(conflicts[0]['name']))
 
     def _compute_services_totals(self):
         total = 0
@@ -3,11 +3,49 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import flt, time_diff_in_hours, now
 
+from grm_management.grm_management.utils.availability import find_conflicts, update_index_for_doc
+
+# Statuses that hold a space: a booking in one of them may not overlap another
+ACTIVE_STATUSES = ("Draft", "Confirmed", "Checked-in")
+
 class GRMBooking(Document):
 	def validate(self):
 		self.set_rate_from_booking_type()
 		self.calculate_duration()
 		self.calculate_pricing()
+		self.prevent_overlaps()
+
+	def on_update(self):
+		update_index_for_doc(self)
+
+	def on_trash(self):
+		update_index_for_doc(self)
+
+	def prevent_overlaps(self):
+		"""Reject an active booking overlapping another active booking of the same space
+
+		Checked against the database under a lock on the space, not the
+		availability index. Only runs when the slot or status changes, so
+		unrelated edits of existing bookings are not blocked.
+		"""
+		if self.status not in ACTIVE_STATUSES or not (self.space and self.booking_date
+				and self.start_time and self.end_time):
+			return
+		if not self.is_new() and not any(
+			self.has_value_changed(field) for field in ("space", "booking_date", "start_time", "end_time", "status")
+		):
+			return
+
+		conflicts = find_conflicts(
+			"GRM Booking", self.space, self.booking_date, self.start_time, self.end_time,
+			statuses=ACTIVE_STATUSES, exclude=self.name, for_update=True,
+		)
+		if conflicts:
+			conflict = conflicts[0]
+			frappe.throw(
+				f"This space is already booked from {conflict['start_time']} to {conflict['end_time']} "
+				f"({conflict['name']})"
+			)
 
 	def set_rate_from_booking_type(self):
 		"""Set rate type and rate based on booking type from space"""
@@ -1 +1,155 @@
+# Copyright (c) 2026, Wael ELsafty and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from grm_management.grm_management.page.space_calendar.space_calendar import mark_expired_bookings
+from grm_management.grm_management.utils.availability import find_conflicts, invalidate
+from grm_management.grm_management.utils.batch import bulk_update, run_in_chunks
+
+
+class TestGRMBooking(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		location = frappe.get_doc({
+			"doctype": "GRM Location",
+			"location_name": "Test Booking Location",
+			"status": "Active",
+			"address_line_1": "1 Test Street",
+			"city": "Riyadh",
+			"country": "Saudi Arabia",
+		}).insert(ignore_permissions=True, ignore_links=True)
+		space_type = frappe.get_doc({
+			"doctype": "GRM Space Type",
+			"space_type_name": "Test Booking Room",
+			"category": "Meeting Room",
+			"default_capacity": 4,
+		}).insert(ignore_permissions=True)
+		cls.space = frappe.get_doc({
+			"doctype": "GRM Space",
+			"space_name": "Test Booking Space",
+			"location": location.name,
+			"space_type": space_type.name,
+			"status": "Available",
+			"capacity": 4,
+		}).insert(ignore_permissions=True).name
+		cls.tenant = frappe.get_doc({
+			"doctype": "GRM Tenant",
+			"tenant_name": "Test Booking Tenant",
+			"tenant_type": "Individual",
+		}).insert(ignore_permissions=True).name
+		cls.booking_date = add_days(nowdate(), 1)
+
+	def setUp(self):
+		# Each test starts from a day without bookings
+		frappe.db.delete("GRM Booking", {"space": self.space})
+		invalidate("GRM Booking", self.space, self.booking_date)
+
+	def make_booking(self, start_time, end_time, status="Confirmed", **kwargs):
+		return frappe.get_doc({
+			"doctype": "GRM Booking",
+			"tenant": self.tenant,
+			"space": self.space,
+			"status": status,
+			"booking_type": "Hourly",
+			"booking_date": self.booking_date,
+			"start_time": start_time,
+			"end_time": end_time,
+			**kwargs,
+		})
+
+	def test_overlapping_booking_is_rejected(self):
+		self.make_booking("09:00", "10:00").insert(ignore_permissions=True)
+
+		with self.assertRaises(frappe.ValidationError):
+			self.make_booking("09:30", "10:30").insert(ignore_permissions=True)
+
+	def test_adjacent_and_cancelled_bookings_do_not_conflict(self):
+		self.make_booking("09:00", "10:00").insert(ignore_permissions=True)
+		self.make_booking("11:00", "12:00", status="Cancelled").insert(ignore_permissions=True)
+
+		self.make_booking("10:00", "11:30").insert(ignore_permissions=True)
+
+		conflicts = find_conflicts("GRM Booking", self.space, self.booking_date, "08:00", "13:00")
+		self.assertEqual([c["start_time"] for c in conflicts], ["09:00", "10:00"])
+
+	def test_stale_index_does_not_allow_double_booking(self):
+		cancelled = self.make_booking("14:00", "15:00", status="Cancelled").insert(ignore_permissions=True)
+
+		# Warm the index, then reactivate the booking without running its hooks
+		self.assertFalse(find_conflicts("GRM Booking", self.space, self.booking_date, "14:00", "15:00"))
+		frappe.db.set_value("GRM Booking", cancelled.name, "status", "Confirmed")
+		self.assertFalse(find_conflicts("GRM Booking", self.space, self.booking_date, "14:00", "15:00"))
+
+		with self.assertRaises(frappe.ValidationError):
+			self.make_booking("14:30", "15:30").insert(ignore_permissions=True)
+
+	# The batch helpers commit per chunk; keep the test transaction open
+	@patch.object(frappe.db, "commit")
+	def test_expired_bookings_are_saved_with_comments(self, commit):
+		expired = self.make_booking("08:00", "09:00", status="Draft", expiry_date=add_days(nowdate(), -1))
+		expired.insert(ignore_permissions=True)
+		current = self.make_booking("10:00", "11:00", status="Draft", expiry_date=add_days(nowdate(), 3))
+		current.insert(ignore_permissions=True)
+
+		self.assertGreaterEqual(mark_expired_bookings(), 1)
+
+		self.assertEqual(frappe.db.get_value("GRM Booking", expired.name, "status"), "No-show")
+		self.assertEqual(frappe.db.get_value("GRM Booking", current.name, "status"), "Draft")
+		self.assertTrue(frappe.db.exists("Comment", {
+			"reference_doctype": "GRM Booking",
+			"reference_name": expired.name,
+			"content": "Booking expired - not converted to subscription",
+		}))
+
+	@patch.object(frappe.db, "commit")
+	def test_run_in_chunks_isolates_failures(self, commit):
+		names = [
+			self.make_booking(f"{hour:02d}:00", f"{hour:02d}:30", status="Draft").insert(ignore_permissions=True).name
+			for hour in (8, 9, 10)
+		]
+		failing = names[1]
+		bystander = self.make_booking("16:00", "16:30", status="Draft").insert(ignore_permissions=True)
+
+		def process(booking):
+			booking.db_set("notes", "processed")
+			if booking.name == failing:
+				raise frappe.ValidationError("boom")
+
+		result = run_in_chunks(
+			"test_run_in_chunks", "GRM Booking", {"name": ["in", names]}, process, chunk_size=2
+		)
+
+		self.assertEqual(result, {"processed": 2, "failed": 1})
+		notes = dict(frappe.get_all("GRM Booking", filters={"name": ["in", names]}, fields=["name", "notes"], as_list=True))
+		self.assertIsNone(notes[failing])
+		self.assertEqual([notes[n] for n in names if n != failing], ["processed", "processed"])
+		self.assertIsNone(frappe.db.get_value("GRM Booking", bystander.name, "notes"))
+		self.assertIsNone(frappe.cache().get_value("grm_batch|test_run_in_chunks|" + nowdate()))
+
+	@patch.object(frappe.db, "commit")
+	def test_bulk_update_reports_each_chunk(self, commit):
+		names = [
+			self.make_booking(f"{hour:02d}:00", f"{hour:02d}:30", status="Draft").insert(ignore_permissions=True).name
+			for hour in (12, 13, 14)
+		]
+		bystander = self.make_booking("16:00", "16:30", status="Draft").insert(ignore_permissions=True)
+		chunks = []
+
+		count = bulk_update(
+			"GRM Booking", {"name": ["in", names]}, {"notes": "bulk"},
+			fields=["space"], after_chunk=chunks.append, chunk_size=2,
+		)
+
+		self.assertEqual(count, 3)
+		self.assertEqual([len(rows) for rows in chunks], [2, 1])
+		self.assertEqual(chunks[0][0].space, self.space)
+		self.assertEqual(
+			set(frappe.get_all("GRM Booking", filters={"name": ["in", names]}, pluck="notes")), {"bulk"}
+		)
+		self.assertIsNone(frappe.db.get_value("GRM Booking", bystander.name, "notes"))
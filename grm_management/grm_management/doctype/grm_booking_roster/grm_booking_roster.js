@@ -43,16 +43,54 @@ frappe.ui.form.on('GRM Booking Roster', {
 			return;
 		}
 
-		frappe.call({
-			method: 'grm_management.grm_management.doctype.grm_booking_roster.grm_booking_roster.get_roster_html',
-			args: {
-				name: frm.doc.name
-			},
-			callback: function(r) {
-				if (r.message) {
-					frm.fields_dict.roster_html.$wrapper.html(r.message);
+		// Rows arrive in blocks of spaces per date window; a newer load cancels older ones
+		let load_id = (frm.roster_load_id || 0) + 1;
+		frm.roster_load_id = load_id;
+
+		let $wrapper = frm.fields_dict.roster_html.$wrapper;
+		$wrapper.html('<div class="roster-container" style="overflow-x: auto;"></div>');
+		let $container = $wrapper.find('.roster-container');
+		let $tbody = null;
+
+		bind_roster_actions($wrapper);
+
+		let load_block = function(args) {
+			frappe.call({
+				method: 'grm_management.grm_management.doctype.grm_booking_roster.grm_booking_roster.get_roster_block',
+				args: Object.assign({name: frm.doc.name}, args || {}),
+				callback: function(r) {
+					if (!r.message || frm.roster_load_id !== load_id) {
+						return;
+					}
+
+					if (r.message.styles) {
+						$wrapper.prepend(r.message.styles);
+					}
+					if (r.message.head) {
+						$tbody = $(r.message.head).appendTo($container).find('tbody');
+					}
+					$tbody.append(r.message.rows);
+
+					if (r.message.next) {
+						load_block({
+							window_start: r.message.next.window_start,
+							after: r.message.next.after ? JSON.stringify(r.message.next.after) : null
+						});
+					}
 				}
-			}
-		});
+			});
+		};
+
+		load_block();
 	}
 });
+
+function bind_roster_actions($wrapper) {
+	$wrapper.off('click.roster').on('click.roster', '.add-booking', function() {
+		let $cell = $(this).closest('.booking-cell');
+		frappe.new_doc('GRM Booking', {
+			space: $cell.attr('data-space'),
+			booking_date: $cell.attr('data-date')
+		});
+	});
+}
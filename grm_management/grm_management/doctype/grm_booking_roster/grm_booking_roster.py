@@ -5,44 +5,161 @@
 from __future__ import unicode_literals
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, add_days, get_datetime, time_diff_in_hours
-import json
+from frappe.utils import getdate, add_days, cint, escape_html
+from werkzeug.wrappers import Response
+
+from grm_management.grm_management.utils.availability import to_minutes, format_minutes
+from grm_management.grm_management.utils.enrichment import get_value_map
+
+# Spaces per roster block and days per roster table
+ROSTER_BLOCK_SIZE = 50
+ROSTER_DATE_WINDOW = 31
+
+ROSTER_STYLES = '''
+	<style>
+		.roster-table {
+			width: 100%;
+			border-collapse: collapse;
+			font-size: 12px;
+			margin-bottom: 16px;
+		}
+		.roster-table th, .roster-table td {
+			border: 1px solid #d1d8dd;
+			padding: 8px;
+			text-align: center;
+		}
+		.roster-table th {
+			background-color: #f0f4f7;
+			font-weight: 600;
+			position: sticky;
+			top: 0;
+			z-index: 10;
+		}
+		.roster-table .space-name {
+			text-align: left;
+			font-weight: 500;
+			background-color: #f8f9fa;
+			position: sticky;
+			left: 0;
+			z-index: 5;
+		}
+		.roster-table .weekend {
+			background-color: #fff3cd;
+		}
+		.booking-cell {
+			position: relative;
+			min-height: 60px;
+			vertical-align: top;
+		}
+		.booking-item {
+			display: block;
+			color: inherit;
+			background: #d4edda;
+			border: 1px solid #28a745;
+			border-radius: 4px;
+			padding: 4px;
+			margin: 2px 0;
+			font-size: 10px;
+			cursor: pointer;
+		}
+		.booking-item:hover {
+			background: #c3e6cb;
+			text-decoration: none;
+		}
+		.booking-item.confirmed {
+			background: #cce5ff;
+			border-color: #007bff;
+		}
+		.booking-item.checkedin {
+			background: #d4edda;
+			border-color: #28a745;
+		}
+		.booking-item.draft {
+			background: #e2e3e5;
+			border-color: #6c757d;
+		}
+		.add-booking {
+			color: #007bff;
+			cursor: pointer;
+			font-size: 18px;
+			display: none;
+		}
+		.booking-cell:hover .add-booking {
+			display: block;
+		}
+		.time-slot {
+			font-size: 9px;
+			color: #666;
+		}
+	</style>
+'''
 
 class GRMBookingRoster(Document):
 	def validate(self):
 		if self.from_date > self.to_date:
 			frappe.throw("From Date cannot be greater than To Date")
 
-	def get_roster_data(self):
-		"""Get roster data for the date range"""
-		spaces = self.get_spaces()
-		dates = self.get_date_range()
-		bookings = self.get_bookings()
+	def get_roster_data(self, after=None, limit=None, from_date=None, to_date=None):
+		"""Get roster data for one block of spaces over a date window
+
+		Args:
+			after: Keyset cursor - [space_type, space_name, name] of the last space already loaded
+			limit: Number of spaces in the block (default: all)
+			from_date, to_date: Date window inside the roster range (default: whole range)
+
+		Returns:
+			dict: spaces, dates, bookings grouped by (space, date) and the cursor of the next block
+		"""
+		spaces = self.get_spaces(after, limit)
+		dates = self.get_date_range(from_date, to_date)
+		bookings = self.get_bookings([s['name'] for s in spaces], dates[0]['date'], dates[-1]['date']) if spaces and dates else {}
+
+		next_cursor = None
+		if limit and len(spaces) == cint(limit):
+			last = spaces[-1]
+			next_cursor = [last['space_type'] or '', last['space_name'] or '', last['name']]
 
 		return {
 			'spaces': spaces,
 			'dates': dates,
-			'bookings': bookings
+			'bookings': bookings,
+			'next_cursor': next_cursor
 		}
 
-	def get_spaces(self):
-		"""Get all spaces for the location"""
-		filters = {'allow_booking': 1}
+	def get_spaces(self, after=None, limit=None):
+		"""Get the spaces for the location, ordered by (space_type, space_name, name)"""
+		conditions = ['allow_booking = 1']
+		values = {}
 		if self.location:
-			filters['location'] = self.location
+			conditions.append('location = %(location)s')
+			values['location'] = self.location
 
-		return frappe.get_all('GRM Space',
-			filters=filters,
-			fields=['name', 'space_name', 'space_type', 'capacity', 'hourly_rate'],
-			order_by='space_type, space_name'
-		)
+		# Keyset pagination: continue strictly after the last space of the previous block
+		if after:
+			conditions.append(
+				"(IFNULL(space_type, ''), IFNULL(space_name, ''), name) > (%(after_type)s, %(after_name)s, %(after)s)"
+			)
+			values.update({'after_type': after[0], 'after_name': after[1], 'after': after[2]})
 
-	def get_date_range(self):
-		"""Get list of dates in the range"""
-		dates = []
-		current_date = getdate(self.from_date)
-		end_date = getdate(self.to_date)
+		limit_clause = ''
+		if limit:
+			limit_clause = 'LIMIT %(limit)s'
+			values['limit'] = cint(limit)
+
+		return frappe.db.sql("""
+			SELECT name, space_name, space_type, capacity, hourly_rate
+			FROM `tabGRM Space`
+			WHERE {conditions}
+			ORDER BY IFNULL(space_type, ''), IFNULL(space_name, ''), name
+			{limit_clause}
+		""".format(conditions=' AND '.join(conditions), limit_clause=limit_clause), values, as_dict=True)
 
+	def get_date_range(self, from_date=None, to_date=None):
+		"""Get list of dates in the range, clipped to the roster's own range"""
+		current_date = max(getdate(from_date or self.from_date), getdate(self.from_date))
+		end_date = min(getdate(to_date or self.to_date), getdate(self.to_date))
+
+		dates = []
 		while current_date <= end_date:
 			dates.append({
 				'date': current_date,
@@ -53,237 +170,210 @@ class GRMBookingRoster(Document):
 
 		return dates
 
-	def get_bookings(self):
-		"""Get all bookings in the date range"""
-		filters = {
-			'booking_date': ['between', [self.from_date, self.to_date]],
-			'status': ['not in', ['Cancelled', 'No-show']]
-		}
+	def get_date_windows(self):
+		"""Split the roster range into (from_date, to_date) windows of ROSTER_DATE_WINDOW days"""
+		windows = []
+		start, end = getdate(self.from_date), getdate(self.to_date)
+		while start <= end:
+			windows.append((start, min(add_days(start, ROSTER_DATE_WINDOW - 1), end)))
+			start = add_days(start, ROSTER_DATE_WINDOW)
+		return windows
 
-		if self.location:
-			spaces = frappe.get_all('GRM Space',
-				filters={'location': self.location},
-				pluck='name'
-			)
-			if spaces:
-				filters['space'] = ['in', spaces]
+	def get_bookings(self, spaces, from_date, to_date):
+		"""Get the bookings of the given spaces, grouped by (space, date) and sorted by start time"""
+		if not spaces:
+			return {}
 
 		bookings = frappe.get_all('GRM Booking',
-			filters=filters,
+			filters={
+				'space': ['in', spaces],
+				'booking_date': ['between', [from_date, to_date]],
+				'status': ['not in', ['Cancelled', 'No-show']]
+			},
 			fields=[
-				'name', 'space', 'member', 'booking_date',
+				'name', 'space', 'tenant', 'tenant_name', 'booking_date',
 				'start_time', 'end_time', 'status', 'duration_hours',
 				'total_amount'
-			]
+			],
+			order_by='space, booking_date, start_time'
 		)
 
-		# Enrich with member names
-		for booking in bookings:
-			booking['member_name'] = frappe.db.get_value('GRM Member', booking['member'], 'full_name')
+		# tenant_name is copied onto the booking; look up the rare rows missing it in one query
+		missing_names = get_value_map('GRM Tenant',
+			(b['tenant'] for b in bookings if not b['tenant_name']),
+			['tenant_name']
+		)
 
-		# Group by space and date
 		grouped = {}
 		for booking in bookings:
-			key = f"{booking['space']}|{booking['booking_date']}"
-			if key not in grouped:
-				grouped[key] = []
-			grouped[key].append(booking)
+			if not booking['tenant_name']:
+				tenant = missing_names.get(booking['tenant'])
+				booking['tenant_name'] = (tenant and tenant.tenant_name) or booking['tenant'] or ''
+			grouped.setdefault((booking['space'], getdate(booking['booking_date'])), []).append(booking)
 
 		return grouped
 
-@frappe.whitelist()
-def get_roster_html(name):
-	"""Generate HTML for roster view"""
-	doc = frappe.get_doc('GRM Booking Roster', name)
-	data = doc.get_roster_data()
-
-	html = '''
-		<style>
-			.roster-table {
-				width: 100%;
-				border-collapse: collapse;
-				font-size: 12px;
-			}
-			.roster-table th, .roster-table td {
-				border: 1px solid #d1d8dd;
-				padding: 8px;
-				text-align: center;
-			}
-			.roster-table th {
-				background-color: #f0f4f7;
-				font-weight: 600;
-				position: sticky;
-				top: 0;
-				z-index: 10;
-			}
-			.roster-table .space-name {
-				text-align: left;
-				font-weight: 500;
-				background-color: #f8f9fa;
-				position: sticky;
-				left: 0;
-				z-index: 5;
-			}
-			.roster-table .weekend {
-				background-color: #fff3cd;
-			}
-			.booking-cell {
-				position: relative;
-				min-height: 60px;
-				vertical-align: top;
-			}
-			.booking-item {
-				background: #d4edda;
-				border: 1px solid #28a745;
-				border-radius: 4px;
-				padding: 4px;
-				margin: 2px 0;
-				font-size: 10px;
-				cursor: pointer;
-			}
-			.booking-item:hover {
-				background: #c3e6cb;
-			}
-			.booking-item.confirmed {
-				background: #cce5ff;
-				border-color: #007bff;
-			}
-			.booking-item.checked-in {
-				background: #d4edda;
-				border-color: #28a745;
-			}
-			.booking-item.draft {
-				background: #e2e3e5;
-				border-color: #6c757d;
-			}
-			.add-booking {
-				color: #007bff;
-				cursor: pointer;
-				font-size: 18px;
-				display: none;
-			}
-			.booking-cell:hover .add-booking {
-				display: block;
-			}
-			.time-slot {
-				font-size: 9px;
-				color: #666;
-			}
-		</style>
-		<div class="roster-container" style="overflow-x: auto;">
-			<table class="roster-table">
-				<thead>
-					<tr>
-						<th class="space-name" style="min-width: 150px;">Space</th>
-	'''
+def _format_time(value):
+	minutes = to_minutes(value)
+	return format_minutes(minutes) if minutes is not None else ''
+
+def render_table_head(dates):
+	"""Opening <table> and the date header row"""
+	parts = ['''
+		<table class="roster-table">
+			<thead>
+				<tr>
+					<th class="space-name" style="min-width: 150px;">Space</th>
+	''']
 
-	# Add date headers
-	for date_info in data['dates']:
+	for date_info in dates:
 		weekend_class = 'weekend' if date_info['is_weekend'] else ''
-		html += f'''
+		parts.append(f'''
 			<th class="{weekend_class}" style="min-width: 120px;">
 				{date_info['weekday']}<br>
 				{date_info['date'].strftime('%d/%m')}
 			</th>
-		'''
+		''')
 
-	html += '''
-					</tr>
-				</thead>
-				<tbody>
+	parts.append('''
+				</tr>
+			</thead>
+			<tbody>
+	''')
+	return ''.join(parts)
+
+def render_table_foot():
+	return '''
+			</tbody>
+		</table>
 	'''
 
-	# Add space rows
+def iter_space_rows(data, show_add=True):
+	"""Yield one <tr> per space; every cell is a dict lookup on (space, date)"""
 	for space in data['spaces']:
-		html += f'''
+		parts = [f'''
 			<tr>
 				<td class="space-name">
-					<strong>{space['space_name']}</strong><br>
-					<small class="text-muted">{space['space_type']}</small>
+					<strong>{escape_html(space['space_name'] or space['name'])}</strong><br>
+					<small class="text-muted">{escape_html(space['space_type'] or '')}</small>
 				</td>
-		'''
+		''']
 
-		# Add booking cells for each date
 		for date_info in data['dates']:
-			key = f"{space['name']}|{date_info['date']}"
-			bookings = data['bookings'].get(key, [])
-
 			weekend_class = 'weekend' if date_info['is_weekend'] else ''
-			html += f'<td class="booking-cell {weekend_class}" data-space="{space["name"]}" data-date="{date_info["date"]}">'
+			parts.append(f'<td class="booking-cell {weekend_class}" data-space="{escape_html(space["name"])}" data-date="{date_info["date"]}">')
 
-			# Add existing bookings
-			for booking in bookings:
+			for booking in data['bookings'].get((space['name'], date_info['date']), ()):
 				status_class = booking['status'].lower().replace('-', '')
-				html += f'''
-					<div class="booking-item {status_class}"
-						onclick="open_booking('{booking["name"]}')"
-						title="{booking['member_name']}">
-						<div class="time-slot">{booking['start_time'][:5]} - {booking['end_time'][:5]}</div>
-						<div style="font-weight: 500;">{booking['member_name'][:15]}</div>
+				tenant_name = escape_html(booking['tenant_name'])
+				parts.append(f'''
+					<a class="booking-item {status_class}"
+						href="/app/grm-booking/{escape_html(booking['name'])}"
+						title="{tenant_name}">
+						<div class="time-slot">{_format_time(booking['start_time'])} - {_format_time(booking['end_time'])}</div>
+						<div style="font-weight: 500;">{escape_html(booking['tenant_name'][:15])}</div>
 						<div class="text-muted">{booking['duration_hours']}h</div>
-					</div>
-				'''
-
-			# Add button to create new booking
-			html += f'''
-				<div class="add-booking" onclick="create_booking('{space["name"]}', '{date_info["date"]}')">
-					+
-				</div>
-			'''
-
-			html += '</td>'
-
-		html += '</tr>'
-
-	html += '''
-				</tbody>
-			</table>
-		</div>
-		<script>
-			function open_booking(name) {
-				frappe.set_route('Form', 'GRM Booking', name);
-			}
-
-			function create_booking(space, date) {
-				frappe.new_doc('GRM Booking', {
-					space: space,
-					booking_date: date
-				});
-			}
-
-			// Refresh roster on form load
-			frappe.ui.form.on('GRM Booking Roster', {
-				refresh: function(frm) {
-					frm.add_custom_button(__('Refresh Roster'), function() {
-						frm.trigger('load_roster');
-					});
-
-					frm.trigger('load_roster');
-				},
-				from_date: function(frm) {
-					frm.trigger('load_roster');
-				},
-				to_date: function(frm) {
-					frm.trigger('load_roster');
-				},
-				location: function(frm) {
-					frm.trigger('load_roster');
-				},
-				load_roster: function(frm) {
-					if (frm.doc.name) {
-						frappe.call({
-							method: 'grm_management.grm_management.doctype.grm_booking_roster.grm_booking_roster.get_roster_html',
-							args: {name: frm.doc.name},
-							callback: function(r) {
-								if (r.message) {
-									frm.fields_dict.roster_html.$wrapper.html(r.message);
-								}
-							}
-						});
-					}
-				}
-			});
-		</script>
-	'''
+					</a>
+				''')
+
+			if show_add:
+				parts.append('<div class="add-booking">+</div>')
+
+			parts.append('</td>')
+
+		parts.append('</tr>')
+		yield ''.join(parts)
+
+def _get_roster(name):
+	doc = frappe.get_doc('GRM Booking Roster', name)
+	doc.check_permission('read')
+	return doc
+
+def iter_roster_html(doc, block_size=ROSTER_BLOCK_SIZE, show_add=True):
+	"""Yield the roster tables chunk by chunk, fetching one block of spaces at a time
+
+	Must be consumed within the request: the blocks are queried on demand.
+	"""
+	yield '<div class="roster-container" style="overflow-x: auto;">'
+	for from_date, to_date in doc.get_date_windows():
+		after = None
+		while True:
+			data = doc.get_roster_data(after=after, limit=block_size, from_date=from_date, to_date=to_date)
+			if after is None:
+				yield render_table_head(data['dates'])
+			yield from iter_space_rows(data, show_add=show_add)
+			after = data['next_cursor']
+			if not after:
+				break
+		yield render_table_foot()
+	yield '</div>'
+
+@frappe.whitelist()
+def get_roster_html(name, block_size=ROSTER_BLOCK_SIZE):
+	"""Generate HTML for roster view (styles and one table per date window)"""
+	doc = _get_roster(name)
+	block_size = min(max(cint(block_size) or ROSTER_BLOCK_SIZE, 1), 200)
+	return ROSTER_STYLES + ''.join(iter_roster_html(doc, block_size))
+
+@frappe.whitelist()
+def get_roster_block(name, window_start=None, after=None, block_size=ROSTER_BLOCK_SIZE):
+	"""Get one block of roster rows for progressive loading
+
+	The roster is split into date windows of ROSTER_DATE_WINDOW days, each
+	rendered as its own table, and every window into blocks of spaces
+	fetched with keyset pagination.
+
+	Args:
+		window_start: First date of the window (default: the roster's from_date)
+		after: Cursor returned by the previous block of the same window
+		block_size: Spaces per block (max 200)
+
+	Returns:
+		dict: {styles (first call only), head (when starting a window), rows, next} where next holds the
+			window_start/after arguments of the following call, or None when done
+	"""
+	doc = _get_roster(name)
+	block_size = min(max(cint(block_size) or ROSTER_BLOCK_SIZE, 1), 200)
+	after = frappe.parse_json(after) if after else None
+
+	windows = doc.get_date_windows()
+	window_start = getdate(window_start) if window_start else windows[0][0]
+	window = next((w for w in windows if w[0] == window_start), None)
+	if not window:
+		frappe.throw(frappe._('Invalid roster window'))
+
+	data = doc.get_roster_data(after=after, limit=block_size, from_date=window[0], to_date=window[1])
+
+	result = {
+		'window_start': str(window[0]),
+		'styles': ROSTER_STYLES if not after and window == windows[0] else None,
+		'head': render_table_head(data['dates']) + render_table_foot() if not after else None,
+		'rows': ''.join(iter_space_rows(data)),
+		'next': None
+	}
+
+	if data['next_cursor']:
+		result['next'] = {'window_start': str(window[0]), 'after': data['next_cursor']}
+	else:
+		following = windows.index(window) + 1
+		if following < len(windows):
+			result['next'] = {'window_start': str(windows[following][0]), 'after': None}
+
+	return result
+
+@frappe.whitelist()
+def stream_roster_html(name, block_size=ROSTER_BLOCK_SIZE):
+	"""Return the whole roster as a standalone HTML page
+
+	The body is rendered here, while the site context and database connection
+	are still alive; frappe releases both before a lazy body would be sent.
+	"""
+	doc = _get_roster(name)
+	block_size = min(max(cint(block_size) or ROSTER_BLOCK_SIZE, 1), 200)
+	title = escape_html(doc.roster_name or doc.name)
+
+	chunks = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>{ROSTER_STYLES}</head><body>']
+	chunks.extend(iter_roster_html(doc, block_size, show_add=False))
+	chunks.append('</body></html>')
 
-	return html
+	return Response(chunks, mimetype='text/html')
@@ -188,6 +188,14 @@ class GRMContract(Document):
 
     def _create_access_rules(self):
         """Create Access Rules for each granted user"""
+        # Devices of the contract's spaces, shared by every rule
+        space_devices = frappe.get_all(
+            "Space",
+            filters={"name": ["in", [row.space for row in self.spaces or [] if row.space]]},
+            pluck="access_device",
+        ) if self.spaces else []
+        devices = list(dict.fromkeys(d for d in space_devices if d))
+
         for user_row in self.granted_users or []:
             if not user_row.access_granted:
                 continue
@@ -211,13 +219,11 @@ class GRMContract(Document):
                     access_rule.access_start_time = self.access_start_time
                     access_rule.access_end_time = self.access_end_time
 
-                # Add devices from spaces
-                for space_row in self.spaces or []:
-                    space = frappe.get_doc("Space", space_row.space)
-                    if space.access_device:
-                        access_rule.append("devices", {
-                            "access_device": space.access_device
-                        })
+                # Add devices from spaces (provisioned by a background job on insert)
+                for device in devices:
+                    access_rule.append("devices", {
+                        "access_device": device
+                    })
 
                 access_rule.insert(ignore_permissions=True)
 
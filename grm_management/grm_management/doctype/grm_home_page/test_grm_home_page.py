@@ -0,0 +1,54 @@
+# Copyright (c) 2026, Wael ELsafty and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from grm_management.grm_management.utils.cms_cache import cached_response, invalidate_pages
+
+PAGE = "test_home"
+
+
+class TestGRMHomePage(FrappeTestCase):
+	def setUp(self):
+		invalidate_pages((PAGE,))
+		self.builds = 0
+
+	def build(self):
+		self.builds += 1
+		return {"success": True, "data": {"title": "Home"}}
+
+	def respond(self, if_none_match=None):
+		with patch.object(frappe, "get_request_header", return_value=if_none_match):
+			return cached_response(PAGE, self.build)
+
+	def test_etag_revalidation(self):
+		first = self.respond()
+		etag = first.headers["ETag"]
+		self.assertEqual(first.status_code, 200)
+		self.assertEqual(frappe.parse_json(first.get_data(as_text=True))["message"]["data"], {"title": "Home"})
+
+		not_modified = self.respond(f'"other", {etag}')
+		self.assertEqual(not_modified.status_code, 304)
+		self.assertEqual(not_modified.get_data(), b"")
+		self.assertEqual(not_modified.headers["ETag"], etag)
+		self.assertEqual(self.builds, 1)
+
+	def test_invalidation_rebuilds_payload(self):
+		etag = self.respond().headers["ETag"]
+
+		invalidate_pages((PAGE,))
+
+		self.assertEqual(self.respond(etag).status_code, 304)
+		self.assertEqual(self.builds, 2)
+
+	def test_failures_are_not_cached(self):
+		def failing():
+			self.builds += 1
+			return {"success": False, "http_status_code": 404}
+
+		for _attempt in range(2):
+			self.assertEqual(cached_response(PAGE, failing), {"success": False, "http_status_code": 404})
+		self.assertEqual(self.builds, 2)
@@ -0,0 +1,100 @@
+# Copyright (c) 2026, Wael ELsafty and Contributors
+# See license.txt
+
+import hashlib
+import os
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from grm_management.grm_management.utils import image_variants
+from grm_management.grm_management.utils.image_variants import (
+	MANIFEST_KEY,
+	generate_variants,
+	get_image_variants_map,
+	on_file_trash,
+)
+
+FILE_URL = "/files/test-grm-image-variant.png"
+
+
+def variant_path(variant_url):
+	return frappe.get_site_path("public", variant_url.lstrip("/"))
+
+
+# AVIF support depends on the Pillow build; WebP is always produced
+@patch.object(image_variants, "_output_formats", lambda: ["webp"])
+class TestGRMImageVariant(FrappeTestCase):
+	def setUp(self):
+		self.source = frappe.get_site_path("public", FILE_URL.lstrip("/"))
+		frappe.db.delete("GRM Image Variant", {"file_url": FILE_URL})
+		frappe.cache().hdel(MANIFEST_KEY, FILE_URL)
+
+	def tearDown(self):
+		manifest = image_variants._get_manifest(FILE_URL)
+		frappe.db.delete("GRM Image Variant", {"file_url": FILE_URL})
+		frappe.cache().hdel(MANIFEST_KEY, FILE_URL)
+		if manifest:
+			image_variants._remove_unused_variant_files(manifest["hash"])
+		if os.path.exists(self.source):
+			os.remove(self.source)
+
+	def write_image(self, width, height, color="red"):
+		from PIL import Image
+
+		Image.new("RGB", (width, height), color).save(self.source, format="PNG")
+		with open(self.source, "rb") as f:
+			return hashlib.sha1(f.read()).hexdigest()[:16]
+
+	def test_variants_are_named_by_content_and_never_upscaled(self):
+		content_hash = self.write_image(1000, 500)
+
+		manifest = generate_variants(FILE_URL)
+
+		self.assertEqual(manifest["hash"], content_hash)
+		self.assertEqual((manifest["width"], manifest["height"]), (1000, 500))
+		self.assertEqual(sorted(manifest["variants"]["webp"]), [160, 480, 960])
+		for width, url in manifest["variants"]["webp"].items():
+			self.assertEqual(url, f"/files/variants/{content_hash}-{width}.webp")
+			self.assertTrue(os.path.exists(variant_path(url)))
+
+		self.write_image(100, 80, color="blue")
+		self.assertEqual(sorted(generate_variants(FILE_URL)["variants"]["webp"]), [100])
+
+	def test_manifest_survives_a_cache_flush(self):
+		self.write_image(600, 400)
+		manifest = generate_variants(FILE_URL)
+
+		record = frappe.db.get_value(
+			"GRM Image Variant", {"file_url": FILE_URL}, ["content_hash", "width"], as_dict=True
+		)
+		self.assertEqual((record.content_hash, record.width), (manifest["hash"], 600))
+
+		frappe.cache().delete_value(MANIFEST_KEY)
+
+		srcsets = get_image_variants_map()(FILE_URL)
+		self.assertIn(f"/files/variants/{manifest['hash']}-480.webp 480w", srcsets["webp"])
+		self.assertEqual(image_variants.get_image_variants(FILE_URL), srcsets)
+
+	def test_changed_content_removes_previous_variants(self):
+		self.write_image(600, 400)
+		old = generate_variants(FILE_URL)
+
+		self.write_image(600, 400, color="green")
+		new = generate_variants(FILE_URL)
+
+		self.assertNotEqual(old["hash"], new["hash"])
+		self.assertFalse(any(os.path.exists(variant_path(url)) for url in old["variants"]["webp"].values()))
+		self.assertTrue(all(os.path.exists(variant_path(url)) for url in new["variants"]["webp"].values()))
+
+	def test_trashing_the_last_file_deletes_variants(self):
+		self.write_image(600, 400)
+		manifest = generate_variants(FILE_URL)
+
+		on_file_trash(frappe._dict(name="test-grm-image-variant", file_url=FILE_URL))
+		frappe.db.after_commit.run()
+
+		self.assertFalse(frappe.db.exists("GRM Image Variant", {"file_url": FILE_URL}))
+		self.assertIsNone(get_image_variants_map()(FILE_URL))
+		self.assertFalse(any(os.path.exists(variant_path(url)) for url in manifest["variants"]["webp"].values()))
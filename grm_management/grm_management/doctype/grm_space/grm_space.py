@@ -6,12 +6,15 @@ from frappe.model.document import Document
 from frappe import _
 from frappe.utils import flt, now
 
+from grm_management.grm_management.utils.space_catalog import compute_amenity_mask
+
 
 class GRMSpace(Document):
 	def validate(self):
 		"""Validate space data"""
 		self.validate_capacity()
 		self.set_pricing()
+		self.amenity_mask = compute_amenity_mask(self)
 		
 	def before_save(self):
 		"""Update last_updated"""
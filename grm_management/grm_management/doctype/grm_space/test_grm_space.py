@@ -1,5 +1,63 @@
 # Copyright (c) 2026, Wael ELsafty and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+
+from grm_management.grm_management.utils.space_catalog import Catalog, compute_amenity_mask
+
+
+def space(name, location, space_type, capacity, hourly_rate, status="Available", **amenities):
+	return frappe._dict({
+		"name": name,
+		"location": location,
+		"space_type": space_type,
+		"status": status,
+		"capacity": capacity,
+		"hourly_rate": hourly_rate,
+		"amenity_mask": compute_amenity_mask(amenities),
+	})
+
+
+class TestGRMSpace(FrappeTestCase):
+	def setUp(self):
+		self.catalog = Catalog(
+			[
+				space("A", "Riyadh", "Office", 4, 100, wifi=1, projector=1),
+				space("B", "Riyadh", "Meeting Room", 10, 250, wifi=1),
+				space("C", "Jeddah", "Office", 2, 80, status="Occupied", wifi=1, projector=1),
+				space("D", "Jeddah", "Meeting Room", 20, 400, parking=1),
+			],
+			[], [], [],
+		)
+
+	def names(self, spaces):
+		return [s.name for s in spaces]
+
+	def test_filters_combine(self):
+		spaces, _counts = self.catalog.search(location="Riyadh", amenities=["wifi"])
+		self.assertEqual(self.names(spaces), ["A", "B"])
+
+		spaces, _counts = self.catalog.search(space_type=["Office", "Meeting Room"], min_capacity=4, max_capacity=10)
+		self.assertEqual(self.names(spaces), ["A", "B"])
+
+		spaces, _counts = self.catalog.search(min_price=90, max_price=250, amenities=["wifi", "projector"])
+		self.assertEqual(self.names(spaces), ["A"])
+
+	def test_facet_counts_skip_their_own_filter(self):
+		spaces, counts = self.catalog.search(location="Riyadh", space_type="Office")
+
+		self.assertEqual(self.names(spaces), ["A"])
+		# Picking another location keeps the space type filter, and vice versa
+		self.assertEqual(counts["location"], {"Riyadh": 1, "Jeddah": 1})
+		self.assertEqual(counts["space_type"], {"Office": 1, "Meeting Room": 1})
+		# Amenities are counted within the result
+		self.assertEqual(counts["amenity"], {"wifi": 1, "projector": 1})
+
+	def test_results_are_copies(self):
+		spaces, _counts = self.catalog.search(location="Jeddah")
+		spaces[0]["image_variants"] = {}
+		spaces[0].status = "Maintenance"
+
+		self.assertNotIn("image_variants", self.catalog.spaces[2])
+		self.assertEqual(self.catalog.spaces[2].status, "Occupied")
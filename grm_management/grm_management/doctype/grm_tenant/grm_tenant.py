@@ -16,6 +16,17 @@ class GRMTenant(Document):
 		"""Auto-create ERPNext Customer"""
 		self.create_customer()
 
+	def on_update(self):
+		self.propagate_tenant_name()
+
+	def propagate_tenant_name(self):
+		"""Keep the tenant_name copied onto bookings and subscriptions in sync on rename"""
+		if self.is_new() or not self.has_value_changed("tenant_name"):
+			return
+
+		for doctype in ("GRM Booking", "GRM Subscription"):
+			frappe.db.set_value(doctype, {"tenant": self.name}, "tenant_name", self.tenant_name, update_modified=False)
+
 	def validate_contact_info(self):
 		"""Validate email formats"""
 		if self.primary_email and not validate_email_address(self.primary_email):
@@ -4,6 +4,7 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import flt, getdate
 import re
 
 
@@ -124,52 +125,8 @@ class Member(Document):
 	@frappe.whitelist()
 	def update_statistics(self):
 		"""Update member statistics - contracts, memberships, bookings, revenue"""
-		# Count active contracts
-		self.active_contracts = frappe.db.count("GRM Contract", {
-			"member": self.name,
-			"status": "Active"
-		})
-
-		# Count active memberships
-		self.active_memberships = frappe.db.count("Membership", {
-			"member": self.name,
-			"status": "Active"
-		})
-
-		# Count total bookings
-		self.total_bookings = frappe.db.count("Booking", {
-			"member": self.name
-		})
-
-		# Calculate total revenue from paid Sales Invoices
-		revenue = frappe.db.sql("""
-			SELECT SUM(grand_total) as total
-			FROM `tabSales Invoice`
-			WHERE customer = %s AND docstatus = 1 AND status = 'Paid'
-		""", (self.customer,), as_dict=True)
-
-		self.total_revenue = revenue[0].total if revenue and revenue[0].total else 0
-
-		# Calculate outstanding balance from unpaid/partially paid Sales Invoices
-		outstanding = frappe.db.sql("""
-			SELECT SUM(outstanding_amount) as total
-			FROM `tabSales Invoice`
-			WHERE customer = %s AND docstatus = 1 AND outstanding_amount > 0
-		""", (self.customer,), as_dict=True)
-
-		self.outstanding_balance = outstanding[0].total if outstanding and outstanding[0].total else 0
-
-		# Get last visit date from Access Log
-		last_visit = frappe.db.sql("""
-			SELECT MAX(event_time) as last_visit
-			FROM `tabAccess Log`
-			WHERE member = %s AND event_type = 'Check-In'
-		""", (self.name,), as_dict=True)
-
-		if last_visit and last_visit[0].last_visit:
-			self.last_visit_date = frappe.utils.getdate(last_visit[0].last_visit)
-
-		self.save()
+		recompute_member_statistics([self.name])
+		self.reload()
 		frappe.msgprint(_("Statistics updated successfully"), indicator="green", alert=True)
 
 		return {
@@ -179,3 +136,114 @@ class Member(Document):
 			"total_revenue": self.total_revenue,
 			"outstanding_balance": self.outstanding_balance
 		}
+
+
+# Member columns maintained by recompute_member_statistics
+STATISTICS_FIELDS = (
+	"active_contracts", "active_memberships", "total_bookings",
+	"total_revenue", "outstanding_balance", "last_visit_date",
+)
+
+
+def recompute_member_statistics(members=None):
+	"""Recompute statistics of many members with one grouped query per source
+
+	Args:
+		members: Member names, or None for every Active member
+
+	Returns:
+		int: Number of members whose statistics changed
+	"""
+	filters = {"name": ["in", list(members)]} if members is not None else {"status": "Active"}
+	if members is not None and not members:
+		return 0
+
+	rows = frappe.get_all(
+		"Member", filters=filters, fields=["name", "customer", *STATISTICS_FIELDS], limit_page_length=0
+	)
+	if not rows:
+		return 0
+
+	names = [r.name for r in rows]
+	customers = list({r.customer for r in rows if r.customer})
+
+	def grouped(query, values):
+		return {key: value for key, value in frappe.db.sql(query, values)}
+
+	active_contracts = grouped("""
+		SELECT member, COUNT(*) FROM `tabGRM Contract`
+		WHERE status = 'Active' AND member IN %(names)s GROUP BY member
+	""", {"names": names})
+	active_memberships = grouped("""
+		SELECT member, COUNT(*) FROM `tabMembership`
+		WHERE status = 'Active' AND member IN %(names)s GROUP BY member
+	""", {"names": names})
+	total_bookings = grouped("""
+		SELECT member, COUNT(*) FROM `tabBooking`
+		WHERE member IN %(names)s GROUP BY member
+	""", {"names": names})
+	# Devices log entries as Entry; Check-In is kept for older logs
+	last_visits = grouped("""
+		SELECT member, MAX(event_time) FROM `tabAccess Log`
+		WHERE event_type IN ('Entry', 'Check-In') AND member IN %(names)s GROUP BY member
+	""", {"names": names})
+
+	invoice_totals = {}
+	if customers:
+		for customer, revenue, outstanding in frappe.db.sql("""
+			SELECT customer,
+				SUM(CASE WHEN status = 'Paid' THEN grand_total ELSE 0 END),
+				SUM(CASE WHEN outstanding_amount > 0 THEN outstanding_amount ELSE 0 END)
+			FROM `tabSales Invoice`
+			WHERE docstatus = 1 AND customer IN %(customers)s
+			GROUP BY customer
+		""", {"customers": customers}):
+			invoice_totals[customer] = (revenue or 0, outstanding or 0)
+
+	updates = {}
+	for row in rows:
+		revenue, outstanding = invoice_totals.get(row.customer, (0, 0))
+		values = {
+			"active_contracts": active_contracts.get(row.name, 0),
+			"active_memberships": active_memberships.get(row.name, 0),
+			"total_bookings": total_bookings.get(row.name, 0),
+			"total_revenue": flt(revenue),
+			"outstanding_balance": flt(outstanding),
+		}
+		# Like a visit, the last visit date is only ever moved forward
+		if last_visits.get(row.name):
+			values["last_visit_date"] = getdate(last_visits[row.name])
+
+		changed = {
+			field: value for field, value in values.items()
+			if (flt(row.get(field)) if field != "last_visit_date" else row.get(field)) != value
+		}
+		if changed:
+			updates[row.name] = changed
+
+	if updates:
+		frappe.db.bulk_update("Member", updates, update_modified=False)
+
+	return len(updates)
+
+
+def get_members_touched_since(since):
+	"""Return Members whose contracts, memberships, bookings, invoices or access logs changed since ``since``"""
+	members = set()
+	for doctype in ("GRM Contract", "Membership", "Booking"):
+		members.update(frappe.get_all(
+			doctype, filters={"modified": [">=", since]}, pluck="member", distinct=True, limit_page_length=0
+		))
+	members.update(frappe.get_all(
+		"Access Log", filters={"creation": [">=", since]}, pluck="member", distinct=True, limit_page_length=0
+	))
+
+	customers = frappe.get_all(
+		"Sales Invoice", filters={"modified": [">=", since]}, pluck="customer", distinct=True, limit_page_length=0
+	)
+	if customers:
+		members.update(frappe.get_all("Member", filters={"customer": ["in", customers]}, pluck="name"))
+
+	members.discard(None)
+	members.discard("")
+	return list(members)
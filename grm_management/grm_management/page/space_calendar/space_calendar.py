@@ -5,7 +5,25 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
-from frappe.utils import getdate, add_days, get_datetime, nowdate, flt
+from frappe.utils import getdate, add_days, get_datetime, nowdate, flt, cint, date_diff
+from itertools import groupby
+
+from grm_management.grm_management.utils.availability import find_conflicts, to_minutes, MINUTES_PER_DAY
+from grm_management.grm_management.utils.batch import run_in_chunks
+from grm_management.grm_management.utils.enrichment import get_value_map
+
+# Occupancy grid cell states, highest wins when bookings share a bucket
+GRID_FREE = 0
+GRID_TENTATIVE = 1
+GRID_BOOKED = 2
+GRID_STATE_BY_STATUS = {
+	'Draft': GRID_TENTATIVE,
+	'Confirmed': GRID_BOOKED,
+	'Checked-in': GRID_BOOKED,
+	'Checked-out': GRID_BOOKED,
+}
+GRID_BUCKET_SIZES = (15, 30, 60)
+GRID_MAX_DAYS = 62
 
 @frappe.whitelist()
 def get_calendar_data(start_date, end_date, location=None, space_type=None, space=None):
@@ -39,16 +57,24 @@ def get_calendar_data(start_date, end_date, location=None, space_type=None, spac
 	bookings = frappe.get_all('GRM Booking',
 		filters=booking_filters,
 		fields=[
-			'name', 'space', 'tenant', 'booking_date',
+			'name', 'space', 'tenant', 'tenant_name', 'booking_date',
 			'start_time', 'end_time', 'status', 'duration_hours',
 			'total_amount', 'expiry_date'
 		],
 		order_by='booking_date, start_time'
 	)
 
+	# tenant_name is copied onto the booking; look up the rare rows missing it in one query
+	missing_names = get_value_map('GRM Tenant',
+		(b.get('tenant') for b in bookings if not b.get('tenant_name')),
+		['tenant_name']
+	)
+
 	# Enrich bookings with tenant names and expiry status
 	for booking in bookings:
-		booking['tenant_name'] = frappe.db.get_value('GRM Tenant', booking.get('tenant'), 'tenant_name') or 'Unknown'
+		if not booking.get('tenant_name'):
+			tenant = missing_names.get(booking.get('tenant'))
+			booking['tenant_name'] = (tenant and tenant.tenant_name) or 'Unknown'
 		booking['booking_date'] = str(booking['booking_date'])
 
 		# Check if booking has expired
@@ -370,54 +396,134 @@ def get_space_availability(date, location=None, space_type=None):
 	return spaces
 
 @frappe.whitelist()
-def check_space_conflict(space, booking_date, start_time, end_time, exclude_booking=None):
-	"""Check if there's a booking conflict for a space"""
-	filters = {
-		'space': space,
-		'booking_date': booking_date,
-		'status': ['not in', ['Cancelled', 'No-show']]
-	}
+def get_occupancy_grid(start_date, end_date, location=None, space_type=None, space=None, bucket_minutes=30, encoding='rle'):
+	"""Get a spaces x time-buckets occupancy matrix for a date range
 
-	if exclude_booking:
-		filters['name'] = ['!=', exclude_booking]
+	Each space gets one row covering every bucket of every day in the range,
+	days back to back. Cells are 0 (free), 1 (tentative: Draft) or 2 (booked).
 
-	existing_bookings = frappe.get_all('GRM Booking',
-		filters=filters,
-		fields=['start_time', 'end_time', 'name']
+	Args:
+		bucket_minutes: 15, 30 or 60
+		encoding: 'rle' - comma separated "<state>x<count>" runs, e.g. "0x18,2x4,0x26"
+			'string' - one digit per bucket
+
+	Returns:
+		dict: bucket layout and a list of spaces with their encoded 'grid'
+	"""
+	bucket = cint(bucket_minutes)
+	if bucket not in GRID_BUCKET_SIZES:
+		frappe.throw(_('Bucket size must be one of {0} minutes').format(', '.join(str(b) for b in GRID_BUCKET_SIZES)))
+	if encoding not in ('rle', 'string'):
+		frappe.throw(_('Encoding must be rle or string'))
+
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	day_count = date_diff(end_date, start_date) + 1
+	if day_count < 1:
+		frappe.throw(_('End date must be on or after start date'))
+	if day_count > GRID_MAX_DAYS:
+		frappe.throw(_('Date range cannot exceed {0} days').format(GRID_MAX_DAYS))
+
+	space_filters = {'allow_booking': 1}
+	if location:
+		space_filters['location'] = location
+	if space_type:
+		space_filters['space_type'] = space_type
+	if space:
+		space_filters['name'] = space
+
+	spaces = frappe.get_all('GRM Space',
+		filters=space_filters,
+		fields=['name', 'space_name', 'space_type', 'capacity'],
+		order_by='space_type, space_name'
+	)
+
+	buckets_per_day = MINUTES_PER_DAY // bucket
+	rows = {s['name']: bytearray(day_count * buckets_per_day) for s in spaces}
+
+	bookings = spaces and frappe.get_all('GRM Booking',
+		filters={
+			'space': ['in', list(rows)],
+			'booking_date': ['between', [start_date, end_date]],
+			'status': ['in', list(GRID_STATE_BY_STATUS)]
+		},
+		fields=['space', 'booking_date', 'start_time', 'end_time', 'status'],
+		order_by='space, booking_date, start_time'
 	)
 
-	for booking in existing_bookings:
-		# Check for time overlap
-		if (start_time < str(booking['end_time']) and end_time > str(booking['start_time'])):
-			return {
-				'conflict': True,
-				'booking': booking['name'],
-				'message': _('This space is already booked from {0} to {1}').format(
-					booking['start_time'], booking['end_time']
-				)
-			}
+	# Single pass: mark the buckets each booking touches in its space's row
+	for booking in bookings:
+		start, end = to_minutes(booking['start_time']), to_minutes(booking['end_time'])
+		if start is None or end is None or end <= start:
+			continue
+
+		row = rows[booking['space']]
+		state = GRID_STATE_BY_STATUS[booking['status']]
+		offset = date_diff(booking['booking_date'], start_date) * buckets_per_day
+		first = offset + start // bucket
+		last = offset + min(-(-end // bucket), buckets_per_day)
+		for i in range(first, last):
+			if row[i] < state:
+				row[i] = state
+
+	for s in spaces:
+		s['grid'] = _encode_grid_row(rows[s['name']], encoding)
+
+	return {
+		'start_date': str(start_date),
+		'end_date': str(end_date),
+		'bucket_minutes': bucket,
+		'buckets_per_day': buckets_per_day,
+		'encoding': encoding,
+		'states': {GRID_FREE: 'free', GRID_TENTATIVE: 'tentative', GRID_BOOKED: 'booked'},
+		'spaces': spaces
+	}
+
+def _encode_grid_row(row, encoding):
+	"""Encode one occupancy row as run-length pairs or a digit string"""
+	if encoding == 'string':
+		return ''.join(str(cell) for cell in row)
+	return ','.join(f'{state}x{len(list(run))}' for state, run in groupby(row))
+
+@frappe.whitelist()
+def check_space_conflict(space, booking_date, start_time, end_time, exclude_booking=None):
+	"""Check if there's a booking conflict for a space"""
+	conflicts = find_conflicts('GRM Booking', space, booking_date, start_time, end_time,
+		exclude=exclude_booking)
+
+	if conflicts:
+		booking = conflicts[0]
+		return {
+			'conflict': True,
+			'booking': booking['name'],
+			'message': _('This space is already booked from {0} to {1}').format(
+				booking['start_time'], booking['end_time']
+			)
+		}
 
 	return {'conflict': False}
 
 @frappe.whitelist()
 def mark_expired_bookings():
-	"""Scheduled task to mark expired bookings"""
-	expired_bookings = frappe.get_all('GRM Booking',
+	"""Scheduled task to mark expired bookings
+
+	Bookings are saved one by one so their hooks run, in checkpointed chunks
+	with one commit per chunk.
+	"""
+	result = run_in_chunks(
+		'mark_expired_bookings',
+		'GRM Booking',
 		filters={
 			'expiry_date': ['<', nowdate()],
 			'status': ['in', ['Draft', 'Confirmed']],
 			'docstatus': ['<', 2]
 		},
-		pluck='name'
+		process=_expire_booking,
+		error_title='Booking Expiry Error'
 	)
+	return result['processed']
 
-	for booking_name in expired_bookings:
-		booking = frappe.get_doc('GRM Booking', booking_name)
-		booking.status = 'No-show'
-		booking.add_comment('Comment', 'Booking expired - not converted to subscription')
-		booking.save(ignore_permissions=True)
 
-	if expired_bookings:
-		frappe.db.commit()
-		return len(expired_bookings)
-	return 0
+def _expire_booking(booking):
+	booking.status = 'No-show'
+	booking.add_comment('Comment', 'Booking expired - not converted to subscription')
+	booking.save(ignore_permissions=True)
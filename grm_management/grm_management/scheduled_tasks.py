@@ -5,6 +5,8 @@ import frappe
 from frappe import _
 from frappe.utils import nowdate, now_datetime, add_days, add_months, getdate
 
+from grm_management.grm_management.utils.batch import bulk_update, run_in_chunks
+
 
 # ============================================================================
 # HOURLY TASKS
@@ -15,29 +17,34 @@ def hourly():
 	sync_all_device_attendance()
 	check_booking_access()
 	check_device_health()
+	retry_device_provisioning()
 
 
 def sync_all_device_attendance():
 	"""Sync attendance from all online Access Devices (Direct ZK and BioTime)"""
 	try:
-		# Sync Direct ZK devices
+		# Sync Direct ZK devices concurrently, writing results from this thread
+		from grm_management.grm_management.doctype.access_device.access_device import sync_direct_devices
+
 		direct_devices = frappe.get_all("Access Device", filters={
 			"status": "Online",
 			"auto_sync": 1,
 			"connection_mode": "Direct ZK"
-		}, fields=["name", "device_name"])
-
-		for device in direct_devices:
-			try:
-				device_doc = frappe.get_doc("Access Device", device.name)
-				device_doc.sync_attendance()
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(
-					f"Error syncing Direct ZK device {device.device_name}: {str(e)}",
-					"Scheduled Device Sync Error"
-				)
-				continue
+		}, pluck="name")
+
+		summary = []
+		try:
+			summary = sync_direct_devices(direct_devices)
+		except Exception as e:
+			frappe.log_error(f"Error syncing Direct ZK devices: {str(e)}", "Scheduled Device Sync Error")
+
+		for row in summary:
+			frappe.logger().info(
+				f"ZK sync {row['device_name']}: {row['status']}, fetched {row['fetched']}, "
+				f"new {row['new_logs']}, duplicates {row['duplicate_logs']}, "
+				f"fetch {row['fetch_seconds']}s, write {row['write_seconds']}s"
+				+ (f", error: {row['error']}" if row["error"] else "")
+			)
 
 		# Sync BioTime API (centralized sync for all BioTime devices)
 		biotime_settings = frappe.get_single("BioTime Settings")
@@ -57,6 +64,16 @@ def sync_all_device_attendance():
 		frappe.log_error(f"Error in sync_all_device_attendance: {str(e)}", "Scheduled Task Error")
 
 
+def retry_device_provisioning():
+	"""Re-schedule device user provisioning that is still queued"""
+	try:
+		from grm_management.grm_management.utils.device_provisioning import retry_pending_queues
+
+		retry_pending_queues()
+	except Exception as e:
+		frappe.log_error(f"Error in retry_device_provisioning: {str(e)}", "Scheduled Task Error")
+
+
 def check_booking_access():
 	"""Grant/revoke access for bookings based on time"""
 	try:
@@ -82,6 +99,8 @@ def check_booking_access():
 
 def check_device_health():
 	"""Ping all devices and update status"""
+	from grm_management.grm_management.utils import zk_pool
+
 	try:
 		devices = frappe.get_all("Access Device", filters={
 			"status": ["!=", "Maintenance"]
@@ -93,10 +112,12 @@ def check_device_health():
 		for device in devices:
 			try:
 				device_doc = frappe.get_doc("Access Device", device.name)
-				conn = device_doc.get_connection()
+
+				# Reuses a live pooled connection instead of a new handshake
+				with zk_pool.connection(device_doc, verify=True) as conn:
+					pass
 
 				if conn:
-					conn.disconnect()
 					online_count += 1
 				else:
 					offline_count += 1
@@ -131,27 +152,15 @@ def daily():
 def expire_contracts():
 	"""Find and expire contracts where end_date < today"""
 	try:
-		today = getdate(nowdate())
+		result = run_in_chunks(
+			"expire_contracts",
+			"GRM Contract",
+			{"status": "Active", "end_date": ["<", getdate(nowdate())]},
+			lambda contract: contract.expire(),
+			error_title="Contract Expiry Error",
+		)
 
-		# Find Active contracts that have expired
-		expired_contracts = frappe.get_all("GRM Contract", filters={
-			"status": "Active",
-			"end_date": ["<", today]
-		}, fields=["name", "contract_number", "member"])
-
-		for contract in expired_contracts:
-			try:
-				contract_doc = frappe.get_doc("GRM Contract", contract.name)
-				contract_doc.expire()
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(
-					f"Error expiring contract {contract.contract_number}: {str(e)}",
-					"Contract Expiry Error"
-				)
-				continue
-
-		frappe.logger().info(f"Daily: Expired {len(expired_contracts)} contracts")
+		frappe.logger().info(f"Daily: Expired {result['processed']} contracts ({result['failed']} failed)")
 
 	except Exception as e:
 		frappe.log_error(f"Error in expire_contracts: {str(e)}", "Scheduled Task Error")
@@ -160,27 +169,15 @@ def expire_contracts():
 def expire_memberships():
 	"""Find and expire memberships where end_date < today"""
 	try:
-		today = getdate(nowdate())
+		result = run_in_chunks(
+			"expire_memberships",
+			"Membership",
+			{"status": "Active", "end_date": ["<", getdate(nowdate())]},
+			lambda membership: membership.expire(),
+			error_title="Membership Expiry Error",
+		)
 
-		# Find Active memberships that have expired
-		expired_memberships = frappe.get_all("Membership", filters={
-			"status": "Active",
-			"end_date": ["<", today]
-		}, fields=["name", "membership_number", "member"])
-
-		for membership in expired_memberships:
-			try:
-				membership_doc = frappe.get_doc("Membership", membership.name)
-				membership_doc.expire()
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(
-					f"Error expiring membership {membership.membership_number}: {str(e)}",
-					"Membership Expiry Error"
-				)
-				continue
-
-		frappe.logger().info(f"Daily: Expired {len(expired_memberships)} memberships")
+		frappe.logger().info(f"Daily: Expired {result['processed']} memberships ({result['failed']} failed)")
 
 	except Exception as e:
 		frappe.log_error(f"Error in expire_memberships: {str(e)}", "Scheduled Task Error")
@@ -266,51 +263,54 @@ def mark_no_show_bookings():
 	try:
 		yesterday = add_days(nowdate(), -1)
 
-		# Find Confirmed bookings from yesterday that were not checked-in
-		no_show_bookings = frappe.get_all("Booking", filters={
-			"status": "Confirmed",
-			"booking_date": yesterday
-		}, fields=["name"])
-
-		for booking in no_show_bookings:
-			try:
-				booking_doc = frappe.get_doc("Booking", booking.name)
-				booking_doc.mark_no_show()
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(
-					f"Error marking booking {booking.name} as no-show: {str(e)}",
-					"Booking No-Show Error"
-				)
-				continue
+		# Yesterday's bookings are all past their end time plus grace period, so
+		# Booking.mark_no_show would only flip the status: do it set-based
+		count = bulk_update(
+			"Booking",
+			filters={"status": "Confirmed", "booking_date": yesterday},
+			values={"status": "No-Show"},
+			fields=["space", "booking_date"],
+			after_chunk=_invalidate_booking_index,
+		)
 
-		frappe.logger().info(f"Daily: Marked {len(no_show_bookings)} bookings as No-Show")
+		frappe.logger().info(f"Daily: Marked {count} bookings as No-Show")
 
 	except Exception as e:
 		frappe.log_error(f"Error in mark_no_show_bookings: {str(e)}", "Scheduled Task Error")
 
 
-def update_member_statistics():
-	"""Refresh statistics for all active members"""
+def _invalidate_booking_index(rows):
+	"""Drop availability index keys of bookings changed by bulk_update"""
+	from grm_management.grm_management.utils.availability import invalidate
+
+	for space, booking_date in {(r.space, r.booking_date) for r in rows}:
+		invalidate("Booking", space, booking_date)
+
+
+def update_member_statistics(since=None):
+	"""Refresh statistics of every active member with grouped queries
+
+	Args:
+		since: Only recompute members touched since this datetime; pass "last_run"
+			to use the previous run's start (falls back to every member)
+	"""
+	from grm_management.grm_management.doctype.member.member import (
+		get_members_touched_since,
+		recompute_member_statistics,
+	)
+
 	try:
-		# Update statistics for members with active contracts or memberships
-		members = frappe.get_all("Member", filters={
-			"status": "Active"
-		}, fields=["name"], limit=100)  # Limit to avoid timeout
+		started = now_datetime()
+		if since == "last_run":
+			since = frappe.db.get_global("grm_member_stats_last_run")
 
-		for member in members:
-			try:
-				member_doc = frappe.get_doc("Member", member.name)
-				member_doc.update_statistics()
-				frappe.db.commit()
-			except Exception as e:
-				frappe.log_error(
-					f"Error updating statistics for member {member.name}: {str(e)}",
-					"Member Stats Update Error"
-				)
-				continue
+		members = get_members_touched_since(since) if since else None
+		changed = recompute_member_statistics(members)
+
+		frappe.db.set_global("grm_member_stats_last_run", str(started))
+		frappe.db.commit()
 
-		frappe.logger().info(f"Daily: Updated statistics for {len(members)} members")
+		frappe.logger().info(f"Daily: Updated statistics for {changed} members")
 
 	except Exception as e:
 		frappe.log_error(f"Error in update_member_statistics: {str(e)}", "Scheduled Task Error")
@@ -0,0 +1,232 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Compiled Access Rule evaluation.
+
+Active Access Rules are compiled once into plain tuples (validity window as
+date ordinals, time window as seconds of the day, weekday bitmask, device
+set) and kept in a per-process cache keyed by ``(member, device)``. A
+decision is then a handful of integer comparisons, without loading the rule
+document.
+
+Saving or deleting an Access Rule bumps a version stamp in Redis; every
+process notices the new stamp within ``VERSION_CHECK_INTERVAL`` seconds and
+drops its compiled policies. The newest ``modified`` of the rules is part of
+the version too, so direct writes (``db_set``, ``frappe.db.set_value``) are
+picked up the same way.
+"""
+
+import time
+
+import frappe
+from frappe.utils import get_datetime, getdate, parse_time
+
+VERSION_KEY = "grm_access_policy|version"
+
+# How often a process re-reads the version stamp, in seconds
+VERSION_CHECK_INTERVAL = 2
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+ALL_DAYS = (1 << len(WEEKDAYS)) - 1
+
+# Per-site process cache: {site: {"version", "checked", "members", "policies"}}
+_state = {}
+
+
+def _seconds(value):
+	t = parse_time(value)
+	return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _format_seconds(seconds):
+	return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _weekday_mask(allowed_days):
+	if not allowed_days:
+		return ALL_DAYS
+	return sum(1 << i for i, day in enumerate(WEEKDAYS) if day in allowed_days) or ALL_DAYS
+
+
+def compile_rule(rule, devices):
+	"""Compile an Access Rule (doc or dict) and its device names into a tuple
+
+	Returns:
+		tuple: (name, from ordinal, until ordinal, start seconds, end seconds,
+			weekday mask, limited, entries remaining, device frozenset).
+			Missing dates are unbounded; start/end are None for 24/7 rules.
+	"""
+	if rule.get("is_24_7") or not (rule.get("access_start_time") and rule.get("access_end_time")):
+		start = end = None
+	else:
+		start, end = _seconds(rule.get("access_start_time")), _seconds(rule.get("access_end_time"))
+
+	limit_type = rule.get("limit_type")
+	return (
+		rule.get("name"),
+		getdate(rule.get("valid_from")).toordinal() if rule.get("valid_from") else None,
+		getdate(rule.get("valid_until")).toordinal() if rule.get("valid_until") else None,
+		start,
+		end,
+		_weekday_mask(rule.get("allowed_days")),
+		bool(limit_type and limit_type != "None"),
+		rule.get("entries_remaining") or 0,
+		frozenset(d for d in devices if d),
+	)
+
+
+def evaluate(compiled, device, at):
+	"""Decide one compiled rule for ``device`` at datetime ``at``
+
+	Returns:
+		tuple: (allowed, reason)
+	"""
+	_name, valid_from, valid_until, start, end, days, limited, remaining, devices = compiled
+
+	day = at.toordinal()
+	if valid_from is not None and day < valid_from:
+		return False, "Access not yet valid"
+	if valid_until is not None and day > valid_until:
+		return False, "Access has expired"
+
+	if start is not None:
+		seconds = at.hour * 3600 + at.minute * 60 + at.second
+		if seconds < start or seconds > end:
+			return False, f"Access only allowed between {_format_seconds(start)} and {_format_seconds(end)}"
+
+	if not days & (1 << at.weekday()):
+		return False, f"Access not allowed on {WEEKDAYS[at.weekday()]}"
+
+	if limited and remaining <= 0:
+		return False, "Entry limit reached"
+
+	if device not in devices:
+		return False, "Device not authorized for this rule"
+
+	return True, "Access granted"
+
+
+def _get_state():
+	site = frappe.local.site
+	state = _state.get(site)
+	now = time.monotonic()
+
+	if state is None or now - state["checked"] > VERSION_CHECK_INTERVAL:
+		version = (
+			frappe.cache().get_value(VERSION_KEY) or 0,
+			frappe.db.sql("SELECT MAX(`modified`) FROM `tabAccess Rule`")[0][0],
+		)
+		if state is None or state["version"] != version:
+			state = {"version": version, "members": set(), "policies": {}}
+			_state[site] = state
+		state["checked"] = now
+
+	return state
+
+
+def _load_members(state, members):
+	"""Compile the Active rules of ``members`` that are not cached yet, with two queries"""
+	missing = list({m for m in members if m} - state["members"])
+	if not missing:
+		return
+
+	rules = frappe.get_all(
+		"Access Rule",
+		filters={"member": ["in", missing], "status": "Active"},
+		fields=[
+			"name", "member", "valid_from", "valid_until", "is_24_7", "access_start_time",
+			"access_end_time", "allowed_days", "limit_type", "entries_remaining",
+		],
+		limit_page_length=0,
+	)
+
+	devices = {}
+	if rules:
+		for row in frappe.db.sql("""
+			SELECT parent, access_device
+			FROM `tabAccess Rule Device`
+			WHERE parenttype = 'Access Rule' AND parent IN %(rules)s
+		""", {"rules": [r.name for r in rules]}, as_dict=True):
+			devices.setdefault(row.parent, []).append(row.access_device)
+
+	policies = state["policies"]
+	for rule in rules:
+		compiled = compile_rule(rule, devices.get(rule.name, ()))
+		for device in compiled[-1]:
+			policies.setdefault((rule.member, device), []).append(compiled)
+		# Kept under (member, None) for the denial reason on unlisted devices
+		policies.setdefault((rule.member, None), []).append(compiled)
+
+	state["members"].update(missing)
+
+
+def _decide(state, member, device, at, rule=None):
+	rules = state["policies"].get((member, device))
+	listed = state["policies"].get((member, None))
+	if rule:
+		rules = [compiled for compiled in rules or () if compiled[0] == rule]
+		listed = [compiled for compiled in listed or () if compiled[0] == rule]
+	if not rules:
+		if listed:
+			return {"allowed": False, "reason": "Device not authorized for this rule", "rule": None}
+		return {"allowed": False, "reason": "No active access rule", "rule": None}
+
+	reason = None
+	for compiled in rules:
+		allowed, rule_reason = evaluate(compiled, device, at)
+		if allowed:
+			return {"allowed": True, "reason": rule_reason, "rule": compiled[0]}
+		reason = reason or rule_reason
+
+	return {"allowed": False, "reason": reason, "rule": None}
+
+
+def check_access(member, device, at=None, rule=None):
+	"""Decide whether ``member`` may pass ``device`` at ``at`` (defaults to now)
+
+	Args:
+		rule: Only consider this Access Rule
+
+	Returns:
+		dict: {"allowed": bool, "reason": str, "rule": granting Access Rule or None}
+	"""
+	state = _get_state()
+	_load_members(state, [member])
+	return _decide(state, member, device, get_datetime(at) if at else frappe.utils.now_datetime(), rule)
+
+
+def check_access_many(events):
+	"""Decide a batch of punches, e.g. live device logs or an audit replay
+
+	Args:
+		events: Iterable of (member, device, event_time) tuples or dicts with
+			those keys
+
+	Returns:
+		list: One decision dict per event, in order (see check_access)
+	"""
+	events = [
+		(e.get("member"), e.get("device"), e.get("event_time")) if isinstance(e, dict) else tuple(e)
+		for e in events
+	]
+
+	state = _get_state()
+	_load_members(state, (e[0] for e in events))
+
+	now = frappe.utils.now_datetime()
+	return [
+		_decide(state, member, device, get_datetime(at) if at else now)
+		for member, device, at in events
+	]
+
+
+def invalidate():
+	"""Make every process recompile its policies, now and again after commit"""
+	_bump_version()
+	frappe.db.after_commit.add(_bump_version)
+
+
+def _bump_version():
+	frappe.cache().set_value(VERSION_KEY, frappe.generate_hash(length=10))
+	_state.pop(frappe.local.site, None)
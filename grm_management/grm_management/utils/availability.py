@@ -0,0 +1,335 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Per-space, per-day booking availability index.
+
+Each (doctype, space, date) key holds the day's non-cancelled bookings as a
+list of intervals sorted by start minute. Lookups bisect that list instead of
+reloading and scanning every booking of the day, so the booking form, the
+space calendar and the Booking controller all share one overlap rule:
+two bookings conflict when ``start < other_end and end > other_start``.
+
+Entries live in Redis (``frappe.cache``) and are refreshed one key at a time
+after a booking is committed. The index only serves read endpoints: booking
+controllers validate with ``for_update=True``, which locks the space row and
+reads the day's bookings from the database, so a stale entry can never let
+an overlapping booking through.
+
+Slot listings work in integer minutes over a per-day occupancy bitmap (bit
+``m`` set when minute ``m`` is booked), bounded by the operating hours of the
+space's GRM Location.
+"""
+
+import bisect
+import functools
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import cstr, getdate
+
+MINUTES_PER_DAY = 24 * 60
+
+# Seconds an index entry may live without being touched by a booking change
+INDEX_TTL = 24 * 60 * 60
+
+# Used when a location has no operating hours configured
+DEFAULT_OPERATING_HOURS = (8 * 60, 22 * 60)
+
+# GRM Location.weekend_days options -> closed weekdays (Monday = 0)
+WEEKEND_DAYS = {
+	"Friday-Saturday": (4, 5),
+	"Saturday-Sunday": (5, 6),
+	"Sunday-Monday": (6, 0),
+	"Friday Only": (4,),
+	"No Weekend": (),
+}
+
+# Indexed booking doctypes: statuses that never block a slot and the
+# optional "all day" flag
+INDEX_SOURCES = {
+	"GRM Booking": {
+		"inactive_statuses": ("Cancelled", "No-show"),
+		"all_day_field": None,
+		"space_doctype": "GRM Space",
+	},
+	"Booking": {
+		"inactive_statuses": ("Cancelled", "No-Show"),
+		"all_day_field": "all_day",
+		"space_doctype": "Space",
+	},
+}
+
+
+def to_minutes(value):
+	"""Convert a Time field value (timedelta, time or "HH:MM[:SS]" string) to minutes since midnight."""
+	if value is None or value == "":
+		return None
+
+	if isinstance(value, timedelta):
+		return int(value.total_seconds() // 60)
+
+	if isinstance(value, (datetime, time)):
+		return value.hour * 60 + value.minute
+
+	value = cstr(value).strip()
+	for fmt in ("%H:%M:%S", "%H:%M", "%H:%M:%S.%f", "%I:%M %p", "%I:%M:%S %p"):
+		try:
+			parsed = datetime.strptime(value, fmt)
+			return parsed.hour * 60 + parsed.minute
+		except ValueError:
+			continue
+
+	frappe.throw(frappe._("Invalid time format: {0}").format(value), frappe.ValidationError)
+
+
+def format_minutes(minutes):
+	"""Format minutes since midnight as HH:MM."""
+	return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _cache_key(doctype, space, booking_date):
+	return f"grm_availability|{doctype}|{space}|{getdate(booking_date)}"
+
+
+def _build_entry(rows, all_day_field=None):
+	"""Turn booking rows into a sorted interval entry.
+
+	The entry keeps the start minutes in their own list for bisecting, and the
+	longest interval length so a lookup knows how far back an overlapping
+	booking can start.
+	"""
+	intervals = []
+	for row in rows:
+		if all_day_field and row.get(all_day_field):
+			start, end = 0, MINUTES_PER_DAY
+		else:
+			start, end = to_minutes(row.get("start_time")), to_minutes(row.get("end_time"))
+			if start is None or end is None:
+				continue
+		intervals.append((start, end, row.get("name"), row.get("status")))
+
+	intervals.sort()
+	return {
+		"starts": [i[0] for i in intervals],
+		"intervals": intervals,
+		"max_span": max((i[1] - i[0] for i in intervals), default=0),
+	}
+
+
+def _load_entries(doctype, space, dates, for_update=False):
+	"""Load index entries for several days of one space with a single query."""
+	source = INDEX_SOURCES[doctype]
+	fields = ["name", "booking_date", "start_time", "end_time", "status"]
+	if source["all_day_field"]:
+		fields.append(source["all_day_field"])
+
+	rows = frappe.get_all(
+		doctype,
+		filters={
+			"space": space,
+			"booking_date": ["in", [str(d) for d in dates]],
+			"status": ["not in", list(source["inactive_statuses"])],
+		},
+		fields=fields,
+		for_update=for_update,
+	)
+
+	by_date = {d: [] for d in dates}
+	for row in rows:
+		by_date.setdefault(getdate(row.booking_date), []).append(row)
+
+	return {d: _build_entry(day_rows, source["all_day_field"]) for d, day_rows in by_date.items()}
+
+
+def get_day_entries(doctype, space, dates):
+	"""Return {date: entry} for the given days, building missing keys from one query."""
+	dates = [getdate(d) for d in dates]
+	cache = frappe.cache()
+
+	entries = {}
+	missing = []
+	for d in dates:
+		entry = cache.get_value(_cache_key(doctype, space, d))
+		if entry is None:
+			missing.append(d)
+		else:
+			entries[d] = entry
+
+	if missing:
+		for d, entry in _load_entries(doctype, space, missing).items():
+			cache.set_value(_cache_key(doctype, space, d), entry, expires_in_sec=INDEX_TTL)
+			entries[d] = entry
+
+	return entries
+
+
+def get_day_intervals(doctype, space, booking_date, statuses=None, exclude=None):
+	"""Return the day's (start_minute, end_minute, name, status) intervals, sorted by start."""
+	entry = get_day_entries(doctype, space, [booking_date])[getdate(booking_date)]
+	return [
+		i for i in entry["intervals"]
+		if (statuses is None or i[3] in statuses) and (not exclude or i[2] != exclude)
+	]
+
+
+def find_conflicts(doctype, space, booking_date, start_time, end_time, statuses=None, exclude=None,
+		all_day=False, for_update=False):
+	"""Return bookings of ``space`` on ``booking_date`` overlapping [start_time, end_time).
+
+	Args:
+		doctype: "GRM Booking" or "Booking"
+		statuses: Only consider bookings in these statuses (default: every non-cancelled one)
+		exclude: Booking name to ignore, e.g. the document being validated
+		all_day: Treat the requested range as the whole day
+		for_update: Bypass the index: lock the space row and read the day's bookings
+			from the database (use before writing a booking)
+
+	Returns:
+		list: Dicts with name, start_time, end_time (HH:MM) and status
+	"""
+	if all_day:
+		start, end = 0, MINUTES_PER_DAY
+	else:
+		start, end = to_minutes(start_time), to_minutes(end_time)
+
+	d = getdate(booking_date)
+	if for_update:
+		# Serializes concurrent writers of this space until they commit
+		frappe.db.sql(
+			f"SELECT `name` FROM `tab{INDEX_SOURCES[doctype]['space_doctype']}` WHERE `name` = %s FOR UPDATE",
+			space,
+		)
+		entry = _load_entries(doctype, space, [d], for_update=True)[d]
+	else:
+		entry = get_day_entries(doctype, space, [d])[d]
+
+	# Only intervals starting inside (start - max_span, end) can overlap
+	lo = bisect.bisect_right(entry["starts"], start - entry["max_span"])
+	hi = bisect.bisect_left(entry["starts"], end)
+
+	conflicts = []
+	for b_start, b_end, name, status in entry["intervals"][lo:hi]:
+		if b_end <= start or name == exclude:
+			continue
+		if statuses is not None and status not in statuses:
+			continue
+		conflicts.append({
+			"name": name,
+			"start_time": format_minutes(b_start),
+			"end_time": format_minutes(b_end),
+			"status": status,
+		})
+
+	return conflicts
+
+
+def invalidate(doctype, space, booking_date):
+	"""Drop one index key so the next lookup rebuilds it from the database."""
+	if space and booking_date:
+		frappe.cache().delete_value(_cache_key(doctype, space, booking_date))
+
+
+def refresh(doctype, space, booking_date):
+	"""Rebuild one index key from the database."""
+	if not space or not booking_date:
+		return
+	d = getdate(booking_date)
+	entry = _load_entries(doctype, space, [d])[d]
+	frappe.cache().set_value(_cache_key(doctype, space, d), entry, expires_in_sec=INDEX_TTL)
+
+
+def update_index_for_doc(doc, method=None):
+	"""Refresh the index keys touched by a booking once the transaction commits.
+
+	Covers the booking's current space/day and, when either changed, the one it
+	was moved away from.
+	"""
+	keys = {(doc.space, getdate(doc.booking_date) if doc.booking_date else None)}
+
+	before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+	if before and before.get("space") and before.get("booking_date"):
+		keys.add((before.space, getdate(before.booking_date)))
+
+	for space, booking_date in keys:
+		if not space or not booking_date:
+			continue
+		# Until the commit lands, readers must not see the cached pre-change day
+		invalidate(doc.doctype, space, booking_date)
+		frappe.db.after_commit.add(functools.partial(refresh, doc.doctype, space, booking_date))
+		frappe.db.after_rollback.add(functools.partial(invalidate, doc.doctype, space, booking_date))
+
+
+def get_operating_hours(location):
+	"""Return the opening rules of a GRM Location.
+
+	Returns:
+		dict: open/close minutes (close may be 1440) and the closed weekdays
+	"""
+	hours = {"open": DEFAULT_OPERATING_HOURS[0], "close": DEFAULT_OPERATING_HOURS[1], "closed_weekdays": ()}
+	if not location:
+		return hours
+
+	loc = frappe.get_cached_doc("GRM Location", location)
+	hours["closed_weekdays"] = WEEKEND_DAYS.get(loc.weekend_days or "", ())
+
+	if loc.operating_hours_24_7:
+		hours["open"], hours["close"] = 0, MINUTES_PER_DAY
+	elif loc.operating_start_time and loc.operating_end_time:
+		hours["open"] = to_minutes(loc.operating_start_time)
+		hours["close"] = to_minutes(loc.operating_end_time)
+		# A closing time at or before opening means the location closes at midnight
+		if hours["close"] <= hours["open"]:
+			hours["close"] = MINUTES_PER_DAY
+
+	return hours
+
+
+def occupancy_bitmap(intervals):
+	"""Return an int with bit ``m`` set for every booked minute of the day."""
+	bitmap = 0
+	for start, end, *_ in intervals:
+		start, end = max(start, 0), min(end, MINUTES_PER_DAY)
+		if end > start:
+			bitmap |= ((1 << (end - start)) - 1) << start
+	return bitmap
+
+
+def generate_slots(bitmap, open_minute, close_minute, duration):
+	"""Split [open_minute, close_minute) into back-to-back slots of ``duration`` minutes.
+
+	Returns:
+		list: Dicts with start_time, end_time (HH:MM), available and duration_minutes
+	"""
+	slot_mask = (1 << duration) - 1
+	slots = []
+	for start in range(open_minute, close_minute - duration + 1, duration):
+		slots.append({
+			"start_time": format_minutes(start),
+			"end_time": format_minutes(start + duration),
+			"available": not bitmap & (slot_mask << start),
+			"duration_minutes": duration,
+		})
+	return slots
+
+
+def get_day_slots(space, location, dates, duration, statuses=None):
+	"""Return {date: {"closed": bool, "slots": [...]}} for one GRM Space over several days.
+
+	Bookings for all days come from the index with at most one query.
+	"""
+	hours = get_operating_hours(location)
+	entries = get_day_entries("GRM Booking", space, dates)
+
+	result = {}
+	for d, entry in entries.items():
+		if d.weekday() in hours["closed_weekdays"]:
+			result[d] = {"closed": True, "slots": []}
+			continue
+
+		intervals = [i for i in entry["intervals"] if statuses is None or i[3] in statuses]
+		result[d] = {
+			"closed": False,
+			"slots": generate_slots(occupancy_bitmap(intervals), hours["open"], hours["close"], duration),
+		}
+	return result
@@ -0,0 +1,127 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Chunked batch processing for scheduled jobs.
+
+``run_in_chunks`` walks the matching documents in name order, a chunk at a
+time, runs a per-document callback and commits once per chunk. The last
+committed name is checkpointed in Redis, so a job that was killed resumes
+after it on its next run the same day. A failing document is rolled back to
+its savepoint, logged and skipped without losing the rest of the chunk.
+
+``bulk_update`` is the set-based fast path for changes that need no
+document hooks: one ``UPDATE ... WHERE name IN`` per chunk, with a callback
+to invalidate caches the hooks would have maintained.
+"""
+
+import frappe
+from frappe.utils import now_datetime, nowdate
+
+# Documents per chunk (and per commit)
+BATCH_CHUNK_SIZE = 200
+
+# Lifetime of a checkpoint, in seconds
+CHECKPOINT_TTL = 24 * 60 * 60
+
+
+def _checkpoint_key(job):
+	return f"grm_batch|{job}|{nowdate()}"
+
+
+def _as_filter_list(doctype, filters):
+	"""Convert dict filters to list filters, so several conditions can apply to one field"""
+	if isinstance(filters, dict):
+		return [
+			[doctype, field, *value] if isinstance(value, (list, tuple)) else [doctype, field, "=", value]
+			for field, value in filters.items()
+		]
+	return list(filters or [])
+
+
+def _iter_chunks(doctype, filters, fields, chunk_size, after=""):
+	"""Yield lists of rows matching ``filters`` in name order, using keyset pagination"""
+	filters = _as_filter_list(doctype, filters)
+	while True:
+		rows = frappe.get_all(
+			doctype,
+			# The keyset condition is added to the caller's filters, including a name filter
+			filters=[*filters, [doctype, "name", ">", after]],
+			fields=["name", *fields],
+			order_by="name asc",
+			limit_page_length=chunk_size,
+		)
+		if not rows:
+			return
+		yield rows
+		after = rows[-1].name
+
+
+def run_in_chunks(job, doctype, filters, process, chunk_size=BATCH_CHUNK_SIZE, error_title="Batch Job Error"):
+	"""Call ``process(doc)`` for every ``doctype`` document matching ``filters``
+
+	Args:
+		job: Unique job name, used for the checkpoint
+		doctype: DocType to walk
+		filters: Dict or list of filters
+		process: Callable receiving the loaded document
+		chunk_size: Documents per commit
+		error_title: Error Log title for failed documents
+
+	Returns:
+		dict: {"processed": int, "failed": int}
+	"""
+	cache = frappe.cache()
+	key = _checkpoint_key(job)
+	processed = failed = 0
+
+	for rows in _iter_chunks(doctype, filters, (), chunk_size, after=cache.get_value(key) or ""):
+		for row in rows:
+			frappe.db.savepoint("grm_batch")
+			try:
+				process(frappe.get_doc(doctype, row.name))
+				processed += 1
+			except Exception as e:
+				frappe.db.rollback(save_point="grm_batch")
+				failed += 1
+				frappe.log_error(f"Error in {job} for {doctype} {row.name}: {e!s}", error_title)
+
+		frappe.db.commit()
+		cache.set_value(key, rows[-1].name, expires_in_sec=CHECKPOINT_TTL)
+
+	cache.delete_value(key)
+	return {"processed": processed, "failed": failed}
+
+
+def bulk_update(doctype, filters, values, fields=(), after_chunk=None, chunk_size=BATCH_CHUNK_SIZE):
+	"""Set ``values`` on every row matching ``filters`` without loading documents
+
+	Skips validation, controller methods and doc_events; use it only where
+	``after_chunk`` can reproduce the side effects that matter.
+
+	Args:
+		doctype: DocType to update
+		filters: Dict or list of filters selecting the rows
+		values: Dict of column -> new value
+		fields: Extra columns passed to ``after_chunk`` (read before the update)
+		after_chunk: Callable receiving each chunk's rows, run after its commit
+
+	Returns:
+		int: Number of rows updated
+	"""
+	values = {**values, "modified": now_datetime(), "modified_by": frappe.session.user}
+	assignments = ", ".join(f"`{column}` = %({column})s" for column in values)
+	total = 0
+
+	for rows in _iter_chunks(doctype, filters, fields, chunk_size):
+		frappe.db.sql(
+			f"UPDATE `tab{doctype}` SET {assignments} WHERE `name` IN %(names)s",
+			{**values, "names": [r.name for r in rows]},
+		)
+		frappe.db.commit()
+		total += len(rows)
+
+		if after_chunk:
+			after_chunk(rows)
+
+	return total
@@ -0,0 +1,133 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Prebuilt, precompressed bundle of all CMS pages and SEO metadata.
+
+The bundle is rebuilt by a background job whenever a CMS single or SEO
+record changes (see ``cms_cache.on_page_update``) and kept in Redis as
+ready-to-send bytes: the JSON body plus its gzip and, when the ``brotli``
+package is installed, brotli encodings. It records the ``cms_cache`` page
+versions read before it was built; a request finding other versions (a
+change committed during or after the last build) rebuilds it.
+"""
+
+import gzip
+import hashlib
+
+import frappe
+from frappe.utils import now
+from werkzeug.wrappers import Response
+
+from grm_management.grm_management.utils.cms_cache import (
+	BROWSER_MAX_AGE,
+	PAYLOAD_TTL,
+	SHARED_MAX_AGE,
+	get_versions,
+)
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+BUNDLE_KEY = "grm_cms_bundle"
+
+# cms_cache pages the bundle is built from
+BUNDLE_PAGES = ("home", "about", "clients", "why_grm", "contact", "seo")
+
+
+def build_bundle():
+	"""Build the bundle from the page payloads and store it in Redis
+
+	Returns:
+		dict: {"versions", "hash", "identity", "gzip", "br"} (br is None without brotli)
+	"""
+	from grm_management.grm_management.api.v1 import seo, website
+
+	# Read first: a change committed while building leaves the bundle outdated
+	versions = get_versions(BUNDLE_PAGES)
+
+	builders = {
+		"home": website._home_page_payload,
+		"about": website._about_page_payload,
+		"clients": website._clients_page_payload,
+		"why_grm": website._why_page_payload,
+		"contact": website._contact_page_payload,
+	}
+
+	pages = {}
+	for page, build in builders.items():
+		response = build()
+		pages[page] = response.get("data") if response.get("success") else None
+
+	seo_response = seo._all_seo_payload()
+	data = {
+		"pages": pages,
+		"seo": seo_response.get("data") if seo_response.get("success") else None,
+		"generated_at": now(),
+	}
+
+	body = frappe.as_json({"message": data}, indent=None).encode()
+	bundle = {
+		"versions": versions,
+		"hash": hashlib.sha1(body).hexdigest(),
+		"identity": body,
+		"gzip": gzip.compress(body, compresslevel=9),
+		"br": brotli.compress(body) if brotli else None,
+	}
+	frappe.cache().set_value(BUNDLE_KEY, bundle, expires_in_sec=PAYLOAD_TTL)
+	return bundle
+
+
+def enqueue_rebuild():
+	"""Rebuild the bundle in the background once the current transaction commits"""
+	frappe.enqueue(
+		"grm_management.grm_management.utils.cms_bundle.build_bundle",
+		queue="short",
+		job_id="grm_cms_bundle",
+		deduplicate=True,
+		enqueue_after_commit=True,
+	)
+
+
+def _accepted_encodings():
+	accept = frappe.get_request_header("Accept-Encoding") or ""
+	return {part.split(";")[0].strip().lower() for part in accept.split(",")}
+
+
+def get_bundle():
+	"""Return the stored bundle, rebuilding it when missing or built from older page versions"""
+	bundle = frappe.cache().get_value(BUNDLE_KEY)
+	if not bundle or bundle.get("versions") != get_versions(BUNDLE_PAGES):
+		bundle = build_bundle()
+	return bundle
+
+
+def bundle_response():
+	"""Serve the bundle bytes in the best encoding the client accepts, or 304"""
+	bundle = get_bundle()
+
+	encodings = _accepted_encodings()
+	if bundle["br"] and "br" in encodings:
+		encoding = "br"
+	elif "gzip" in encodings:
+		encoding = "gzip"
+	else:
+		encoding = "identity"
+
+	# Each encoding is a different byte sequence, so it gets its own strong ETag
+	etag = f'"{bundle["hash"]}-{encoding}"'
+	headers = {
+		"ETag": etag,
+		"Cache-Control": f"public, max-age={BROWSER_MAX_AGE}, s-maxage={SHARED_MAX_AGE}",
+		"Vary": "Accept-Encoding",
+	}
+	if encoding != "identity":
+		headers["Content-Encoding"] = encoding
+
+	if_none_match = frappe.get_request_header("If-None-Match") or ""
+	if etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+		return Response(status=304, headers=headers)
+
+	return Response(bundle[encoding], status=200, mimetype="application/json", headers=headers)
@@ -0,0 +1,132 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Response cache for the public website CMS endpoints.
+
+Each page payload is cached in Redis under ``(page, language, version)``.
+Saving a page's source doctype bumps the page version (see hooks.py), so
+stale payloads are never served and simply expire.
+
+``cached_response`` returns a ready JSON response with an ``ETag`` and
+``Cache-Control`` so browsers and a CDN can revalidate with
+``If-None-Match`` and get a body-less 304 while the content is unchanged.
+"""
+
+import hashlib
+
+import frappe
+from werkzeug.wrappers import Response
+
+# Lifetime of a cached payload, in seconds (a version bump supersedes it sooner)
+PAYLOAD_TTL = 24 * 60 * 60
+
+# Cache-Control max-age for browsers / s-maxage for shared caches, in seconds
+BROWSER_MAX_AGE = 60
+SHARED_MAX_AGE = 300
+
+# Source doctype -> pages built from it
+PAGE_SOURCES = {
+	"GRM Home Page": ("home",),
+	"GRM About Page": ("about",),
+	"GRM Clients Page": ("clients", "customers"),
+	"GRM Why Page": ("why_grm",),
+	"GRM Contact Page": ("contact",),
+	"GRM SEO Meta": ("seo",),
+}
+
+
+def _version_key(page):
+	return f"grm_cms_version|{page}"
+
+
+def get_versions(pages):
+	"""Current version stamps of ``pages``, as a tuple in the given order"""
+	cache = frappe.cache()
+	return tuple(cache.get_value(_version_key(page)) or "0" for page in pages)
+
+
+def _get_language():
+	return frappe.form_dict.get("lang") or getattr(frappe.local, "lang", None) or "en"
+
+
+def _get_entry(page, build):
+	"""Return the cached {"data", "body", "etag"} of a page, building it on a miss
+
+	Only successful payloads are cached; failures are returned uncached.
+	"""
+	cache = frappe.cache()
+	version = get_versions((page,))[0]
+	key = f"grm_cms|{page}|{_get_language()}|{version}"
+
+	entry = cache.get_value(key)
+	if entry:
+		return entry
+
+	data = build()
+	body = frappe.as_json({"message": data}, indent=None)
+	entry = {
+		"data": data,
+		"body": body,
+		"etag": f'"{hashlib.sha1(body.encode()).hexdigest()}"',
+	}
+	if data.get("success"):
+		cache.set_value(key, entry, expires_in_sec=PAYLOAD_TTL)
+	return entry
+
+
+def get_payload(page, build):
+	"""Return the page payload dict from the cache (for aggregate endpoints)"""
+	return _get_entry(page, build)["data"]
+
+
+def cached_response(page, build):
+	"""Serve a page payload as a cacheable JSON response, or 304 if the client has it
+
+	Args:
+		page: Page key (see PAGE_SOURCES)
+		build: Callable returning the endpoint's response dict
+
+	Returns:
+		werkzeug Response, passed through by frappe as is
+	"""
+	entry = _get_entry(page, build)
+	data = entry["data"]
+
+	if not data.get("success"):
+		frappe.response["http_status_code"] = data.get("http_status_code", 500)
+		return data
+
+	headers = {
+		"ETag": entry["etag"],
+		"Cache-Control": f"public, max-age={BROWSER_MAX_AGE}, s-maxage={SHARED_MAX_AGE}",
+		"Vary": "Accept-Language",
+	}
+
+	if_none_match = frappe.get_request_header("If-None-Match") or ""
+	if entry["etag"] in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+		return Response(status=304, headers=headers)
+
+	return Response(entry["body"], status=200, mimetype="application/json", headers=headers)
+
+
+def invalidate_pages(pages):
+	"""Bump the version of ``pages`` now and again once the transaction commits"""
+	def bump():
+		cache = frappe.cache()
+		for page in pages:
+			cache.set_value(_version_key(page), frappe.generate_hash(length=10))
+
+	bump()
+	frappe.db.after_commit.add(bump)
+
+
+def on_page_update(doc, method=None):
+	"""doc_events handler for the CMS source doctypes (see hooks.py)"""
+	pages = PAGE_SOURCES.get(doc.doctype)
+	if pages:
+		invalidate_pages(pages)
+
+		from grm_management.grm_management.utils.cms_bundle import enqueue_rebuild
+
+		enqueue_rebuild()
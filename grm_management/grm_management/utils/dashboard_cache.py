@@ -0,0 +1,171 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Per-tenant tenant-dashboard snapshots.
+
+``api/v1/booking.get_dashboard`` stores the payload it builds for a tenant in
+Redis and serves it from there until one of the tenant's bookings,
+subscriptions, invoices or payments (or the tenant itself) changes. The
+doc_events registered in hooks.py drop the snapshot; a short TTL bounds
+staleness from changes that bypass those events (e.g. ``db_set``).
+
+The session user -> tenant mapping is cached alongside, so a cache hit does
+not touch MariaDB at all. GRM Tenant and User saves drop the mappings of the
+emails involved.
+"""
+
+import frappe
+from frappe.utils import cint, nowdate
+
+# Fallback lifetime of a snapshot, in seconds
+SNAPSHOT_TTL = 5 * 60
+
+# Lifetime of a cached user -> tenant mapping, in seconds
+TENANT_MAP_TTL = 60 * 60
+
+HITS_KEY = "grm_dashboard_stats|hits"
+MISSES_KEY = "grm_dashboard_stats|misses"
+
+
+def _snapshot_key(tenant):
+	return f"grm_dashboard|{tenant}"
+
+
+def _user_key(user):
+	return f"grm_dashboard_user|{user}"
+
+
+def get_tenant_for_user(user):
+	"""Return the GRM Tenant whose primary email belongs to ``user`` (cached)."""
+	if user in ("Administrator", "Guest"):
+		return None
+
+	cache = frappe.cache()
+	tenant = cache.get_value(_user_key(user))
+	if tenant is None:
+		user_email = frappe.db.get_value("User", user, "email") or user
+		# "" caches "no tenant" so unlinked users don't hit the database either
+		tenant = frappe.db.get_value("GRM Tenant", {"primary_email": user_email}, "name") or ""
+		cache.set_value(_user_key(user), tenant, expires_in_sec=TENANT_MAP_TTL)
+
+	return tenant or None
+
+
+def get_snapshot(tenant):
+	"""Return the cached dashboard payload of ``tenant`` or None, counting hits and misses."""
+	cache = frappe.cache()
+	snapshot = cache.get_value(_snapshot_key(tenant))
+
+	# Upcoming counts depend on the current date, so yesterday's snapshot is stale
+	if snapshot and snapshot.get("date") == nowdate():
+		cache.incr(cache.make_key(HITS_KEY))
+		return snapshot["data"]
+
+	cache.incr(cache.make_key(MISSES_KEY))
+	return None
+
+
+def set_snapshot(tenant, data):
+	"""Store the dashboard payload of ``tenant``."""
+	frappe.cache().set_value(
+		_snapshot_key(tenant),
+		{"date": nowdate(), "data": data},
+		expires_in_sec=SNAPSHOT_TTL,
+	)
+
+
+def invalidate_tenant(tenant):
+	"""Drop a tenant's snapshot now and again once the current transaction commits.
+
+	The second delete covers a request that rebuilt the snapshot from
+	pre-commit data in between.
+	"""
+	if not tenant:
+		return
+	key = _snapshot_key(tenant)
+	frappe.cache().delete_value(key)
+	frappe.db.after_commit.add(lambda: frappe.cache().delete_value(key))
+
+
+def get_stats():
+	"""Return snapshot hit/miss counters and the hit ratio."""
+	cache = frappe.cache()
+	hits = cint(cache.get(cache.make_key(HITS_KEY)))
+	misses = cint(cache.get(cache.make_key(MISSES_KEY)))
+	total = hits + misses
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_ratio": round(hits / total, 4) if total else 0,
+	}
+
+
+def reset_stats():
+	"""Reset the hit/miss counters."""
+	cache = frappe.cache()
+	cache.delete(cache.make_key(HITS_KEY), cache.make_key(MISSES_KEY))
+
+
+# ---------------------------------------------------------------------------
+# doc_events handlers (see hooks.py)
+# ---------------------------------------------------------------------------
+
+def on_tenant_doc_change(doc, method=None):
+	"""GRM Booking / GRM Subscription: drop the snapshot of the linked tenant(s)."""
+	invalidate_tenant(doc.get("tenant"))
+
+	before = doc.get_doc_before_save()
+	if before and before.get("tenant") != doc.get("tenant"):
+		invalidate_tenant(before.get("tenant"))
+
+
+def on_tenant_change(doc, method=None):
+	"""GRM Tenant: drop its snapshot and the user -> tenant mappings of its email(s)."""
+	invalidate_tenant(doc.name)
+
+	emails = {doc.get("primary_email")}
+	before = doc.get_doc_before_save()
+	if before:
+		emails.add(before.get("primary_email"))
+	emails.discard(None)
+	emails.discard("")
+	if not emails:
+		return
+
+	users = set(emails)
+	users.update(frappe.get_all("User", filters={"email": ["in", list(emails)]}, pluck="name"))
+	cache = frappe.cache()
+	for user in users:
+		cache.delete_value(_user_key(user))
+
+
+def on_user_change(doc, method=None):
+	"""User: drop the user's user -> tenant mapping (its email may have changed)."""
+	users = {doc.name, doc.get("email")}
+	before = doc.get_doc_before_save()
+	if before:
+		users.add(before.get("email"))
+	users.discard(None)
+	users.discard("")
+
+	keys = [_user_key(user) for user in users]
+	frappe.cache().delete_value(keys)
+	# A request may have cached the pre-commit mapping in between
+	frappe.db.after_commit.add(lambda: frappe.cache().delete_value(keys))
+
+
+def on_customer_doc_change(doc, method=None):
+	"""Sales Invoice / Payment Entry: drop the snapshots of tenants linked to the customer."""
+	if doc.doctype == "Payment Entry":
+		if doc.get("party_type") != "Customer":
+			return
+		customer = doc.get("party")
+	else:
+		customer = doc.get("customer")
+
+	if not customer:
+		return
+
+	for tenant in frappe.get_all("GRM Tenant", filters={"customer": customer}, pluck="name"):
+		invalidate_tenant(tenant)
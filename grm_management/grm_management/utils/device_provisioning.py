@@ -0,0 +1,225 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Per-device queue of ZK user add/remove operations.
+
+Access Rules no longer talk to devices while they are being saved. They
+queue an operation per device in a Redis hash keyed by ZK user id, so a
+later operation for the same user replaces an earlier one that has not been
+applied yet. A background job per device (deduplicated by job id) takes one
+pooled connection, applies everything pending and records the outcome on the
+Access Rule Device rows.
+
+Operations are stored as JSON strings carrying a token. The job removes or
+reschedules an operation with a Lua script that first compares that token,
+so an operation queued while the previous one for the same user was being
+applied is never lost.
+
+A failed operation stays queued with an exponential backoff between attempts;
+after ``MAX_ATTEMPTS`` it is dropped from the queue and its rows are marked
+Failed, so an unreachable or decommissioned device stops producing jobs.
+"""
+
+import json
+import time
+
+import frappe
+
+from grm_management.grm_management.utils import zk_pool
+
+# Rounds a job drains before leaving late arrivals to the next job
+MAX_ROUNDS = 5
+
+# Attempts per operation before it is given up as Failed
+MAX_ATTEMPTS = 6
+
+# Backoff after the first failed attempt, doubled per attempt up to the cap, in seconds
+RETRY_BACKOFF = 15 * 60
+MAX_RETRY_BACKOFF = 24 * 60 * 60
+
+# Replace (ARGV[3]) or delete (no ARGV[3]) the operation of ZK user ARGV[1]
+# in hash KEYS[1], only if its token is still ARGV[2]
+COMPARE_AND_REPLACE = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current or cjson.decode(current)['token'] ~= ARGV[2] then
+	return 0
+end
+if ARGV[3] then
+	redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+else
+	redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+def _queue_key(device):
+	# Values are JSON, not the pickles of RedisWrapper.hset/hgetall, so the
+	# queue is accessed with plain Redis commands under the site-prefixed key
+	return frappe.cache().make_key(f"grm_provisioning_queue|{device}")
+
+
+def queue_user_operation(device, op, member, rule=None):
+	"""Queue adding or removing ``member`` on ``device`` and schedule the device job
+
+	Args:
+		device: Access Device name
+		op: "add" or "remove"
+		member: Member document or dict with zk_user_id, member_name, access_card_number
+		rule: Access Rule whose device row records the result
+	"""
+	frappe.cache().execute_command("HSET", _queue_key(device), str(member.get("zk_user_id")), json.dumps({
+		"op": op,
+		"name": (member.get("member_name") or "")[:24],  # ZK has name length limit
+		"card": member.get("access_card_number") or "",
+		"rule": rule,
+		"token": frappe.generate_hash(length=10),
+		"attempts": 0,
+		"retry_at": 0,
+	}))
+	enqueue_device(device)
+
+
+def enqueue_device(device):
+	"""Schedule processing of a device's queue once the current transaction commits"""
+	frappe.enqueue(
+		"grm_management.grm_management.utils.device_provisioning.process_device_queue",
+		queue="short",
+		device=device,
+		job_id=f"grm_provisioning::{device}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+	)
+
+
+def get_pending_operations(device, due=False):
+	"""Return {zk_user_id: operation} still queued for ``device``
+
+	Args:
+		due: Only operations whose backoff has elapsed
+	"""
+	pending = {
+		frappe.safe_decode(zk_user_id): json.loads(value)
+		for zk_user_id, value in frappe.cache().execute_command("HGETALL", _queue_key(device)).items()
+	}
+	if due:
+		now = time.time()
+		pending = {u: op for u, op in pending.items() if op.get("retry_at", 0) <= now}
+	return pending
+
+
+def _replace_if_current(device, zk_user_id, op, replacement=None):
+	"""Atomically delete (or replace) ``op`` unless a newer operation took its place
+
+	Returns:
+		bool: Whether ``op`` was still queued
+	"""
+	args = [zk_user_id, op["token"]]
+	if replacement:
+		args.append(json.dumps(replacement))
+	script = frappe.cache().register_script(COMPARE_AND_REPLACE)
+	return bool(script(keys=[_queue_key(device)], args=args))
+
+
+def _record_failure(device, zk_user_id, op):
+	"""Back off a failed operation, or give it up after MAX_ATTEMPTS
+
+	Returns:
+		str: "Failed" when the operation was given up, else None (still queued or replaced)
+	"""
+	attempts = op.get("attempts", 0) + 1
+	if attempts < MAX_ATTEMPTS:
+		delay = min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_BACKOFF)
+		_replace_if_current(device, zk_user_id, op, {**op, "attempts": attempts, "retry_at": time.time() + delay})
+		return None
+
+	# A newer operation for the user replaced this one: nothing to give up
+	if not _replace_if_current(device, zk_user_id, op):
+		return None
+	frappe.log_error(
+		f"Gave up {op['op']} of ZK user {zk_user_id} on device {device} after {attempts} attempts",
+		"Device Provisioning Failed"
+	)
+	return "Failed"
+
+
+def process_device_queue(device):
+	"""Background job: apply a device's pending operations over one connection"""
+	device_doc = frappe.get_doc("Access Device", device)
+
+	applied = set()
+	for _round in range(MAX_ROUNDS):
+		# Failed operations stay queued but are not retried within this job
+		pending = {
+			zk_user_id: op for zk_user_id, op in get_pending_operations(device, due=True).items()
+			if op["token"] not in applied
+		}
+		if not pending:
+			return
+		applied.update(op["token"] for op in pending.values())
+
+		results = []
+		with zk_pool.connection(device_doc) as conn:
+			if not conn:
+				# Operations stay queued for a later job unless they ran out of attempts
+				_record_results(device, [
+					(op, "Failed") for zk_user_id, op in pending.items()
+					if _record_failure(device, zk_user_id, op)
+				])
+				frappe.db.commit()
+				return
+
+			for zk_user_id, op in pending.items():
+				try:
+					if op["op"] == "add":
+						conn.set_user(
+							uid=int(zk_user_id),
+							name=op["name"],
+							privilege=0,  # 0 = User, 14 = Admin
+							password='',
+							group_id='',
+							user_id=str(zk_user_id),
+							card=op["card"]
+						)
+						results.append((op, "Synced"))
+					else:
+						conn.delete_user(uid=int(zk_user_id))
+						results.append((op, "Removed"))
+
+					# Keep the entry if it was replaced while we were applying it
+					_replace_if_current(device, zk_user_id, op)
+
+				except Exception as e:
+					if _record_failure(device, zk_user_id, op):
+						results.append((op, "Failed"))
+					frappe.log_error(
+						f"Error applying {op['op']} of ZK user {zk_user_id} on device {device}: {e!s}",
+						"Device Provisioning Error"
+					)
+
+		_record_results(device, results)
+		frappe.db.commit()
+
+
+def _record_results(device, results):
+	"""Write sync status of the Access Rule Device rows, one UPDATE per status"""
+	by_status = {}
+	for op, status in results:
+		if op.get("rule"):
+			by_status.setdefault(status, set()).add(op["rule"])
+
+	now = frappe.utils.now()
+	for status, rules in by_status.items():
+		frappe.db.sql("""
+			UPDATE `tabAccess Rule Device`
+			SET sync_status = %(status)s, last_sync = %(now)s
+			WHERE parenttype = 'Access Rule' AND parent IN %(rules)s AND access_device = %(device)s
+		""", {"status": status, "now": now, "rules": list(rules), "device": device})
+
+
+def retry_pending_queues():
+	"""Re-schedule devices with operations whose backoff has elapsed (e.g. after a failed connection)"""
+	for device in frappe.get_all("Access Device", filters={"connection_mode": "Direct ZK"}, pluck="name"):
+		if get_pending_operations(device, due=True):
+			enqueue_device(device)
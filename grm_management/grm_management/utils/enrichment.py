@@ -0,0 +1,62 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Batch enrichment of result sets with linked document fields.
+
+Collect the link values of a page of rows, fetch the linked records with one
+``IN`` query and look them up from a dict, instead of calling
+``frappe.db.get_value`` once per row.
+"""
+
+import frappe
+
+
+def get_value_map(doctype, names, fields, key="name"):
+	"""Fetch ``fields`` of every ``doctype`` record in ``names`` with one query.
+
+	Args:
+		doctype: DocType to read
+		names: Iterable of link values (blanks and duplicates are ignored)
+		fields: Field names to return
+		key: Field the names are matched against (default: name)
+
+	Returns:
+		dict: {link value: frappe._dict of fields}
+	"""
+	names = list({n for n in names if n})
+	if not names:
+		return {}
+
+	fields = list(fields)
+	if key not in fields:
+		fields.append(key)
+
+	rows = frappe.get_all(
+		doctype,
+		filters={key: ["in", names]},
+		fields=fields,
+		limit_page_length=0,
+	)
+	return {row.get(key): row for row in rows}
+
+
+def get_space_info_map(spaces):
+	"""Fetch display details of GRM Spaces and their locations with one join.
+
+	Returns:
+		dict: {space: frappe._dict(space_name, space_name_ar, space_image,
+			location, location_name, location_name_ar)}
+	"""
+	spaces = list({s for s in spaces if s})
+	if not spaces:
+		return {}
+
+	rows = frappe.db.sql("""
+		SELECT s.name, s.space_name, s.space_name_ar, s.space_image,
+			s.location, l.location_name, l.location_name_ar
+		FROM `tabGRM Space` s
+		LEFT JOIN `tabGRM Location` l ON l.name = s.location
+		WHERE s.name IN %(spaces)s
+	""", {"spaces": spaces}, as_dict=True)
+	return {row.name: row for row in rows}
@@ -0,0 +1,308 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Resized WebP/AVIF derivatives of public space and CMS images.
+
+When an image is uploaded to a GRM Space or a CMS page, a background job
+renders it at ``VARIANT_WIDTHS`` (never upscaling) as WebP, and as AVIF when
+the installed Pillow can encode it. Variants are written to
+``/files/variants/`` under names derived from the source content hash, so a
+URL never changes meaning and can be cached for a year (immutable). The
+variant manifest of each source URL is stored in a GRM Image Variant record
+and cached in Redis; a flushed cache is refilled from those records.
+
+APIs call ``get_image_variants(url)`` for ``srcset`` strings. It returns None
+until the job has run, and clients fall back to the original image. Cached
+CMS payloads are invalidated once a page image's variants exist. Variant
+files are deleted with the last File using their source image, or when the
+source content changes.
+"""
+
+import glob
+import hashlib
+import io
+import os
+
+import frappe
+from frappe.utils import get_url
+
+from grm_management.grm_management.utils.cms_bundle import enqueue_rebuild
+from grm_management.grm_management.utils.cms_cache import PAGE_SOURCES, invalidate_pages
+
+# Target widths in pixels
+VARIANT_WIDTHS = (160, 480, 960, 1600)
+
+# Encoder settings per output format
+FORMAT_OPTIONS = {
+	"webp": {"quality": 80, "method": 6},
+	"avif": {"quality": 55},
+}
+
+VARIANT_DIR = "variants"
+
+MANIFEST_KEY = "grm_image_variants"
+
+# Field set once the manifest hash holds every stored record; kept inside the
+# hash so an evicted hash never leaves the marker behind
+LOADED_FIELD = "__loaded__"
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+# Doctypes whose uploaded images get variants
+IMAGE_DOCTYPES = (
+	"GRM Space", "GRM Home Page", "GRM About Page", "GRM Clients Page",
+	"GRM Why Page", "GRM Contact Page",
+)
+
+
+def _is_public_image(file_url):
+	return bool(
+		file_url
+		and file_url.startswith("/files/")
+		and not file_url.startswith(f"/files/{VARIANT_DIR}/")
+		and file_url.lower().endswith(IMAGE_EXTENSIONS)
+	)
+
+
+def _output_formats():
+	from PIL import features
+
+	formats = ["webp"]
+	if features.check("avif"):
+		formats.append("avif")
+	return formats
+
+
+def generate_variants(file_url, doctype=None):
+	"""Background job: render and register the variants of a public image
+
+	Args:
+		file_url: Public ``/files/...`` URL of the source image
+		doctype: Doctype the image belongs to; CMS pages are invalidated afterwards
+
+	Returns:
+		dict: The manifest stored for ``file_url``, or None if it is not a readable public image
+	"""
+	if not _is_public_image(file_url):
+		return None
+
+	from PIL import Image, ImageOps
+
+	source_path = frappe.get_site_path("public", file_url.lstrip("/"))
+	if not os.path.exists(source_path):
+		return None
+
+	with open(source_path, "rb") as f:
+		content = f.read()
+	content_hash = hashlib.sha1(content).hexdigest()[:16]
+
+	manifest = _get_manifest(file_url)
+	if manifest and manifest.get("hash") == content_hash:
+		return manifest
+	previous_hash = manifest.get("hash") if manifest else None
+
+	image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+	image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+	width, height = image.size
+
+	# Never upscale; the smallest target is always produced
+	widths = [w for w in VARIANT_WIDTHS if w < width] or [min(width, VARIANT_WIDTHS[0])]
+
+	target_dir = frappe.get_site_path("public", "files", VARIANT_DIR)
+	os.makedirs(target_dir, exist_ok=True)
+
+	variants = {}
+	for fmt in _output_formats():
+		variants[fmt] = {}
+		for target_width in widths:
+			file_name = f"{content_hash}-{target_width}.{fmt}"
+			path = os.path.join(target_dir, file_name)
+			if not os.path.exists(path):
+				resized = image.resize(
+					(target_width, max(1, round(height * target_width / width))), Image.LANCZOS
+				)
+				# Write under a temporary name so a reader never sees a partial file
+				resized.save(f"{path}.tmp", format=fmt.upper(), **FORMAT_OPTIONS[fmt])
+				os.replace(f"{path}.tmp", path)
+			variants[fmt][target_width] = f"/files/{VARIANT_DIR}/{file_name}"
+
+	manifest = {"hash": content_hash, "width": width, "height": height, "variants": variants}
+	_save_manifest(file_url, manifest)
+
+	if previous_hash:
+		_remove_unused_variant_files(previous_hash)
+
+	if doctype in PAGE_SOURCES:
+		invalidate_pages(PAGE_SOURCES[doctype])
+		enqueue_rebuild()
+
+	return manifest
+
+
+def enqueue_variants(file_url, doctype=None):
+	"""Generate the variants of ``file_url`` in the background once the transaction commits"""
+	if not _is_public_image(file_url):
+		return
+	frappe.enqueue(
+		"grm_management.grm_management.utils.image_variants.generate_variants",
+		queue="long",
+		file_url=file_url,
+		doctype=doctype,
+		job_id=f"grm_image_variants::{file_url}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+	)
+
+
+def _manifest_from_record(record):
+	variants = frappe.parse_json(record.variants) or {}
+	return {
+		"hash": record.content_hash,
+		"width": record.width,
+		"height": record.height,
+		# JSON object keys are strings; widths are ints everywhere else
+		"variants": {fmt: {int(w): url for w, url in by_width.items()} for fmt, by_width in variants.items()},
+	}
+
+
+def _get_manifest(file_url):
+	"""Manifest of ``file_url`` from the cache, falling back to its GRM Image Variant record"""
+	manifest = frappe.cache().hget(MANIFEST_KEY, file_url)
+	if manifest:
+		return manifest
+
+	record = frappe.db.get_value(
+		"GRM Image Variant", {"file_url": file_url},
+		["content_hash", "width", "height", "variants"], as_dict=True,
+	)
+	if not record:
+		return None
+	manifest = _manifest_from_record(record)
+	frappe.cache().hset(MANIFEST_KEY, file_url, manifest)
+	return manifest
+
+
+def _save_manifest(file_url, manifest):
+	values = {
+		"content_hash": manifest["hash"],
+		"width": manifest["width"],
+		"height": manifest["height"],
+		"variants": frappe.as_json(manifest["variants"], indent=None),
+	}
+	name = frappe.db.get_value("GRM Image Variant", {"file_url": file_url})
+	if name:
+		frappe.db.set_value("GRM Image Variant", name, values)
+	else:
+		frappe.get_doc({"doctype": "GRM Image Variant", "file_url": file_url, **values}).insert(
+			ignore_permissions=True
+		)
+	frappe.cache().hset(MANIFEST_KEY, file_url, manifest)
+
+
+def _remove_unused_variant_files(content_hash):
+	"""Delete the variant files of ``content_hash`` unless another source image still has that content"""
+	if frappe.db.exists("GRM Image Variant", {"content_hash": content_hash}):
+		return
+	target_dir = frappe.get_site_path("public", "files", VARIANT_DIR)
+	for path in glob.glob(os.path.join(target_dir, f"{glob.escape(content_hash)}-*")):
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+
+
+def _srcsets(manifest):
+	site_url = get_url()
+	result = {"width": manifest["width"], "height": manifest["height"]}
+	for fmt, by_width in manifest["variants"].items():
+		result[fmt] = ", ".join(f"{site_url}{url} {w}w" for w, url in sorted(by_width.items()))
+	return result
+
+
+def get_image_variants(file_url):
+	"""Return srcset-style variant URLs of an image, or None if not generated yet
+
+	Returns:
+		dict: {"width", "height", "webp": "url 160w, url 480w, ...", "avif": ... (if available)}
+	"""
+	if not _is_public_image(file_url):
+		return None
+
+	manifest = _get_manifest(file_url)
+	return _srcsets(manifest) if manifest else None
+
+
+def get_image_variants_map():
+	"""Return a lookup ``url -> srcsets`` reading every manifest once, for list endpoints
+
+	Returns:
+		callable: Takes an image URL, returns what ``get_image_variants`` would
+	"""
+	cache = frappe.cache()
+	manifests = cache.hgetall(MANIFEST_KEY)
+	if not manifests.pop(LOADED_FIELD, None):
+		# Cache flushed (or never filled): refill it from the stored records
+		for record in frappe.get_all(
+			"GRM Image Variant",
+			fields=["file_url", "content_hash", "width", "height", "variants"],
+			limit_page_length=0,
+		):
+			manifests[record.file_url] = _manifest_from_record(record)
+			cache.hset(MANIFEST_KEY, record.file_url, manifests[record.file_url])
+		cache.hset(MANIFEST_KEY, LOADED_FIELD, 1)
+
+	def lookup(file_url):
+		manifest = manifests.get(file_url) if file_url else None
+		return _srcsets(manifest) if manifest else None
+
+	return lookup
+
+
+# ---------------------------------------------------------------------------
+# doc_events handlers (see hooks.py)
+# ---------------------------------------------------------------------------
+
+def on_file_insert(doc, method=None):
+	"""File: queue variants for public images attached to spaces and CMS pages."""
+	if doc.get("attached_to_doctype") in IMAGE_DOCTYPES and not doc.get("is_private"):
+		enqueue_variants(doc.get("file_url"), doc.attached_to_doctype)
+
+
+def on_file_trash(doc, method=None):
+	"""File: drop the variants once no other File uses the same image."""
+	file_url = doc.get("file_url")
+	if not _is_public_image(file_url) or frappe.db.exists(
+		"File", {"file_url": file_url, "name": ["!=", doc.name]}
+	):
+		return
+
+	record = frappe.db.get_value(
+		"GRM Image Variant", {"file_url": file_url}, ["name", "content_hash"], as_dict=True
+	)
+	if not record:
+		return
+	content_hash = record.content_hash
+	frappe.delete_doc("GRM Image Variant", record.name, ignore_permissions=True)
+	frappe.cache().hdel(MANIFEST_KEY, file_url)
+
+	# Files are only removed once the deletion is committed
+	frappe.db.after_commit.add(lambda: _remove_unused_variant_files(content_hash))
+
+
+def on_space_update(doc, method=None):
+	"""GRM Space: queue variants when the space image is set or replaced."""
+	if doc.has_value_changed("space_image"):
+		enqueue_variants(doc.get("space_image"), doc.doctype)
+
+
+def regenerate_all():
+	"""Queue variants for every existing space and CMS image, e.g. via ``bench execute``."""
+	for file_url in frappe.get_all("GRM Space", filters={"space_image": ["is", "set"]}, pluck="space_image"):
+		enqueue_variants(file_url)
+	for f in frappe.get_all(
+		"File",
+		filters={"attached_to_doctype": ["in", IMAGE_DOCTYPES], "is_private": 0},
+		fields=["file_url", "attached_to_doctype"],
+	):
+		enqueue_variants(f.file_url, f.attached_to_doctype)
@@ -0,0 +1,229 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+In-memory catalog of GRM Spaces for the public website.
+
+The catalog (spaces, space types, locations, properties) is loaded with four
+queries and kept per process. Every facet value (location, space type,
+status, amenity) maps to an int bitmask with bit ``i`` set for the i-th
+space, so filtering is a few ``&`` operations and a facet count is a
+popcount. Amenity facets come from the packed ``amenity_mask`` column.
+Capacity and price ranges are answered by bisecting presorted value lists.
+
+Saving or deleting a GRM Space, Space Type, Location or Property bumps a
+version stamp in Redis (see hooks.py); processes notice it within
+``VERSION_CHECK_INTERVAL`` seconds and rebuild on the next request.
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+
+import frappe
+from frappe.utils import flt
+
+VERSION_KEY = "grm_space_catalog|version"
+
+# How often a process re-reads the version stamp, in seconds
+VERSION_CHECK_INTERVAL = 5
+
+SPACE_FIELDS = (
+	"name", "space_name", "space_name_ar", "space_code", "space_type", "location",
+	"property", "status", "is_featured", "allow_booking", "floor_number", "room_number",
+	"area_sqm", "capacity", "min_booking_hours", "hourly_rate", "daily_rate",
+	"monthly_rate", "annual_rate", "minimum_charge", "custom_amenities",
+	"amenity_mask", "description", "space_image",
+)
+
+# Check fields of GRM Space that are searchable amenities
+AMENITY_FIELDS = (
+	"wifi", "air_conditioning", "projector", "whiteboard",
+	"coffee_tea", "parking", "printer_access", "phone_line",
+)
+
+# Bit i of GRM Space.amenity_mask is AMENITY_FIELDS[i]; only ever append new amenities
+AMENITY_BITS = {field: 1 << i for i, field in enumerate(AMENITY_FIELDS)}
+
+PRICE_FIELDS = ("hourly_rate", "daily_rate", "monthly_rate", "annual_rate")
+
+SPACE_TYPE_FIELDS = (
+	"name", "space_type_name", "space_type_name_ar", "category", "icon", "color_code",
+	"default_capacity", "typical_area_sqm", "description", "default_amenities",
+	"typical_usage", "is_active", "hourly_rate", "daily_rate", "monthly_rate", "annual_rate",
+)
+
+# {site: (version, checked, catalog)}
+_catalogs = {}
+
+
+class Catalog:
+	"""Spaces with their linked records and facet bitmasks"""
+
+	def __init__(self, spaces, space_types, locations, properties):
+		self.spaces = spaces
+		self.space_types = {t.name: t for t in space_types}
+		self.locations = {l.name: l for l in locations}
+		self.properties = {p.name: p for p in properties}
+		self.all = (1 << len(spaces)) - 1
+
+		self.facets = {"location": {}, "space_type": {}, "status": {}, "amenity": {}}
+		for i, space in enumerate(spaces):
+			bit = 1 << i
+			for facet in ("location", "space_type", "status"):
+				value = space.get(facet)
+				if value:
+					index = self.facets[facet]
+					index[value] = index.get(value, 0) | bit
+			mask = space.amenity_mask or 0
+			for field, amenity_bit in AMENITY_BITS.items():
+				if mask & amenity_bit:
+					index = self.facets["amenity"]
+					index[field] = index.get(field, 0) | bit
+
+		# Presorted (value, position) pairs for range filters
+		self.ranges = {}
+		for field in ("capacity", *PRICE_FIELDS):
+			pairs = sorted((flt(space.get(field)), i) for i, space in enumerate(spaces))
+			self.ranges[field] = ([v for v, _ in pairs], [i for _, i in pairs])
+
+	def range_mask(self, field, low=None, high=None):
+		"""Bitmask of spaces with ``low <= field <= high`` (either bound optional)"""
+		if low is None and high is None:
+			return self.all
+		values, positions = self.ranges[field]
+		start = bisect_left(values, flt(low)) if low is not None else 0
+		end = bisect_right(values, flt(high)) if high is not None else len(values)
+		mask = 0
+		for i in positions[start:end]:
+			mask |= 1 << i
+		return mask
+
+	def value_mask(self, facet, values):
+		"""Bitmask of spaces matching any of ``values`` of a facet (all spaces if none given)"""
+		if not values:
+			return self.all
+		index = self.facets[facet]
+		mask = 0
+		for value in values:
+			mask |= index.get(value, 0)
+		return mask
+
+	def amenity_mask(self, amenities):
+		"""Bitmask of spaces having every amenity in ``amenities``"""
+		mask = self.all
+		for field in amenities or ():
+			mask &= self.facets["amenity"].get(field, 0)
+		return mask
+
+	def search(self, location=None, space_type=None, status=None, min_capacity=None, max_capacity=None,
+			min_price=None, max_price=None, price_field="hourly_rate", amenities=None):
+		"""Filter the catalog and count facet values
+
+		List filters (location, space_type, status) accept one value or a list.
+		Each facet's counts apply every filter except that facet's own, so the
+		client can show how many results picking another value would give.
+
+		Returns:
+			tuple: (copies of the matching spaces in catalog order, {facet: {value: count}})
+		"""
+		masks = {
+			"location": self.value_mask("location", _as_list(location)),
+			"space_type": self.value_mask("space_type", _as_list(space_type)),
+			"status": self.value_mask("status", _as_list(status)),
+			"amenity": self.amenity_mask(amenities),
+			"capacity": self.range_mask("capacity", min_capacity, max_capacity),
+			"price": self.range_mask(price_field, min_price, max_price),
+		}
+
+		def combined(skip=None):
+			mask = self.all
+			for name, value in masks.items():
+				if name != skip:
+					mask &= value
+			return mask
+
+		result = combined()
+
+		facet_counts = {}
+		for facet, index in self.facets.items():
+			# Amenities are conjunctive: count them within the full result
+			base = result if facet == "amenity" else combined(skip=facet)
+			facet_counts[facet] = {
+				value: count for value, bits in index.items()
+				if (count := (bits & base).bit_count())
+			}
+
+		# Copies: callers decorate the rows, which are shared by every request of the process
+		return [frappe._dict(self.spaces[i]) for i in _iter_bits(result)], facet_counts
+
+
+def compute_amenity_mask(space):
+	"""Pack the amenity checkboxes of a GRM Space (doc or dict) into an int"""
+	return sum(bit for field, bit in AMENITY_BITS.items() if space.get(field))
+
+
+def amenities_to_mask(fields):
+	"""Mask requiring every amenity field in ``fields`` (unknown fields raise KeyError)"""
+	return sum(AMENITY_BITS[field] for field in set(fields or ()))
+
+
+def mask_to_amenities(mask):
+	"""Amenity fields set in ``mask``, in AMENITY_FIELDS order"""
+	return [field for field, bit in AMENITY_BITS.items() if (mask or 0) & bit]
+
+
+def _as_list(value):
+	if value is None or value == "":
+		return []
+	return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _iter_bits(mask):
+	i = 0
+	while mask:
+		if mask & 1:
+			yield i
+		mask >>= 1
+		i += 1
+
+
+def _build():
+	spaces = frappe.get_all(
+		"GRM Space",
+		fields=list(SPACE_FIELDS),
+		order_by="space_name asc",
+		limit_page_length=0,
+	)
+	space_types = frappe.get_all(
+		"GRM Space Type", fields=list(SPACE_TYPE_FIELDS), order_by="space_type_name asc", limit_page_length=0
+	)
+	locations = frappe.get_all(
+		"GRM Location", fields=["name", "location_name", "location_name_ar"], limit_page_length=0
+	)
+	properties = frappe.get_all("GRM Property", fields=["name", "property_name"], limit_page_length=0)
+	return Catalog(spaces, space_types, locations, properties)
+
+
+def get_catalog():
+	"""Return this process's catalog, rebuilding it when the version stamp changed"""
+	site = frappe.local.site
+	now = time.monotonic()
+	version, checked, catalog = _catalogs.get(site, (None, 0, None))
+
+	if catalog is None or now - checked > VERSION_CHECK_INTERVAL:
+		current = frappe.cache().get_value(VERSION_KEY) or "0"
+		if catalog is None or current != version:
+			catalog = _build()
+		_catalogs[site] = (current, now, catalog)
+
+	return catalog
+
+
+def invalidate(doc=None, method=None):
+	"""doc_events handler: make every process rebuild its catalog, now and after commit"""
+	def bump():
+		frappe.cache().set_value(VERSION_KEY, frappe.generate_hash(length=10))
+		_catalogs.pop(frappe.local.site, None)
+
+	bump()
+	frappe.db.after_commit.add(bump)
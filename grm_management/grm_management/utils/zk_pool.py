@@ -0,0 +1,198 @@
+# Copyright (c) 2026, Wael ELsafty and contributors
+# For license information, please see license.txt
+
+"""
+Per-worker pool of live ZK device connections.
+
+Opening a pyzk connection costs a socket handshake plus a CMD_CONNECT round
+trip. Connections are kept open per (site, device) after use and handed out
+again until they have been idle for ``IDLE_TIMEOUT`` seconds or the device
+settings change. A connection is only ever lent to one caller at a time.
+
+Many ZK terminals accept a single TCP connection, so a parked socket blocks
+every other worker: a daemon thread closes idle connections once they pass
+the timeout, and the ``after_job`` hook closes them all when a background
+job ends (RQ runs each job in a forked process, so jobs get reuse within a
+job only).
+
+Use ``with zk_pool.connection(device) as conn:``; ``conn`` is None when the
+device cannot be reached. A connection that raised inside the block is
+closed instead of being returned to the pool.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+
+# Seconds an unused connection stays open
+IDLE_TIMEOUT = 30
+
+# Seconds between reaper passes
+REAP_INTERVAL = 5
+
+# pyzk socket timeout, in seconds
+CONNECT_TIMEOUT = 5
+
+_lock = threading.Lock()
+
+# {(site, device): {"conn", "signature", "last_used"}} of idle connections
+_idle = {}
+
+# Process that owns the reaper thread (a forked child must start its own)
+_reaper_pid = None
+
+
+def _signature(config):
+	return (config["ip_address"], config["port"], config["password"], config["force_udp"])
+
+
+def _close(conn):
+	try:
+		conn.disconnect()
+	except Exception:
+		pass
+
+
+def open_connection(config, timeout=CONNECT_TIMEOUT):
+	"""Open a new pyzk connection from an AccessDevice.get_zk_config() dict"""
+	from zk import ZK
+
+	zk = ZK(
+		config["ip_address"],
+		port=config["port"],
+		timeout=timeout,
+		password=config["password"],
+		force_udp=config["force_udp"],
+		ommit_ping=False
+	)
+	return zk.connect()
+
+
+def reap_idle():
+	"""Close connections that have been idle longer than IDLE_TIMEOUT"""
+	now = time.monotonic()
+	with _lock:
+		expired = [key for key, entry in _idle.items() if now - entry["last_used"] > IDLE_TIMEOUT]
+		entries = [_idle.pop(key) for key in expired]
+	for entry in entries:
+		_close(entry["conn"])
+
+
+def close_all():
+	"""Close every pooled connection of this process (``after_job`` hook)"""
+	with _lock:
+		entries = list(_idle.values())
+		_idle.clear()
+	for entry in entries:
+		_close(entry["conn"])
+
+
+def _reap_forever():
+	while True:
+		time.sleep(REAP_INTERVAL)
+		reap_idle()
+
+
+def _ensure_reaper():
+	"""Start this process's reaper thread once; it only touches the pool, never frappe"""
+	global _reaper_pid
+	pid = os.getpid()
+	if _reaper_pid == pid:
+		return
+	with _lock:
+		if _reaper_pid == pid:
+			return
+		threading.Thread(target=_reap_forever, name="zk-pool-reaper", daemon=True).start()
+		_reaper_pid = pid
+
+
+def acquire(config, verify=False):
+	"""Take an idle connection to the device or open a new one
+
+	With ``verify``, a pooled connection must answer a cheap command first,
+	otherwise it is replaced. Raises whatever pyzk raises when the device
+	cannot be reached.
+	"""
+	reap_idle()
+	key = (frappe.local.site, config["name"])
+
+	with _lock:
+		entry = _idle.pop(key, None)
+
+	if entry:
+		conn = entry["conn"]
+		if entry["signature"] == _signature(config) and getattr(conn, "is_connect", False):
+			if not verify:
+				return conn
+			try:
+				conn.get_time()
+				return conn
+			except Exception:
+				pass
+		_close(conn)
+
+	return open_connection(config)
+
+
+def release(config, conn, discard=False):
+	"""Return a connection to the pool, or close it when ``discard`` is set or it dropped"""
+	if discard or not getattr(conn, "is_connect", False):
+		_close(conn)
+		return
+
+	_ensure_reaper()
+	key = (frappe.local.site, config["name"])
+	with _lock:
+		previous = _idle.pop(key, None)
+		_idle[key] = {"conn": conn, "signature": _signature(config), "last_used": time.monotonic()}
+	if previous:
+		_close(previous["conn"])
+
+
+def discard(device_name):
+	"""Close the pooled connection of a device, e.g. after its settings changed"""
+	with _lock:
+		entry = _idle.pop((frappe.local.site, device_name), None)
+	if entry:
+		_close(entry["conn"])
+
+
+@contextmanager
+def connection(device, verify=False):
+	"""Lend a pooled connection to an Access Device, updating its status on change
+
+	``verify`` makes sure a reused connection is still live (see acquire).
+
+	Yields:
+		Connected pyzk object, or None if the device is unreachable
+	"""
+	config = device.get_zk_config()
+
+	conn = None
+	try:
+		conn = acquire(config, verify=verify)
+	except ImportError:
+		frappe.log_error("pyzk library not installed. Run: pip install pyzk", "ZK Connection Error")
+		frappe.msgprint(_("pyzk library not installed. Please contact administrator."), indicator="red", alert=True)
+	except Exception as e:
+		error_msg = str(e)
+		frappe.log_error(f"Error connecting to device {device.device_name}: {error_msg}", "ZK Connection Error")
+		device.set_status("Offline", error=error_msg)
+
+	if not conn:
+		yield None
+		return
+
+	device.set_status("Online")
+
+	try:
+		yield conn
+	except Exception:
+		release(config, conn, discard=True)
+		raise
+	else:
+		release(config, conn)
@@ -155,16 +155,27 @@ fixtures = [
 
 doc_events = {
 	"GRM Location": {
-		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
+		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name",
+		"on_update": "grm_management.grm_management.utils.space_catalog.invalidate",
+		"on_trash": "grm_management.grm_management.utils.space_catalog.invalidate"
 	},
 	"GRM Property": {
-		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
+		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name",
+		"on_update": "grm_management.grm_management.utils.space_catalog.invalidate",
+		"on_trash": "grm_management.grm_management.utils.space_catalog.invalidate"
 	},
 	"GRM Space": {
-		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
+		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name",
+		"on_update": [
+			"grm_management.grm_management.utils.space_catalog.invalidate",
+			"grm_management.grm_management.utils.image_variants.on_space_update"
+		],
+		"on_trash": "grm_management.grm_management.utils.space_catalog.invalidate"
 	},
 	"GRM Space Type": {
-		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
+		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name",
+		"on_update": "grm_management.grm_management.utils.space_catalog.invalidate",
+		"on_trash": "grm_management.grm_management.utils.space_catalog.invalidate"
 	},
 	"GRM Landlord": {
 		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
@@ -173,11 +184,62 @@ doc_events = {
 		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
 	},
 	"GRM Tenant": {
-		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name"
+		"after_insert": "grm_management.grm_management.doc_events.populate_code_from_name",
+		"on_update": "grm_management.grm_management.utils.dashboard_cache.on_tenant_change",
+		"on_trash": "grm_management.grm_management.utils.dashboard_cache.on_tenant_change"
+	},
+	"GRM Booking": {
+		"on_update": "grm_management.grm_management.utils.dashboard_cache.on_tenant_doc_change",
+		"on_trash": "grm_management.grm_management.utils.dashboard_cache.on_tenant_doc_change"
+	},
+	"GRM Subscription": {
+		"on_update": "grm_management.grm_management.utils.dashboard_cache.on_tenant_doc_change",
+		"on_trash": "grm_management.grm_management.utils.dashboard_cache.on_tenant_doc_change"
+	},
+	"Sales Invoice": {
+		"on_submit": "grm_management.grm_management.utils.dashboard_cache.on_customer_doc_change",
+		"on_cancel": "grm_management.grm_management.utils.dashboard_cache.on_customer_doc_change",
+		"on_update_after_submit": "grm_management.grm_management.utils.dashboard_cache.on_customer_doc_change"
+	},
+	"Payment Entry": {
+		"on_submit": "grm_management.grm_management.utils.dashboard_cache.on_customer_doc_change",
+		"on_cancel": "grm_management.grm_management.utils.dashboard_cache.on_customer_doc_change"
+	},
+	"GRM Home Page": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"GRM About Page": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"GRM Clients Page": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"GRM Why Page": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"GRM Contact Page": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"GRM SEO Meta": {
+		"on_update": "grm_management.grm_management.utils.cms_cache.on_page_update",
+		"on_trash": "grm_management.grm_management.utils.cms_cache.on_page_update"
+	},
+	"File": {
+		"after_insert": "grm_management.grm_management.utils.image_variants.on_file_insert",
+		"on_trash": "grm_management.grm_management.utils.image_variants.on_file_trash"
 	},
 	"User": {
 		"after_insert": "grm_management.grm_management.user_events.on_user_update",
-		"on_update": "grm_management.grm_management.user_events.on_user_update"
+		"on_update": [
+			"grm_management.grm_management.user_events.on_user_update",
+			"grm_management.grm_management.utils.dashboard_cache.on_user_change"
+		],
+		"on_trash": "grm_management.grm_management.utils.dashboard_cache.on_user_change"
 	}
 }
 
@@ -235,6 +297,8 @@ scheduler_events = {
 # before_job = ["grm_management.utils.before_job"]
 # after_job = ["grm_management.utils.after_job"]
 
+after_job = ["grm_management.grm_management.utils.zk_pool.close_all"]
+
 # User Data Protection
 # --------------------
 
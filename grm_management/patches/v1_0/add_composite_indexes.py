@@ -0,0 +1,17 @@
+import frappe
+
+# (doctype, columns, index name) for the hot multi-column predicates
+COMPOSITE_INDEXES = (
+	("Access Log", ["zk_user_id", "event_time"], "zk_user_id_event_time_index"),
+	("Access Log", ["device", "zk_user_id", "event_time"], "device_zk_user_id_event_time_index"),
+	("Access Log", ["location", "event_time"], "location_event_time_index"),
+	("GRM Booking", ["space", "booking_date", "status"], "space_booking_date_status_index"),
+	("GRM Booking", ["tenant", "status", "booking_date"], "tenant_status_booking_date_index"),
+	("GRM Booking", ["expiry_date", "status"], "expiry_date_status_index"),
+)
+
+
+def execute():
+	"""Create the composite indexes behind availability, dashboard and access log lookups"""
+	for doctype, columns, index_name in COMPOSITE_INDEXES:
+		frappe.db.add_index(doctype, columns, index_name)
@@ -0,0 +1,12 @@
+import frappe
+
+
+def execute():
+	"""Copy the current tenant name onto bookings and subscriptions where it is missing or stale"""
+	for doctype in ("GRM Booking", "GRM Subscription"):
+		frappe.db.sql(f"""
+			UPDATE `tab{doctype}` d
+			INNER JOIN `tabGRM Tenant` t ON t.name = d.tenant
+			SET d.tenant_name = t.tenant_name
+			WHERE IFNULL(d.tenant_name, '') != IFNULL(t.tenant_name, '')
+		""")
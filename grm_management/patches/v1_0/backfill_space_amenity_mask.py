@@ -0,0 +1,9 @@
+import frappe
+
+from grm_management.grm_management.utils.space_catalog import AMENITY_BITS
+
+
+def execute():
+	"""Pack the amenity checkboxes of every GRM Space into amenity_mask"""
+	expression = " + ".join(f"(IFNULL(`{field}`, 0) != 0) * {bit}" for field, bit in AMENITY_BITS.items())
+	frappe.db.sql(f"UPDATE `tabGRM Space` SET `amenity_mask` = {expression}")
@@ -0,0 +1,17 @@
+import json
+
+import frappe
+
+from grm_management.grm_management.utils.device_provisioning import _queue_key
+
+
+def execute():
+	"""Move queued device operations from the pickled hashes to the JSON queues"""
+	cache = frappe.cache()
+	for device in frappe.get_all("Access Device", pluck="name"):
+		old_key = f"grm_provisioning|{device}"
+		for zk_user_id, op in (cache.hgetall(old_key) or {}).items():
+			op = {"attempts": 0, "retry_at": 0, **op}
+			# HSETNX: an operation queued since the upgrade is newer
+			cache.execute_command("HSETNX", _queue_key(device), zk_user_id, json.dumps(op))
+		cache.delete_value(old_key)